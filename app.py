@@ -6,18 +6,22 @@ Aplikasi utama Streamlit
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import folium
-from streamlit_folium import st_folium
 import os
 from datetime import datetime
 from io import BytesIO
-from PIL import Image
-import base64
+import functools
+from typing import Optional
 
 # Import konfigurasi dan utilities
 from config import *
 from utils.data_processor import *
+from utils.lineage import get_serial_history, search_serials, lineage_stats, rebuild_lineage_from_backups
+from utils.changes import load_change_log, load_change_details
+from utils.status_history import load_status_history, status_trend
+from utils.snapshots import get_snapshot, schedule_dashboard_snapshots, read_snapshot_html, snapshot_report_html, SNAPSHOT_ALL
+from utils.ingest_jobs import submit_ingest_job, submit_batch_ingest_job, get_job, cancel_job, take_job_result, TERMINAL_STATUSES
+from utils.assets import app_css_html, header_html
+from utils.profiler import start_rerun, finish_rerun, span, profiled, record_payload, is_active, profile_to_text, profile_to_collapsed
 
 # ===== KONFIGURASI STREAMLIT =====
 st.set_page_config(
@@ -34,161 +38,47 @@ if "page" not in st.session_state:
 def set_page(page_name: str):
     st.session_state.page = page_name
 
-# ===== UTIL: Konversi gambar ke base64 =====
-def image_to_base64(image: Image.Image) -> str:
-    buffered = BytesIO()
-    image.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
-
-def normalize_status(s: str) -> str:
-    """Normalisasi STATUS agar 'STANDBY' == 'STAND BY'."""
-    if s is None:
-        return ""
-    x = str(s).strip().upper()
-    if x.replace(" ", "") == "STANDBY":
-        return "STAND BY"
-    if x in ("RUSAK", "TERPASANG", "STAND BY"):
-        return x
-    return x
-
-# ===== CUSTOM CSS (pola INSPEKSI + revisi header dua baris) =====
-st.markdown(
+# ===== FRAGMENT (rerun parsial per bagian halaman) =====
+def page_fragment(func=None, *, run_every=None):
     """
-    <style>
-    /* Compact container spacing */
-    .block-container { padding: 1.5rem 2rem 2rem 2rem; }
-    /* Divider style */
-    hr { height: 3px !important; background-color: #5e5e5e !important; border: none !important; margin: 0 !important; }
-
-    /* Header container pakai grid agar judul betul-betul di tengah */
-    .header-container {
-        background-color: #007C8F;
-        padding: 8px 22px;
-        border-radius: 10px;
-        display: grid;
-        grid-template-columns: 1fr 2fr 1fr; /* kolom kiri - judul - kanan */
-        align-items: center;              /* vertikal center untuk seluruh isi */
-        gap: 14px;
-        margin-top: 72px;                /* turunkan header dari atas */
-        margin-bottom: 18px;
-        min-height: 96px;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }
+    st.fragment untuk bagian halaman. Interaksi widget di dalamnya hanya menjalankan
+    ulang fungsi ini dengan argumen dari rerun penuh terakhir; rerun parsial tetap
+    terekam profiler bila profiler aktif. `run_every` (detik) untuk fragment polling.
+    """
+    if func is None:
+        return lambda f: page_fragment(f, run_every=run_every)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if is_active() or not profiler_enabled():
+            with span(f"fragment: {func.__name__}"):
+                return func(*args, **kwargs)
+        opts = st.session_state.get('ugb_profiler_opts', {'memory': False, 'cprofile': False})
+        start_rerun(f"fragment: {func.__name__}", memory=opts['memory'], cprofile=opts['cprofile'])
+        try:
+            return func(*args, **kwargs)
+        finally:
+            store_profile_record(finish_rerun())
+    return st.fragment(wrapper, run_every=run_every)
 
-    /* Logo containers */
-    .logo-container { display: flex; align-items: center; min-width: 140px; }
-    .logo-left { justify-content: flex-start; }
-    .logo-right { justify-content: flex-end; }
-
-    /* Ukuran logo konsisten, PLN sedikit lebih besar sesuai permintaan */
-    .logo-img-dinantara, .logo-img-pln {
-        height: 72px;
-        max-height: 72px;
-        width: auto;
-        max-width: 200px;
-        object-fit: contain;
-        display: block;
-    }
-    .logo-img-pln { height: 90px; max-height: 90px; }
-
-    /* Geser Danantara sedikit ke kanan agar tidak terlalu menempel kiri */
-    .logo-img-dinantara { margin-left: 28px; }
-
-    /* Pusatkan judul di kolom tengah lalu geser sedikit ke kanan mendekati logo PLN */
-    .title-container { text-align: center; display: flex; align-items: center; justify-content: center; transform: translate(18px, 6px); }
-    .main-title { color: white; margin: 0; line-height: 1.1; letter-spacing: 0.5px; }
-    /* Dua baris judul sama besar */
-    .main-title .title-line1 { display: block; font-size: 40px; font-weight: 800; }
-    .main-title .title-line2 { display: block; font-size: 40px; font-weight: 800; }
-
-    /* Info container (untuk Upload) */
-    .info-container {
-        border: 1.5px solid #007C8F;
-        background-color: transparent;
-        padding: 25px;
-        border-radius: 10px;
-        margin-top: 10px;
-    }
-    .info-container p { margin-bottom: 10px; }
-    .info-container ul { list-style-position: inside; padding-left: 5px; }
-
-    /* ==== Tambahan: gaya SLICER & KPI seperti DASH_INSPEKSI ==== */
-    .filter-header { color: #007C8F; font-weight: bold; font-size: 16px; margin-bottom: 0px; display: flex; align-items: center; gap: 8px; }
-    /* Lower the selectboxes so they align with the Apply/Reset buttons */
-    div[data-testid="stSelectbox"] { margin-top: 12px !important; margin-bottom: 8px !important; }
-    div[data-testid="stButton"] > button { height: 38px !important; padding: 8px 16px !important; margin-top: 0px !important; }
-    .button-container { margin-top: 8px; height: 38px; display: flex; align-items: flex-start; }
-    .metric-card { background: white; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); padding: 20px; text-align: center; border: 1px solid #e1e5e9; margin-bottom: 10px; transition: transform 0.2s ease, box-shadow 0.2s ease; }
-    .metric-card:hover { transform: translateY(-2px); box-shadow: 0 6px 20px rgba(0,0,0,0.15); }
-    .metric-number { font-size: 2.5em; font-weight: bold; margin-bottom: 8px; color: #2c3e50; }
-    .metric-label { font-size: 0.9em; color: #7f8c8d; font-weight: 500; text-transform: uppercase; letter-spacing: 0.5px; }
-    .color-primary { color: #3498db; } .color-success { color: #27ae60; } .color-warning { color: #f39c12; } .color-danger { color: #e74c3c; } .color-info { color: #8e44ad; }
-
-    /* Responsif */
-    @media (max-width: 1200px) {
-        .logo-img-dinantara, .logo-img-pln { height: 64px; max-height: 64px; }
-        .logo-img-pln { height: 76px; max-height: 76px; }
-        .logo-img-dinantara { margin-left: 20px; }
-        .main-title .title-line1 { font-size: 36px; }
-        .main-title .title-line2 { font-size: 36px; }
-        .header-container { padding: 8px 18px; min-height: 88px; margin-top: 56px; }
-    /* geser sedikit ke kanan & turun pada layar besar */
-    .title-container { transform: translate(14px, 4px); }
-    }
-    @media (max-width: 992px) {
-        .logo-container { min-width: 120px; }
-        .logo-img-dinantara, .logo-img-pln { height: 56px; max-height: 56px; }
-        .logo-img-pln { height: 68px; max-height: 68px; }
-        .logo-img-dinantara { margin-left: 16px; }
-        .main-title .title-line1 { font-size: 32px; }
-        .main-title .title-line2 { font-size: 32px; }
-        .header-container { padding: 6px 16px; min-height: 80px; margin-top: 44px; }
-    .title-container { transform: translate(10px, 3px); }
-    }
-    @media (max-width: 768px) {
-        .header-container { padding: 6px 14px; grid-template-columns: 1fr 2fr 1fr; min-height: 72px; margin-top: 32px; }
-        .logo-img-dinantara, .logo-img-pln { height: 50px; max-height: 50px; }
-        .logo-img-pln { height: 60px; max-height: 60px; }
-        .logo-img-dinantara { margin-left: 12px; }
-        .main-title .title-line1 { font-size: 26px; }
-        .main-title .title-line2 { font-size: 26px; }
-    .title-container { transform: translate(6px, 2px); }
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+def rerun_fragment():
+    """Rerun fragment yang sedang berjalan; saat rerun penuh (scope fragment tidak diizinkan) rerun aplikasi."""
+    try:
+        st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException:
+        st.rerun()
+
+# ===== CUSTOM CSS (pola INSPEKSI + revisi header dua baris; isi di assets/style.css) =====
+st.markdown(app_css_html(), unsafe_allow_html=True)
 
 # ===== HEADER (identik gaya INSPEKSI, judul 2 baris) =====
+@profiled()
 def display_header():
-    try:
-        logo_dinantara = Image.open("assets/LOGO DANANTARA.png")
-        logo_pln = Image.open("assets/LOGO PLN.png")
-        b64_logo_dinantara = image_to_base64(logo_dinantara)
-        b64_logo_pln = image_to_base64(logo_pln)
-    except Exception:
-        b64_logo_dinantara = b64_logo_pln = None
-
-    if b64_logo_dinantara and b64_logo_pln:
-        st.markdown(
-            f"""
-            <div class=\"header-container\"> 
-                <div class=\"logo-container logo-left\"> 
-                    <img src=\"data:image/png;base64,{b64_logo_dinantara}\" class=\"logo-img-dinantara\" />
-                </div>
-                <div class=\"title-container\">
-                    <h1 class=\"main-title\">
-                        <span class=\"title-line1\">Dashboard Geo-Monitor UGB</span>
-                        <span class=\"title-line2\">PT. PLN UID Lampung</span>
-                    </h1>
-                </div>
-                <div class=\"logo-container logo-right\"> 
-                    <img src=\"data:image/png;base64,{b64_logo_pln}\" class=\"logo-img-pln\" />
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+    # Logo dibaca, diperkecil & di-encode sekali per proses (utils.assets); rerun hanya memakai ulang string HTML
+    html = header_html()
+    if html:
+        record_payload('header: HTML + logo base64', len(html))
+        st.markdown(html, unsafe_allow_html=True)
 
 # ===== SIDEBAR NAVIGASI (tombol session_state) =====
 def render_sidebar_nav():
@@ -196,9 +86,167 @@ def render_sidebar_nav():
     st.sidebar.button("📁 Upload Data", on_click=set_page, args=("upload",), use_container_width=True)
     st.sidebar.button("📊 Dashboard Utama", on_click=set_page, args=("dashboard",), use_container_width=True)
     st.sidebar.button("📋 Rekapitulasi Data", on_click=set_page, args=("recap",), use_container_width=True)
+    st.sidebar.button("🔎 Lacak No Seri", on_click=set_page, args=("lineage",), use_container_width=True)
     st.sidebar.markdown("---")
 
+# ===== LAPORAN PEMETAAN HEADER (hasil resolve_header) =====
+def render_header_mapping_report(report: dict, expanded: bool = False):
+    """Tampilkan header yang dipetakan secara fuzzy / tidak dikenali beserta confidence-nya."""
+    rows = []
+    for sheet, mappings in (report or {}).get('header_mappings', {}).items():
+        for m in mappings:
+            if m['method'] != 'exact':
+                rows.append({
+                    'SHEET': sheet,
+                    'HEADER FILE': m['raw'],
+                    'DIPETAKAN KE': m['header'] if m['method'] == 'fuzzy' else '(tidak dikenali)',
+                    'CONFIDENCE': f"{m['confidence']:.0%}",
+                })
+    if not rows:
+        return
+    n_fuzzy = sum(1 for r in rows if r['DIPETAKAN KE'] != '(tidak dikenali)')
+    with st.expander(f"🧭 Pemetaan Header ({n_fuzzy} header dikoreksi otomatis)", expanded=expanded):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+# ===== LAPORAN PARSING TANGGAL (hasil add_typed_date_columns) =====
+def render_date_parsing_report(report: dict):
+    """Tampilkan format tanggal yang terdeteksi dan baris yang tanggalnya tidak bisa dibaca."""
+    parsing = (report or {}).get('date_parsing', {})
+    bad_rows = []
+    for col, summary in parsing.items():
+        for r in summary.get('unparseable_rows', []):
+            row = {'KOLOM': col, 'NO': r['NO'], 'SHEET': r['SOURCE_SHEET'], 'NILAI': r[col]}
+            if SOURCE_FILE_COLUMN in r:
+                row['FILE'] = r[SOURCE_FILE_COLUMN]
+            bad_rows.append(row)
+    if not bad_rows:
+        return
+    st.warning(f"⚠️ {len(bad_rows)} nilai tanggal tidak dapat dibaca dan diabaikan saat pengurutan")
+    with st.expander("📅 Detail Parsing Tanggal", expanded=False):
+        for col, summary in parsing.items():
+            fmts = ", ".join(f"{f['format']} ({f['rows']})" for f in summary['formats']) or "-"
+            st.caption(f"{col}: format {fmts} • serial Excel {summary['excel_serial']} • gagal {summary['unparseable']}")
+        st.dataframe(pd.DataFrame(bad_rows), use_container_width=True, hide_index=True)
+
+# ===== LAPORAN KUALITAS DATA (utils.quality, tahap 'quality' saat ingest) =====
+def render_quality_report(report: dict):
+    """Jumlah pelanggaran per aturan + daftar masalah per baris (unduhan CSV lengkap)."""
+    quality = (report or {}).get('quality')
+    if not quality:
+        return
+    if not quality['issues']:
+        st.caption(f"✅ Validasi kualitas data: tidak ada masalah pada {quality['rows']:,} baris ({quality['seconds']:.2f} dtk)")
+        return
+    issues = report['quality_issues']
+    st.warning(f"⚠️ {quality['rows_with_issues']:,} dari {quality['rows']:,} baris punya masalah kualitas data "
+               "(tetap disimpan; periksa sebelum data dipakai)")
+    with st.expander(f"🩺 Kualitas Data ({quality['issues']:,} masalah)", expanded=False):
+        rows = [{'ATURAN': r['label'], 'KOLOM': r['column'], 'BARIS': r['count']} for r in quality['rules'] if r['count']]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        if len(issues) > QUALITY_PREVIEW_ROWS:
+            st.caption(f"Menampilkan {QUALITY_PREVIEW_ROWS:,} dari {len(issues):,} masalah; unduh CSV untuk daftar lengkap")
+        st.dataframe(issues.head(QUALITY_PREVIEW_ROWS), use_container_width=True, hide_index=True, height=320)
+        # CSV dibuat sekali per laporan (report bertahan di session), bukan tiap rerun halaman upload
+        if 'quality_issues_csv' not in report:
+            report['quality_issues_csv'] = issues.to_csv(index=False).encode('utf-8')
+        st.download_button("📥 Unduh Daftar Masalah (CSV)", report['quality_issues_csv'],
+                           file_name=f"kualitas_data_{report.get('dataset_version') or 'upload'}.csv", mime="text/csv",
+                           on_click="ignore", key="ugb_quality_download")
+
+# ===== PERUBAHAN DIBANDING VERSI SEBELUMNYA (utils.changes) =====
+def render_change_summary(entry: dict, in_expander: bool = True):
+    """Jumlah unit ditambah / dihapus / berubah pada satu upload + rinciannya (expander bila in_expander)."""
+    if not entry:
+        return
+    st.markdown("**🔁 Perubahan dibanding versi sebelumnya**" if entry.get('previous_version') else "**🔁 Upload pertama (semua data baru)**")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("➕ Ditambah", f"{entry['added']:,}")
+    c2.metric("➖ Dihapus", f"{entry['removed']:,}")
+    c3.metric("✏️ Berubah", f"{entry['modified']:,}")
+    c4.metric("＝ Tetap", f"{entry['unchanged']:,}")
+    if entry.get('fields'):
+        st.caption("Kolom berubah: " + ", ".join(f"{k} ({v:,})" for k, v in sorted(entry['fields'].items(), key=lambda kv: -kv[1])))
+    if entry['added'] + entry['removed'] + entry['modified'] == 0:
+        return
+    with st.expander("📄 Rincian Perubahan", expanded=False) if in_expander else st.container():
+        details = load_change_details(entry['dataset_version'])
+        kinds = st.multiselect("Jenis", ['ADDED', 'REMOVED', 'MODIFIED'], default=['REMOVED', 'MODIFIED'] if entry.get('previous_version') else ['ADDED'],
+                               key=f"ugb_change_kinds_{entry['dataset_version']}")
+        shown = details[details['CHANGE'].isin(kinds)]
+        st.dataframe(shown, use_container_width=True, hide_index=True, height=320)
+        st.download_button("📥 Unduh Rincian (CSV)", shown.to_csv(index=False).encode('utf-8'),
+                           file_name=f"perubahan_{entry['dataset_version']}.csv", mime="text/csv", on_click="ignore")
+
+def render_change_history():
+    """Riwayat ringkasan perubahan per upload (untuk rekonsiliasi bulanan)."""
+    log = load_change_log(limit=50)
+    if not log:
+        return
+    rows = [{
+        'VERSI': e['dataset_version'],
+        'WAKTU': e['recorded_at'].replace('T', ' '),
+        'DITAMBAH': e['added'],
+        'DIHAPUS': e['removed'],
+        'BERUBAH': e['modified'],
+        'TETAP': e['unchanged'],
+    } for e in log]
+    with st.expander(f"🗂️ Riwayat Perubahan per Upload ({len(log)} terakhir)", expanded=False):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        version = st.selectbox("Lihat rincian versi", [r['VERSI'] for r in rows], key="ugb_change_history_version")
+        render_change_summary(next(e for e in log if e['dataset_version'] == version), in_expander=False)
+
+# ===== HASIL PRE-FLIGHT (sniff_workbook) =====
+def render_sniff_report(report: dict):
+    """Peringatan pre-flight + perkiraan jumlah baris yang didapat sebelum parsing penuh."""
+    sniff = (report or {}).get('sniff')
+    if not sniff:
+        return
+    # Upload batch: satu hasil sniff per file
+    results = sniff.items() if 'sheets' not in sniff else [(None, sniff)]
+    for name, result in results:
+        prefix = f"{name}: " if name else ""
+        for msg in result.get('warnings', []):
+            st.warning(f"⚠️ {prefix}{msg}")
+        if 'skipped' not in result:
+            approx = "" if all(e['exact'] for e in result['sheets'] if e['valid']) else "±"
+            n_valid = sum(1 for e in result['sheets'] if e['valid'])
+            st.caption(f"🔎 {prefix}pre-flight {result['seconds']:.2f} dtk • {n_valid} sheet valid • {approx}{result['est_rows']:,} baris")
+
+# ===== RINGKASAN BATCH MULTI-WORKBOOK (report['files'] dari process_excel_files) =====
+def render_batch_report(report: dict):
+    """Ringkasan per file pada upload batch + peringatan sheet UP3 yang muncul di lebih dari satu file."""
+    files = (report or {}).get('files', [])
+    if not files:
+        return
+    for sheet, names in report.get('duplicate_sheets', {}).items():
+        st.warning(f"⚠️ Sheet '{sheet}' ada di {len(names)} file ({', '.join(names)}); semua barisnya ikut digabung")
+    rows = [{
+        'FILE': f['file'],
+        'STATUS': '✅' if f['success'] else f"❌ {f['message']}",
+        'SHEET': ', '.join(f['sheets']) or '-',
+        'BARIS': f"{f['rows']:,}",
+        'DETIK': round(f['seconds'], 2),
+    } for f in files]
+    with st.expander(f"🗂️ Ringkasan Batch ({len(files)} file)", expanded=not all(f['success'] for f in files)):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+# ===== RINCIAN WAKTU INGEST (report['timings'] dari pipeline) =====
+def render_ingest_timings(report: dict):
+    """Tabel waktu per tahap/sheet dari upload terakhir (juga tersimpan di INGEST_LOG_PATH)."""
+    timings = (report or {}).get('timings', [])
+    if not timings:
+        return
+    rows = [{
+        'TAHAP': INGEST_STAGE_LABELS.get(t['stage'], t['stage']),
+        'SHEET': t['sheet'] or '-',
+        'BARIS': '-' if t['rows'] is None else f"{t['rows']:,}",
+        'DETIK': round(t['seconds'], 3),
+    } for t in timings]
+    with st.expander(f"⏱️ Rincian Waktu Proses ({report.get('total_seconds', sum(t['seconds'] for t in timings)):.2f} dtk)", expanded=False):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
 # ===== HALAMAN UPLOAD DATA (gaya INSPEKSI, konten UGB) =====
+@profiled()
 def page_upload_data():
     st.header("📁 Upload Data", divider="rainbow")
     st.markdown(
@@ -208,86 +256,202 @@ def page_upload_data():
             <ul>
                 <li>File boleh berisi 1–4 sheet: <b>UGB UP3 KARANG, METRO, KOTABUMI, PRINGSEWU</b></li>
                 <li>Header di baris ke-1, data mulai dari baris ke-2</li>
+                <li>Beberapa file (mis. satu per UP3) boleh diunggah sekaligus: digabung menjadi satu database</li>
             </ul>
         </div>
         """,
         unsafe_allow_html=True,
     )
 
-    uploaded_file = st.file_uploader(
+    uploaded_files = st.file_uploader(
         "Pilih file:",
         type=["xlsx", "xlsm"],
-        help="Maksimal 200 MB (sesuai batas Streamlit default)"
+        accept_multiple_files=True,
+        help="Maksimal 200 MB per file (sesuai batas Streamlit default). Pilih beberapa file sekaligus untuk mode batch."
     )
 
-    if uploaded_file is not None:
-        progress_container = st.container()
-        with progress_container:
-            progress_bar = st.progress(0, text="Memulai...")
-            try:
-                # Langsung proses tanpa ringkasan sheet
-                progress_bar.progress(10, text="Menyiapkan file untuk diproses...")
-                progress_bar.progress(30, text="Membaca & mengekstrak data per sheet yang valid...")
-                success, message, df = process_excel_file(uploaded_file)
-                progress_bar.progress(60, text="Validasi dan persiapan data...")
-                if success:
-                    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
-                    # Simpan langsung ke session apa adanya (tanpa deduplikasi & tanpa merge)
-                    progress_bar.progress(75, text="Menyiapkan data untuk disimpan...")
-                    try:
-                        current = df.copy()
-                        # Re-number kolom NO (override apapun yang ada di file)
-                        if 'NO' in current.columns:
-                            current = current.drop(columns=['NO'])
-                        current.insert(0, 'NO', range(1, len(current) + 1))
-                        st.session_state['ugb_db'] = current
-                    except Exception as me:
-                        st.warning(f"Peringatan saat merge session: {me}")
-
-                    progress_bar.progress(88, text="Menyimpan salinan cadangan (CSV)...")
-                    if save_to_database(st.session_state['ugb_db'], DATABASE_PATH):
-                        progress_bar.progress(100, text="Selesai 100%!")
-                        st.success(f"✅ {message}")
-                        # Bersihkan cache dan reset filter agar tampilan tidak menduplikasi data lama
-                        try:
-                            st.cache_data.clear()
-                        except Exception:
-                            pass
-                        for key in [
-                            'ugb_filter_state', 'temp_ugb_filter',
-                            'ugb_recap_filter_state', 'temp_ugb_recap_filter'
-                        ]:
-                            if key in st.session_state:
-                                del st.session_state[key]
-                        # (Hapus tombol unduh database dari laman Upload sesuai permintaan)
-                        with st.expander("🔍 Preview Data (10 baris pertama dari database aktif)", expanded=False):
-                            st.dataframe(st.session_state['ugb_db'].head(10), use_container_width=True, height=320)
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.button("📊 Dashboard Utama", on_click=set_page, args=("dashboard",), use_container_width=True)
-                        with col2:
-                            st.button("📋 Rekapitulasi Data", on_click=set_page, args=("recap",), use_container_width=True)
-                        with col3:
-                            st.button("🔄 Upload Lagi", on_click=set_page, args=("upload",), use_container_width=True)
-                    else:
-                        progress_bar.empty(); st.error("❌ Gagal menyimpan ke database")
-                else:
-                    progress_bar.empty(); st.error(f"❌ Error: {message}")
-            except Exception as e:
-                progress_bar.empty(); st.error(f"❌ Gagal memproses file: {str(e)}")
+    if uploaded_files:
+        # Satu job per kumpulan file yang diunggah; rerun berikutnya hanya mem-poll statusnya
+        submitted = st.session_state.setdefault('ugb_ingest_files', {})
+        batch_key = tuple(f.file_id for f in uploaded_files)
+        if batch_key not in submitted:
+            if len(uploaded_files) == 1:
+                f = uploaded_files[0]
+                submitted[batch_key] = submit_ingest_job(f.getvalue(), f.name, DATABASE_PATH)
+            else:
+                submitted[batch_key] = submit_batch_ingest_job([(f.name, f.getvalue()) for f in uploaded_files], DATABASE_PATH)
+        st.session_state['ugb_ingest_job'] = submitted[batch_key]
+
+    job = get_job(st.session_state.get('ugb_ingest_job'))
+    if job is not None and job['status'] not in TERMINAL_STATUSES:
+        ingest_job_progress(job['id'])
+    elif job is not None and uploaded_files:
+        render_ingest_result(job)
+    render_change_history()
+
+def _ingest_progress_text(job: dict):
+    """(persen, teks) progress bar dari snapshot job."""
+    ev = job['progress']
+    pct = int(min(ev['done'] / max(ev['total'], 1), 1.0) * 100)
+    sheet = f" • {ev['sheet']}" if ev.get('sheet') else ""
+    if job['status'] == 'queued':
+        return pct, "Menunggu antrean..."
+    if job['status'] == 'committing':
+        return pct, f"{ev['label']}{sheet}... (menyimpan, tidak bisa dibatalkan)"
+    return pct, f"{ev['label']}{sheet}..."
+
+@page_fragment(run_every=INGEST_POLL_SECONDS)
+def ingest_job_progress(job_id: str):
+    """Polling status job ingest; begitu selesai, rerun penuh agar hasilnya dipasang ke sesi."""
+    job = get_job(job_id)
+    if job is None or job['status'] in TERMINAL_STATUSES:
+        st.rerun()
+    pct, text = _ingest_progress_text(job)
+    st.progress(pct, text=text)
+    st.caption(f"📄 {job['source']} • diproses di latar belakang, halaman lain tetap bisa dibuka")
+    st.button("⛔ Batalkan", key=f"ugb_cancel_{job_id}", on_click=cancel_job, args=(job_id,),
+              disabled=job['status'] == 'committing')
+
+@page_fragment(run_every=INGEST_POLL_SECONDS)
+def sidebar_ingest_status(job_id: str):
+    """Status ringkas job ingest yang masih berjalan saat pengguna berada di halaman lain."""
+    job = get_job(job_id)
+    if job is None or job['status'] in TERMINAL_STATUSES:
+        st.rerun()
+    pct, text = _ingest_progress_text(job)
+    st.caption(f"⏳ Upload: {job['source']}")
+    st.progress(pct, text=text)
+
+def render_ingest_result(job: dict):
+    """Hasil akhir job ingest (sukses / gagal / dibatalkan) beserta laporannya."""
+    report = job['report']
+    if job['status'] == 'done':
+        st.progress(100, text=f"Selesai 100% dalam {report.get('total_seconds', 0):.2f} dtk")
+        st.success(f"✅ {job['message']}")
+        memory = report.get('memory')
+        if memory:
+            st.caption(f"💾 Memori dataset: {_format_bytes(memory['before_bytes'])} → {_format_bytes(memory['after_bytes'])} "
+                       f"({len(memory['category'])} kolom kategori)")
+        render_change_summary(report.get('changes'))
+        render_sniff_report(report)
+        render_batch_report(report)
+        render_header_mapping_report(report)
+        render_quality_report(report)
+        render_date_parsing_report(report)
+        df, _version = load_active_dataset()
+        if not df.empty:
+            with st.expander("🔍 Preview Data (10 baris pertama dari database aktif)", expanded=False):
+                st.dataframe(df.head(10).drop(columns=['STATUS_NORM'] + list(DATE_COLUMNS.values()), errors='ignore'), use_container_width=True, height=320)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("📊 Dashboard Utama", on_click=set_page, args=("dashboard",), use_container_width=True)
+        with col2:
+            st.button("📋 Rekapitulasi Data", on_click=set_page, args=("recap",), use_container_width=True)
+        with col3:
+            st.button("🔄 Upload Lagi", on_click=set_page, args=("upload",), use_container_width=True)
+    elif job['status'] == 'cancelled':
+        st.warning("⛔ Upload dibatalkan sebelum disimpan; database tidak berubah.")
+    else:
+        st.error(f"❌ Error: {job['message']}")
+        render_sniff_report(report)
+        render_batch_report(report)
+        render_header_mapping_report(report, expanded=True)
+    render_ingest_timings(report)
+
+def collect_ingest_result():
+    """
+    Pasang hasil job ingest yang sudah selesai ke sesi ini (sekali per job): isi database yang
+    di-commit job (dibaca balik seperti load_database, termasuk mode append) langsung mengisi cache
+    versi barunya. Cache versi lama tidak dihapus; entri itu tidak lagi terjangkau dan tergusur
+    oleh batas max_entries masing-masing.
+    """
+    job = get_job(st.session_state.get('ugb_ingest_job'))
+    if job is None or job['status'] != 'done' or st.session_state.get('ugb_ingest_applied') == job['id']:
+        return
+    st.session_state['ugb_ingest_applied'] = job['id']
+    committed = take_job_result(job['id'])
+    if committed is not None and job['dataset_version'] and not USE_GOOGLE_SHEETS:
+        try:
+            get_dataset_frames(job['dataset_version'], committed)
+        except Exception as me:
+            st.warning(f"Peringatan saat memasang data baru: {me}")
+    st.toast(f"✅ Data baru aktif: {job['rows']} baris dari {job['source']}")
+
+# ===== DATASET AKTIF (versi di disk) + CACHE TURUNAN PER VERSI =====
+# Semua turunan data (dataset bertipe, indeks koordinat, KPI, pivot, export, snapshot) dikunci
+# id versi dataset. Upload baru = versi baru = kunci baru; tidak ada st.cache_data.clear().
+@st.cache_resource(max_entries=DATASET_CACHE_VERSIONS, show_spinner=False)
+def get_dataset_frames(version: str, _df: Optional[pd.DataFrame] = None) -> dict:
+    """
+    Dataset bertipe + salinan ber-STATUS_NORM untuk satu versi, dipakai bersama semua sesi
+    (read-only; jangan diubah in-place). _df mengisi entri tanpa membaca CSV (hasil upload).
+    """
+    df = _df if _df is not None else load_database(DATABASE_PATH)
+    return {'df': df, 'df_ui': add_status_norm(df)}
+
+@profiled()
+def load_active_dataset():
+    """
+    Kembalikan (dataframe ber-STATUS_NORM, id versi) untuk versi dataset terbaru di disk.
+    Commit dari sesi lain / CLI langsung terlihat di rerun berikutnya.
+    """
+    version = get_dataset_version(DATABASE_PATH)
+    if USE_GOOGLE_SHEETS:
+        # Sheet bisa diedit langsung di luar aplikasi (versi tidak berubah): selalu baca ulang
+        return add_status_norm(load_database(DATABASE_PATH)), version
+    frames = get_dataset_frames(version)
+    # Versi dibaca sebelum & sesudah load: jika ada commit di tengah jalan, entri itu salah isi
+    latest = get_dataset_version(DATABASE_PATH)
+    if latest != version:
+        get_dataset_frames.clear(version)
+        version, frames = latest, get_dataset_frames(latest)
+    return frames['df_ui'], version
+
+def reconcile_filter_state(df_ui: pd.DataFrame, version: str):
+    """
+    Setelah versi dataset berganti, buang hanya pilihan filter yang tidak ada lagi di data
+    (pilihan yang masih valid dipertahankan, bukan reset semua filter).
+    """
+    if st.session_state.get('ugb_filter_version') == version:
+        return
+    st.session_state['ugb_filter_version'] = version
+    options = {
+        'UP3': set(df_ui['UP3'].dropna().astype(str)) if 'UP3' in df_ui.columns else set(),
+        'ULP': set(df_ui['ULP'].dropna().astype(str)) if 'ULP' in df_ui.columns else set(),
+        'STATUS': {'RUSAK', 'STAND BY', 'TERPASANG'},
+    }
+    for key in ('ugb_filter_state', 'temp_ugb_filter'):
+        state = st.session_state.get(key)
+        for col, val in (state or {}).items():
+            if val != 'Semua' and val not in options.get(col, ()):
+                state[col] = 'Semua'
+    for key in ('ugb_recap_filter_state', 'temp_ugb_recap_filter'):
+        state = st.session_state.get(key)
+        for col, vals in (state or {}).items():
+            state[col] = [v for v in vals if v in options.get(col, ())]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_kpis(version: str, filter_key: tuple, _filtered: pd.DataFrame) -> dict:
+    """KPI per (versi dataset, filter yang di-Apply)."""
+    return compute_kpis(_filtered)
+
+# ===== RIWAYAT PER KOORDINAT (dipakai tooltip peta & panel samping) =====
+@st.cache_resource(max_entries=3, show_spinner=False)
+def get_coordinate_history(version: str, _df: pd.DataFrame) -> dict:
+    """Indeks riwayat per koordinat + memo HTML, satu instance per versi dataset."""
+    from utils.map_view import new_coordinate_history
+    return new_coordinate_history(_df)
 
 # ===== HALAMAN DASHBOARD UTAMA =====
+@profiled()
 def page_dashboard():
     """Halaman dashboard utama: Slicer -> KPI Cards -> Peta (gaya DASH_INSPEKSI)"""
     st.header("📊 Dashboard Utama", divider="rainbow")
 
-    # Load data (prefer session)
-    if 'ugb_db' in st.session_state and isinstance(st.session_state['ugb_db'], pd.DataFrame) and not st.session_state['ugb_db'].empty:
-        df = st.session_state['ugb_db']
-    else:
-        df = load_database(DATABASE_PATH)
+    # Dataset versi aktif (sudah ber-STATUS_NORM, cache bersama per versi)
+    df_ui, dataset_version = load_active_dataset()
 
-    if df.empty:
+    if df_ui.empty:
         st.markdown(
             """
             <div style="text-align: center; padding: 80px 20px; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); 
@@ -305,12 +469,9 @@ def page_dashboard():
             st.button("📤 Upload Data Sekarang", on_click=set_page, args=("upload",), use_container_width=True)
         return
 
-    # Siapkan kolom STATUS yang sudah dinormalisasi
-    df_ui = df.copy()
-    df_ui['STATUS_NORM'] = df_ui['STATUS'].apply(normalize_status)
-
     # ===== FILTER SECTION (persis pola Apply/Reset) =====
     # Inisialisasi state
+    reconcile_filter_state(df_ui, dataset_version)
     if 'ugb_filter_state' not in st.session_state:
         st.session_state.ugb_filter_state = { 'UP3': 'Semua', 'ULP': 'Semua', 'STATUS': 'Semua' }
     if 'temp_ugb_filter' not in st.session_state:
@@ -319,8 +480,69 @@ def page_dashboard():
     # Opsi filter dari data (gunakan kolom yang tersedia)
     up3_opts = ['Semua'] + sorted([x for x in df_ui['UP3'].dropna().astype(str).unique()]) if 'UP3' in df_ui.columns else ['Semua']
     ulp_opts = ['Semua'] + sorted([x for x in df_ui['ULP'].dropna().astype(str).unique()]) if 'ULP' in df_ui.columns else ['Semua']
-    status_opts = ['Semua'] + ['RUSAK', 'STAND BY', 'TERPASANG']
+    dashboard_filter_bar(up3_opts, ulp_opts)
 
+    # Terapkan filter ke data
+    f = st.session_state.ugb_filter_state
+    filtered = apply_filters(df_ui, f)
+
+    if len(filtered) != len(df_ui):
+        st.info(f"📊 Menampilkan {len(filtered)} dari {len(df_ui)} total data berdasarkan filter")
+
+    # Tampilan default (UP3 saja / Semua) dilayani dari snapshot pra-render versi ini bila sudah ada
+    snapshot = None
+    if f.get('ULP', 'Semua') == 'Semua' and f.get('STATUS', 'Semua') == 'Semua':
+        snapshot = get_snapshot(dataset_version, f.get('UP3', SNAPSHOT_ALL))
+    if snapshot is None:
+        # Versi dari CLI / sebelum fitur ini: render di latar belakang (sekali per versi)
+        schedule_dashboard_snapshots(df_ui, dataset_version)
+
+    # ===== KPI CARDS (gaya INSPEKSI) =====
+    filter_key = tuple((k, str(f.get(k, 'Semua'))) for k in ('UP3', 'ULP', 'STATUS'))
+    render_kpi_cards(snapshot['kpi'] if snapshot else get_kpis(dataset_version, filter_key, filtered))
+
+    st.markdown("""
+        <hr style="height:3px;border:none;background-color:#5e5e5e;margin:10px 0;"/>
+    """, unsafe_allow_html=True)
+
+    # ===== PETA INTERAKTIF (Folium) =====
+    st.markdown("### 🗺️ Peta Tagging UGB")
+
+    if filtered.empty:
+        st.warning("⚠️ Tidak ada data yang sesuai dengan filter")
+        return
+
+    dashboard_map_section(dataset_version, df_ui, filtered.index, f, snapshot)
+
+    # ===== TREN STATUS PER UPLOAD (store agregat, tanpa memuat snapshot lama) =====
+    dashboard_trend_section(f)
+
+@page_fragment
+def dashboard_trend_section(filters: dict):
+    """Garis tren RUSAK / STAND BY / TERPASANG dari riwayat status ringkas (utils.status_history)."""
+    history = load_status_history()
+    n_versions = history['DATASET_VERSION'].nunique()
+    st.markdown("### 📈 Tren Status per Upload")
+    if n_versions < 2:
+        st.caption("Tren tampil setelah minimal dua upload tercatat.")
+        return
+    metric = st.radio("Nilai", ["Jumlah unit", "Total kapasitas (kVA)"], horizontal=True, key="ugb_trend_metric",
+                      label_visibility="collapsed")
+    value = 'COUNT' if metric == "Jumlah unit" else 'CAPACITY'
+    trend = status_trend(history, filters, value)
+    colors = {k: '#%02x%02x%02x' % tuple(v) for k, v in MAP_CONFIG['deck_colors'].items()}
+    import plotly.express as px
+    fig = px.line(trend, x='RECORDED_AT', y=value, color='STATUS_NORM', markers=True,
+                  color_discrete_map=colors, hover_data=['DATASET_VERSION'],
+                  labels={'RECORDED_AT': 'Waktu upload', value: metric, 'STATUS_NORM': 'Status'})
+    fig.update_layout(height=340, margin=dict(l=10, r=10, t=10, b=10), legend_title_text='')
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{n_versions} upload tercatat • filter slicer diterapkan ke agregat")
+
+@page_fragment
+def dashboard_filter_bar(up3_opts: list, ulp_opts: list):
+    """Slicer dashboard. Memilih opsi hanya menjalankan ulang fragment ini; Apply/Reset menjalankan ulang halaman."""
+    status_opts = ['Semua'] + ['RUSAK', 'STAND BY', 'TERPASANG']
     with st.container():
         # Reorder to match DASH_INSPEKSI: ULP, UP3, STATUS | Apply | Reset
         col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1, 1])
@@ -351,496 +573,279 @@ def page_dashboard():
                 st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
-    # Terapkan filter ke data
-    f = st.session_state.ugb_filter_state
-    filtered = df_ui.copy()
-    if f['UP3'] != 'Semua' and 'UP3' in filtered.columns:
-        filtered = filtered[filtered['UP3'] == f['UP3']]
-    if f['ULP'] != 'Semua' and 'ULP' in filtered.columns:
-        filtered = filtered[filtered['ULP'] == f['ULP']]
-    if f['STATUS'] != 'Semua':
-        filtered = filtered[filtered['STATUS_NORM'] == f['STATUS']]
-
-    if len(filtered) != len(df_ui):
-        st.info(f"📊 Menampilkan {len(filtered)} dari {len(df_ui)} total data berdasarkan filter")
-
-    # ===== KPI CARDS (gaya INSPEKSI) =====
-    def count_nonempty(series):
-        return series.astype(str).str.strip().replace({'None': ''}).ne('').sum()
-
-    total_ugb = count_nonempty(filtered['PENOMORAN UGB BARU']) if 'PENOMORAN UGB BARU' in filtered.columns else len(filtered)
-    domain_mask = filtered['STATUS_NORM'].isin(['RUSAK', 'STAND BY', 'TERPASANG'])
-    denom = int(domain_mask.sum()) if 'STATUS_NORM' in filtered.columns else 0
-    def pct(val):
-        return (val/denom*100) if denom > 0 else 0
-
-    rusak = int((filtered['STATUS_NORM'] == 'RUSAK').sum())
-    stand_by = int((filtered['STATUS_NORM'] == 'STAND BY').sum())
-    terpasang = int((filtered['STATUS_NORM'] == 'TERPASANG').sum())
-
-    pct_rusak = pct(rusak)
-    pct_standby = pct(stand_by)
-    pct_terpasang = pct(terpasang)
-
+def render_kpi_cards(kpi: dict):
+    """Kartu KPI; hanya bergantung pada hasil compute_kpis dari filter yang sudah di-Apply."""
     c1, c2, c3, c4 = st.columns(4)
     with c1:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-number color-primary">{total_ugb:,}</div>
+            <div class="metric-number color-primary">{kpi['total']:,}</div>
             <div class="metric-label">TOTAL UGB</div>
         </div>
         """, unsafe_allow_html=True)
     with c2:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-number color-danger">{pct_rusak:.1f}%</div>
+            <div class="metric-number color-danger">{kpi['pct_rusak']:.1f}%</div>
             <div class="metric-label">% UGB RUSAK</div>
         </div>
         """, unsafe_allow_html=True)
     with c3:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-number color-warning">{pct_standby:.1f}%</div>
+            <div class="metric-number color-warning">{kpi['pct_standby']:.1f}%</div>
             <div class="metric-label">% UGB STAND BY</div>
         </div>
         """, unsafe_allow_html=True)
     with c4:
         st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-number color-success">{pct_terpasang:.1f}%</div>
+            <div class="metric-number color-success">{kpi['pct_terpasang']:.1f}%</div>
             <div class="metric-label">% UGB TERPASANG</div>
         </div>
         """, unsafe_allow_html=True)
 
-    st.markdown("""
-        <hr style="height:3px;border:none;background-color:#5e5e5e;margin:10px 0;"/>
-    """, unsafe_allow_html=True)
+def render_side_panel(history: dict, coord):
+    """Panel riwayat koordinat terpilih (HTML dari memo per versi dataset) + pencarian UGB terdekat."""
+    from utils.map_view import coordinate_history_html
+    st.markdown(coordinate_history_html(history, coord, 'panel'), unsafe_allow_html=True)
+    render_nearby_search(history, coord)
+
+def render_nearby_search(history: dict, coord):
+    """UGB di sekitar koordinat terpilih (mis. STAND BY dalam 5 km dari unit RUSAK) untuk rencana penggantian."""
+    from utils.map_view import find_nearby, nearby_options
+    options = nearby_options(history)
+    with st.expander("🔎 Cari UGB Terdekat", expanded=True):
+        mode = st.radio("Cari", ['radius', 'k'], horizontal=True, key="ugb_nearby_mode",
+                        format_func=lambda m: "Dalam radius" if m == 'radius' else "K terdekat")
+        c1, c2 = st.columns(2)
+        with c1:
+            radius_km = st.number_input("Radius maks (km)" if mode == 'k' else "Radius (km)", min_value=0.1, max_value=500.0, value=NEARBY_DEFAULT_RADIUS_KM,
+                                        step=0.5, key="ugb_nearby_radius")
+        with c2:
+            k = st.number_input("Jumlah (k)", min_value=1, max_value=NEARBY_MAX_RESULTS, value=NEARBY_DEFAULT_K,
+                                step=1, key="ugb_nearby_k", disabled=mode != 'k')
+        status = st.multiselect("Status", options.get('STATUS', []), key="ugb_nearby_status",
+                                default=[s for s in NEARBY_DEFAULT_STATUS if s in options.get('STATUS', [])])
+        c3, c4 = st.columns(2)
+        with c3:
+            up3 = st.multiselect("UP3", options.get('UP3', []), key="ugb_nearby_up3", placeholder="Semua")
+        with c4:
+            ulp = st.multiselect("ULP", options.get('ULP', []), key="ugb_nearby_ulp", placeholder="Semua")
+        latest_only = st.checkbox("Hanya unit terkini per koordinat", value=True, key="ugb_nearby_latest")
+        # Mode k: radius menjadi batas jarak maksimum
+        result, info = find_nearby(history, coord, {'STATUS': status, 'UP3': up3, 'ULP': ulp},
+                                   radius_km=radius_km, k=int(k) if mode == 'k' else None, latest_only=latest_only)
+        if result.empty:
+            st.info(f"Tidak ada UGB yang cocok dalam {radius_km:g} km")
+            return
+        shown = result.head(NEARBY_MAX_RESULTS)
+        more = f" (ditampilkan {len(shown):,} terdekat)" if len(result) > len(shown) else ""
+        found = (f"{info['found']:,} UGB terdekat (terjauh {result['JARAK (KM)'].max():.2f} km)" if mode == 'k'
+                 else f"{info['found']:,} UGB dalam {radius_km:g} km")
+        st.caption(f"{found}{more} • {info['seconds'] * 1000:.1f} ms")
+        st.dataframe(shown, use_container_width=True, hide_index=True, height=260)
+
+def render_snapshot_map(snapshot: dict, map_height: int):
+    """Peta pra-render (HTML statis) + unduhan laporan offline; tanpa panel riwayat."""
+    with span('snapshot peta', rows=snapshot['markers']):
+        if hasattr(st, 'iframe'):
+            st.iframe(read_snapshot_html(snapshot['path']), height=map_height)
+        else:  # Streamlit lama tanpa st.iframe
+            import streamlit.components.v1 as components
+            components.html(read_snapshot_html(snapshot['path']), height=map_height)
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        st.success(f"⚡ Snapshot pra-render • {snapshot['markers']:,} titik • dibuat {snapshot['rendered_at'].replace('T', ' ')}")
+        st.caption("Pilih mode peta lain untuk klik marker dan panel riwayat.")
+    with c2:
+        st.download_button(
+            "⬇️ Laporan HTML",
+            data=snapshot_report_html(snapshot).encode('utf-8'),
+            file_name=f"UGB_Dashboard_{snapshot['scope']}_{snapshot['version']}.html",
+            mime="text/html",
+            on_click="ignore",
+            use_container_width=True,
+            key="ugb_snapshot_download",
+        )
 
-    # ===== PETA INTERAKTIF (Folium) =====
-    st.markdown("### 🗺️ Peta Tagging UGB")
+@page_fragment
+def dashboard_map_section(dataset_version: str, df_ui: pd.DataFrame, filtered_index: pd.Index, filters: dict,
+                          snapshot: Optional[dict] = None):
+    """Peta + panel samping. Klik marker hanya menjalankan ulang fragment ini, bukan slicer/KPI."""
     map_height = 500  # fixed height requested
-
-    if filtered.empty:
-        st.warning("⚠️ Tidak ada data yang sesuai dengan filter")
+    # Pilihan mesin peta; peta interaktif jadi pilihan awal (WebGL bila koordinat banyak), snapshot
+    # pra-render ditawarkan sebagai opsi cepat dan baru jadi pilihan awal untuk data sangat besar
+    engines = list(MAP_ENGINES) + (['snapshot'] if snapshot else [])
+    if snapshot and len(df_ui) > SNAPSHOT_AUTO_THRESHOLD:
+        default_engine = 'snapshot'
+    else:
+        history = get_coordinate_history(dataset_version, df_ui)
+        default_engine = 'deck' if len(history['slices']) > MAP_ENGINE_AUTO_THRESHOLD else 'folium'
+    engine = st.radio("Mode peta", engines, index=engines.index(default_engine),
+                      format_func=lambda e: MAP_ENGINES.get(e, '⚡ Snapshot (cepat)'),
+                      horizontal=True, key="ugb_map_engine", label_visibility="collapsed")
+    if engine == 'snapshot':
+        render_snapshot_map(snapshot, map_height)
         return
-
-    map_center = MAP_CONFIG['default_center'] if 'MAP_CONFIG' in globals() else [-5.3971, 105.2663]
-    m = folium.Map(location=map_center, zoom_start=MAP_CONFIG.get('default_zoom', 9) if 'MAP_CONFIG' in globals() else 9, tiles='OpenStreetMap')
-
-    # Kelompokkan baris berdasarkan koordinat (dibulatkan 6 desimal agar konsisten)
-    from collections import defaultdict
-    import re
-    groups = defaultdict(list)
-    for _, row in filtered.iterrows():
-        lat, lon = parse_coordinates(str(row.get('KOORDINAT TAGGING', '')))
-        if lat is None or lon is None:
-            continue
-        key = (round(float(lat), 6), round(float(lon), 6))
-        groups[key].append(row)
-
-    def _peno_suffix(s: str) -> int:
-        m = re.search(r'(\d+)$', str(s))
-        return int(m.group(1)) if m else 0
-
-    def _status_color_for_group(rows) -> str:
-        # Prioritas warna: RUSAK > TERPASANG > STAND BY
-        statuses = {str(r.get('STATUS_NORM','')) for r in rows}
-        if 'RUSAK' in statuses: return 'red'
-        if 'TERPASANG' in statuses: return 'orange'
-        return 'green'
-
-    def _build_tooltip_html(rows) -> str:
-        # Urutkan untuk membaca pergerakan: tanggal -> suffix penomoran -> NO
-        dfc = pd.DataFrame(rows)
-        if 'TANGGAL TERPASANG' in dfc.columns:
-            try:
-                dfc['_ts_'] = pd.to_datetime(dfc['TANGGAL TERPASANG'], errors='coerce')
-            except Exception:
-                dfc['_ts_'] = pd.NaT
+    # Indeks riwayat per koordinat (dibangun sekali per versi dataset, hanya bila peta live dipakai)
+    history = get_coordinate_history(dataset_version, df_ui)
+    # Stack peta (folium, streamlit_folium, pydeck) baru di-import saat peta live pertama kali dipakai
+    from streamlit_folium import st_folium
+    from utils.map_view import build_folium_map, build_deck_map, picked_coordinate
+    from utils.map_view import new_base_map, build_viewport_layer, build_choropleth_layer
+    if engine == 'deck':
+        m, marker_count = build_deck_map(history, filtered_index)
+    elif engine == 'viewport':
+        # Bounds terakhir dari peta (disalin st_folium ke session_state lewat key)
+        vp_state = st.session_state.get('ugb_vp_map') or {}
+        vp_zoom = vp_state.get('zoom') or MAP_CONFIG.get('default_zoom', 9)
+        m = new_base_map()
+        if vp_zoom <= CHOROPLETH_MAX_ZOOM:
+            # Tampilan jauh: choropleth dari agregat grid yang dibangun sekali per versi dataset
+            vp_layer, vp_info = build_choropleth_layer(history, filters, vp_state.get('bounds'), vp_zoom)
         else:
-            dfc['_ts_'] = pd.NaT
-        dfc['_peno_'] = dfc['PENOMORAN UGB BARU'].apply(_peno_suffix) if 'PENOMORAN UGB BARU' in dfc.columns else 0
-        dfc['_no_'] = dfc['NO'] if 'NO' in dfc.columns else range(1, len(dfc)+1)
-        dfc = dfc.sort_values(by=['_ts_', '_peno_', '_no_'], ascending=[True, True, True])
-
-        dot_color = { 'STAND BY': '#28a745', 'RUSAK': '#dc3545', 'TERPASANG': '#ffc107' }
-        arrow_up = '&#8593;'; arrow_down = '&#8595;'
-        items = []
-        prev = None
-        for _, r in dfc.iterrows():
-            status = str(r.get('STATUS_NORM',''))
-            pn = str(r.get('PENOMORAN UGB BARU','-'))
-            sn = str(r.get('NO SERI','-'))
-            cap_val = r.get('KAPASITAS','-')
-            cap_str = str(cap_val)
-            if prev is not None:
-                try:
-                    now = float(str(cap_val).replace(',','.'))
-                    prv = float(str(prev.get('KAPASITAS','')).replace(',','.'))
-                    if pd.notna(now) and pd.notna(prv):
-                        if now > prv: cap_str = f"{arrow_up} {cap_str}"
-                        elif now < prv: cap_str = f"{arrow_down} {cap_str}"
-                except Exception:
-                    pass
-            items.append(
-                f"""
-                <div style='margin:6px 0;'>
-                  <span style='display:inline-block;width:8px;height:8px;border-radius:50%;background:{dot_color.get(status,'#6c757d')};margin-right:6px;vertical-align:middle'></span>
-                  <span style='font-weight:700;'>{pn}</span>
-                  <div style='margin-left:14px;color:#333'>Capacity: <b>{cap_str}</b></div>
-                  <div style='margin-left:14px;color:#333'>No Seri: {sn}</div>
-                </div>
-                """
-            )
-            prev = r
-        html = """
-        <div style='font-family: Inter, Roboto, Arial; font-size:12px; max-width: 280px;'>
-          <div style='font-weight:800; margin-bottom:6px; color:#1f4e79;'>UGB pada Koordinat Ini</div>
-          {}
-        </div>
-        """.format("".join(items))
-        return html
-
-    marker_count = 0
-    for (lat, lon), rows in groups.items():
-        marker_count += 1
-        color = _status_color_for_group(rows)
-        tooltip_html = _build_tooltip_html(rows)
-        # Popup ringkas: tampilkan entri terakhir sebagai ringkasan
-        try:
-            _df_last = pd.DataFrame(rows).copy()
-            if 'NO' in _df_last.columns:
-                _df_last = _df_last.sort_values(by=['NO'])
-            last = _df_last.iloc[-1]
-        except Exception:
-            last = rows[-1]
-        nomor = last.get('PENOMORAN UGB BARU','-')
-        kapasitas = last.get('KAPASITAS','-')
-        ulp = last.get('ULP','-')
-        status = last.get('STATUS_NORM','')
-        popup_text = f"""
-        <div style=\"font-family: Arial; width: 260px;\">
-            <h4 style=\"color: #1f4e79; margin-bottom: 10px;\">🔧 {nomor}</h4>
-            <hr style=\"margin: 10px 0;\">
-            <p><b>⚡ Kapasitas:</b> {kapasitas}</p>
-            <p><b>📊 Status:</b> <span>{status}</span></p>
-            <p><b>🏪 ULP:</b> {ulp}</p>
-        </div>
-        """
-        folium.Marker(
-            location=[lat, lon],
-            popup=folium.Popup(popup_text, max_width=300),
-            icon=folium.Icon(color=color, icon='bolt', prefix='fa'),
-            tooltip=folium.Tooltip(tooltip_html, sticky=True, direction='top')
-        ).add_to(m)
+            vp_layer, vp_info = build_viewport_layer(history, filtered_index, vp_state.get('bounds'))
+        marker_count = vp_info['shown']
+    else:
+        m, marker_count = build_folium_map(history, filtered_index)
 
     # State untuk menentukan apakah panel kanan ditampilkan
     if 'ugb_show_side_panel' not in st.session_state:
         st.session_state.ugb_show_side_panel = False
     want_panel = bool(st.session_state.ugb_show_side_panel)
 
-    # Helper: cari semua entri pada koordinat yang sama (klik)
-    def _find_cluster(df_source: pd.DataFrame, map_state_dict):
+    # Helper: cari koordinat terpilih (klik) di indeks riwayat
+    def _find_cluster(map_state_dict):
         # Ambil klik terakhir dari map_state; jika tidak ada, coba dari session_state
         lc = None
         if map_state_dict and isinstance(map_state_dict, dict):
-            lc = map_state_dict.get('last_clicked')
+            # Klik marker tercatat di last_object_clicked (posisi persis marker)
+            lc = map_state_dict.get('last_object_clicked') or map_state_dict.get('last_clicked')
         if not lc:
             lc = st.session_state.get('ugb_last_clicked')
         else:
             # simpan agar bertahan saat rerun
             st.session_state['ugb_last_clicked'] = lc
         if not lc:
-            return None, pd.DataFrame()
+            return None
         lat = lc.get('lat'); lon = lc.get('lng')
         if lat is None or lon is None:
-            return None, pd.DataFrame()
-        eps = 1e-6
-        def same_coord(r):
-            a,b = parse_coordinates(str(r.get('KOORDINAT TAGGING','')))
-            if a is None or b is None:
-                return False
-            return abs(a - float(lat)) < eps and abs(b - float(lon)) < eps
-        msk = df_source.apply(same_coord, axis=1)
-        return (float(lat), float(lon)), df_source[msk].copy()
+            return None
+        coord = (round(float(lat), 6), round(float(lon), 6))
+        return coord if coord in history['slices'] else None
+
+    def _render_map():
+        if engine == 'viewport':
+            # Peta dasar tetap (hash JS sama) -> hanya FeatureGroup yang dikirim ulang saat geser/zoom.
+            # Setelah layout berganti (panel buka/tutup) komponen dipasang ulang: pulihkan posisi terakhir.
+            restore = st.session_state.pop('ugb_vp_restore', False)
+            center = vp_state.get('center') if restore else None
+            with span('st_folium (viewport)', rows=marker_count):
+                state = st_folium(
+                    m, key="ugb_vp_map", height=map_height, use_container_width=True,
+                    feature_group_to_add=vp_layer,
+                    center=(center['lat'], center['lng']) if center else None,
+                    zoom=vp_state.get('zoom') if restore else None,
+                    returned_objects=["last_clicked", "last_object_clicked", "bounds", "zoom", "center"],
+                )
+            if 'cell_deg' in vp_info:
+                st.success(f"🟧 {vp_info['in_view']:,} entri UGB di area terlihat • {vp_info['shown']:,} sel grid {vp_info['cell_deg']}° (perbesar untuk marker)")
+            else:
+                unit = "sel agregasi" if vp_info['aggregated'] else "marker"
+                st.success(f"🧭 {vp_info['in_view']:,} titik di area terlihat • {vp_info['shown']:,} {unit} dikirim")
+            return state
+        if marker_count > 0 and engine == 'deck':
+            if is_active():
+                with span('ukur payload peta'):
+                    record_payload('peta deck.gl (JSON)', m.to_json())
+            with span('st.pydeck_chart', rows=marker_count):
+                state = st.pydeck_chart(m, height=map_height, on_select="rerun", selection_mode="single-object", key="ugb_deck_map")
+            st.success(f"🗺️ Menampilkan {marker_count:,} titik UGB di peta (WebGL)")
+            # Samakan bentuk dengan state st_folium agar logika panel dipakai bersama
+            coord = picked_coordinate(state.get('selection') if state else None)
+            return {'last_clicked': {'lat': coord[0], 'lng': coord[1]}} if coord else None
+        if marker_count > 0:
+            if is_active():
+                # Render ulang hanya untuk mengukur ukuran HTML peta (overhead profiler, span terpisah)
+                with span('ukur payload peta'):
+                    record_payload('peta folium (HTML)', m.get_root().render())
+            with span('st_folium', rows=marker_count):
+                try:
+                    state = st_folium(m, height=map_height, returned_objects=["last_clicked", "last_object_clicked"], use_container_width=True)
+                except TypeError:
+                    state = st_folium(m, height=map_height, returned_objects=["last_clicked", "last_object_clicked"])
+            record_payload('st_folium: state kembali', state)
+            st.success(f"🗺️ Menampilkan {marker_count} marker UGB di peta")
+            return state
+        st.warning("⚠️ Tidak ada koordinat yang valid untuk ditampilkan di peta")
+        return None
 
     # Render peta dan panel adaptif
-    map_state = None
     if want_panel:
         col_map, col_side = st.columns([7,5])
         with col_map:
-            if marker_count > 0:
-                try:
-                    map_state = st_folium(m, height=map_height, returned_objects=["last_clicked"], use_container_width=True)
-                except TypeError:
-                    map_state = st_folium(m, height=map_height, returned_objects=["last_clicked"]) 
-                st.success(f"🗺️ Menampilkan {marker_count} marker UGB di peta")
-            else:
-                st.warning("⚠️ Tidak ada koordinat yang valid untuk ditampilkan di peta")
+            map_state = _render_map()
         with col_side:
-            coord, cluster_df = _find_cluster(filtered, map_state)
-            has_cluster = cluster_df is not None and not cluster_df.empty
-            if not has_cluster:
+            coord = _find_cluster(map_state)
+            if coord is None:
                 # Jika panel aktif tapi tidak ada pilihan, matikan dan rerun agar map full width
                 st.session_state.ugb_show_side_panel = False
-                st.rerun()
-            # Jika ada, render panel
-            if has_cluster:
-                # Urutkan untuk memudahkan membaca pergerakan
-                dfc = cluster_df.copy()
-                if 'TANGGAL TERPASANG' in dfc.columns:
-                    try:
-                        dfc['_ts_'] = pd.to_datetime(dfc['TANGGAL TERPASANG'], errors='coerce')
-                    except Exception:
-                        dfc['_ts_'] = pd.NaT
-                else:
-                    dfc['_ts_'] = pd.NaT
-                import re
-                def peno_key(s):
-                    m = re.search(r'(\d+)$', str(s))
-                    return int(m.group(1)) if m else 0
-                if 'PENOMORAN UGB BARU' in dfc.columns:
-                    dfc['_peno_'] = dfc['PENOMORAN UGB BARU'].apply(peno_key)
-                else:
-                    dfc['_peno_'] = 0
-                dfc['_no_'] = dfc['NO'] if 'NO' in dfc.columns else range(1, len(dfc)+1)
-                dfc = dfc.sort_values(by=['_ts_', '_peno_', '_no_'], ascending=[True, True, True])
-
-                # Bangun HTML panel
-                dot_color = { 'STAND BY': '#28a745', 'RUSAK': '#dc3545', 'TERPASANG': '#ffc107' }
-                items = []
-                prev = None
-                arrow_up = '&#8593;'; arrow_down = '&#8595;'
-                for _, r in dfc.iterrows():
-                    status = str(r.get('STATUS_NORM',''))
-                    pn = str(r.get('PENOMORAN UGB BARU','-'))
-                    sn = str(r.get('NO SERI','-'))
-                    cap_val = r.get('KAPASITAS','-')
-                    cap_str = str(cap_val)
-                    if prev is not None:
-                        try:
-                            now = float(str(cap_val).replace(',','.'))
-                            prv = float(str(prev.get('KAPASITAS','')).replace(',','.'))
-                            if pd.notna(now) and pd.notna(prv):
-                                if now > prv: cap_str = f"{arrow_up} {cap_str}"
-                                elif now < prv: cap_str = f"{arrow_down} {cap_str}"
-                        except Exception:
-                            pass
-                    def diff(label, val, prev_val):
-                        if prev is not None and str(val) != str(prev_val):
-                            return f'<div><b>{label}:</b> <span style="color:#ff8c00">{val}</span> <span style="color:#888">(sebelumnya: {prev_val})</span></div>'
-                        return f'<div><b>{label}:</b> {val}</div>'
-                    row_html = f'''
-                    <div class="tl-item">
-                      <div class="tl-dot" style="background:{dot_color.get(status,'#6c757d')}"></div>
-                      <div class="tl-content">
-                        {diff('UGB', pn, prev.get('PENOMORAN UGB BARU','-') if prev is not None else pn)}
-                        {diff('Capacity', cap_str, str(prev.get('KAPASITAS','-')) if prev is not None else cap_str)}
-                        {diff('No Seri', sn, prev.get('NO SERI','-') if prev is not None else sn)}
-                      </div>
-                    </div>
-                    '''
-                    items.append(row_html)
-                    prev = r
-
-                koor = f"{coord[0]:.6f}, {coord[1]:.6f}" if coord else '-'
-                panel_css = """
-                <style>
-                .side-panel { background:rgba(255,255,255,0.92); color:#222; border-radius:12px; box-shadow:0 6px 24px rgba(0,0,0,0.15); padding:16px 18px; border-left:4px solid #ff8c00; backdrop-filter: blur(2px); }
-                .side-title { font-weight:800; font-size:18px; margin:0 0 8px 0; }
-                .side-sub { font-size:12px; color:#555; margin-bottom:10px; }
-                .tl-item { position:relative; padding-left:18px; margin:10px 0; }
-                .tl-item .tl-dot { position:absolute; left:0; top:6px; width:8px; height:8px; border-radius:50%; }
-                .tl-content { background:rgba(255,140,0,0.06); border-left:2px solid #ff8c00; padding:8px 10px; border-radius:6px; }
-                </style>
-                """
-                st.markdown(panel_css, unsafe_allow_html=True)
-                st.markdown(f"""
-                <div class=side-panel>
-                  <div class=side-title>Detail & Ringkasan di Koordinat</div>
-                  <div class=side-sub>Koordinat: {koor} • Total entri: <b>{len(dfc)}</b></div>
-                  {''.join(items)}
-                </div>
-                """, unsafe_allow_html=True)
+                st.session_state['ugb_vp_restore'] = True
+                rerun_fragment()
+            render_side_panel(history, coord)
     else:
         # Full width map (tidak ada panel)
-        if marker_count > 0:
-            try:
-                map_state = st_folium(m, height=map_height, returned_objects=["last_clicked"], use_container_width=True)
-            except TypeError:
-                map_state = st_folium(m, height=map_height, returned_objects=["last_clicked"]) 
-            st.success(f"🗺️ Menampilkan {marker_count} marker UGB di peta")
-        else:
-            st.warning("⚠️ Tidak ada koordinat yang valid untuk ditampilkan di peta")
-        # Cek apakah ada cluster terpilih; jika ya, aktifkan panel dan rerun agar layout dua kolom
-        coord, cluster_df = _find_cluster(filtered, map_state)
-        if cluster_df is not None and not cluster_df.empty:
-            # simpan klik ke session lalu aktifkan panel dan rerun
-            if coord:
-                st.session_state['ugb_last_clicked'] = { 'lat': coord[0], 'lng': coord[1] }
+        map_state = _render_map()
+        # Cek apakah ada koordinat terpilih; jika ya, aktifkan panel dan rerun agar layout dua kolom
+        coord = _find_cluster(map_state)
+        if coord is not None:
+            st.session_state['ugb_last_clicked'] = { 'lat': coord[0], 'lng': coord[1] }
             st.session_state.ugb_show_side_panel = True
-            st.rerun()
-            # Urutkan untuk memudahkan membaca pergerakan
-            dfc = cluster_df.copy()
-            # Key urut: TANGGAL TERPASANG (jika ada) -> numeric suffix penomoran -> NO
-            if 'TANGGAL TERPASANG' in dfc.columns:
-                try:
-                    dfc['_ts_'] = pd.to_datetime(dfc['TANGGAL TERPASANG'], errors='coerce')
-                except Exception:
-                    dfc['_ts_'] = pd.NaT
-            else:
-                dfc['_ts_'] = pd.NaT
-            import re
-            def peno_key(s):
-                m = re.search(r'(\d+)$', str(s))
-                return int(m.group(1)) if m else 0
-            if 'PENOMORAN UGB BARU' in dfc.columns:
-                dfc['_peno_'] = dfc['PENOMORAN UGB BARU'].apply(peno_key)
-            else:
-                dfc['_peno_'] = 0
-            dfc['_no_'] = dfc['NO'] if 'NO' in dfc.columns else range(1, len(dfc)+1)
-            dfc = dfc.sort_values(by=['_ts_', '_peno_', '_no_'], ascending=[True, True, True])
-
-            # Bangun HTML panel
-            dot_color = { 'STAND BY': '#28a745', 'RUSAK': '#dc3545', 'TERPASANG': '#ffc107' }
-            items = []
-            prev = None
-            arrow_up = '&#8593;'; arrow_down = '&#8595;'
-            for _, r in dfc.iterrows():
-                status = str(r.get('STATUS_NORM',''))
-                pn = str(r.get('PENOMORAN UGB BARU','-'))
-                sn = str(r.get('NO SERI','-'))
-                cap_val = r.get('KAPASITAS','-')
-                cap_str = str(cap_val)
-                # panah naik/turun untuk kapasitas
-                if prev is not None:
-                    try:
-                        now = float(str(cap_val).replace(',','.'))
-                        prv = float(str(prev.get('KAPASITAS','')).replace(',','.'))
-                        if pd.notna(now) and pd.notna(prv):
-                            if now > prv: cap_str = f"{arrow_up} {cap_str}"
-                            elif now < prv: cap_str = f"{arrow_down} {cap_str}"
-                    except Exception:
-                        pass
-                def diff(label, val, prev_val):
-                    if prev is not None and str(val) != str(prev_val):
-                        return f'<div><b>{label}:</b> <span style="color:#ff8c00">{val}</span> <span style="color:#888">(sebelumnya: {prev_val})</span></div>'
-                    return f'<div><b>{label}:</b> {val}</div>'
-                row_html = f'''
-                <div class="tl-item">
-                  <div class="tl-dot" style="background:{dot_color.get(status,'#6c757d')}"></div>
-                  <div class="tl-content">
-                    {diff('UGB', pn, prev.get('PENOMORAN UGB BARU','-') if prev is not None else pn)}
-                    {diff('Capacity', cap_str, str(prev.get('KAPASITAS','-')) if prev is not None else cap_str)}
-                    {diff('No Seri', sn, prev.get('NO SERI','-') if prev is not None else sn)}
-                  </div>
-                </div>
-                '''
-                items.append(row_html)
-                prev = r
-
-            koor = f"{coord[0]:.6f}, {coord[1]:.6f}" if coord else '-'
-            panel_css = """
-            <style>
-            .side-panel { background:rgba(255,255,255,0.92); color:#222; border-radius:12px; box-shadow:0 6px 24px rgba(0,0,0,0.15); padding:16px 18px; border-left:4px solid #ff8c00; backdrop-filter: blur(2px); }
-            .side-title { font-weight:800; font-size:18px; margin:0 0 8px 0; }
-            .side-sub { font-size:12px; color:#555; margin-bottom:10px; }
-            .tl-item { position:relative; padding-left:18px; margin:10px 0; }
-            .tl-item .tl-dot { position:absolute; left:0; top:6px; width:8px; height:8px; border-radius:50%; }
-            .tl-content { background:rgba(255,140,0,0.06); border-left:2px solid #ff8c00; padding:8px 10px; border-radius:6px; }
-            </style>
-            """
-            st.markdown(panel_css, unsafe_allow_html=True)
-            st.markdown(f"""
-            <div class=side-panel>
-              <div class=side-title>Detail & Ringkasan di Koordinat</div>
-              <div class=side-sub>Koordinat: {koor} • Total entri: <b>{len(dfc)}</b></div>
-              {''.join(items)}
-            </div>
-            """, unsafe_allow_html=True)
+            st.session_state['ugb_vp_restore'] = True
+            rerun_fragment()
         else:
             # Tidak menampilkan apa pun saat belum ada koordinat yang dipilih
             st.write("")
 
-    # Selesai - tidak menampilkan chart lain agar fokus pada peta sesuai brief
-
 # ===== HALAMAN REKAPITULASI DATA =====
+@profiled()
 def page_recap():
     """Halaman rekapitulasi data (gaya INSPEKSI): Slicer -> Apply/Reset/Export -> Tabel penuh"""
     st.header("📋 Rekapitulasi Data", divider="rainbow")
 
-    # Load data (prefer session)
-    if 'ugb_db' in st.session_state and isinstance(st.session_state['ugb_db'], pd.DataFrame) and not st.session_state['ugb_db'].empty:
-        df = st.session_state['ugb_db']
-    else:
-        df = load_database(DATABASE_PATH)
-    if df.empty:
+    # Dataset versi aktif (kolom STATUS_NORM untuk filter runtime, tidak disimpan)
+    df_ui, dataset_version = load_active_dataset()
+    if df_ui.empty:
         st.warning("⚠️ Belum ada data. Silakan upload data terlebih dahulu.")
         return
 
-    # Siapkan kolom STATUS normalisasi untuk filter runtime (tidak disimpan)
-    df_ui = df.copy()
-    if 'STATUS' in df_ui.columns:
-        df_ui['STATUS_NORM'] = df_ui['STATUS'].apply(normalize_status)
-
     # ===== FILTER SECTION (multi-select + Apply/Reset seperti INSPEKSI) =====
+    reconcile_filter_state(df_ui, dataset_version)
     if 'ugb_recap_filter_state' not in st.session_state:
         st.session_state.ugb_recap_filter_state = {'UP3': [], 'ULP': [], 'STATUS': []}
     if 'temp_ugb_recap_filter' not in st.session_state:
         st.session_state.temp_ugb_recap_filter = st.session_state.ugb_recap_filter_state.copy()
 
-    # Opsi filter
+    # Opsi filter (ULP per UP3 disiapkan sekali agar slicer tidak perlu membaca dataframe)
     up3_all = sorted(df_ui['UP3'].dropna().astype(str).unique()) if 'UP3' in df_ui.columns else []
-    # ULP tergantung UP3 (temp selection)
-    temp_sel_up3 = st.session_state.temp_ugb_recap_filter.get('UP3', [])
-    if temp_sel_up3 and 'ULP' in df_ui.columns:
-        ulp_all = sorted(df_ui[df_ui['UP3'].astype(str).isin(temp_sel_up3)]['ULP'].dropna().astype(str).unique())
-    else:
-        ulp_all = sorted(df_ui['ULP'].dropna().astype(str).unique()) if 'ULP' in df_ui.columns else []
-    status_all = ['RUSAK', 'STAND BY', 'TERPASANG']
+    ulp_all = sorted(df_ui['ULP'].dropna().astype(str).unique()) if 'ULP' in df_ui.columns else []
+    ulp_by_up3 = {}
+    if up3_all and ulp_all:
+        pairs = df_ui[['UP3', 'ULP']].dropna().astype(str).drop_duplicates()
+        ulp_by_up3 = {up3: sorted(g['ULP']) for up3, g in pairs.groupby('UP3')}
 
     st.subheader("🎯 Filter Data")
-    with st.container():
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            st.markdown('<div class="filter-header">🏢 UP3</div>', unsafe_allow_html=True)
-            sel_up3 = st.multiselect("UP3", up3_all, default=st.session_state.temp_ugb_recap_filter.get('UP3', []), key="rec_temp_up3", placeholder="Semua", label_visibility="collapsed")
-            st.session_state.temp_ugb_recap_filter['UP3'] = sel_up3
-        with c2:
-            st.markdown('<div class="filter-header">🏪 ULP</div>', unsafe_allow_html=True)
-            # Pastikan default tetap valid jika opsi berubah
-            temp_valid_ulp = [u for u in st.session_state.temp_ugb_recap_filter.get('ULP', []) if u in ulp_all]
-            sel_ulp = st.multiselect("ULP", ulp_all, default=temp_valid_ulp, key="rec_temp_ulp", placeholder="Semua", label_visibility="collapsed")
-            st.session_state.temp_ugb_recap_filter['ULP'] = sel_ulp
-        with c3:
-            st.markdown('<div class="filter-header">⚡ STATUS</div>', unsafe_allow_html=True)
-            temp_valid_status = [s for s in st.session_state.temp_ugb_recap_filter.get('STATUS', []) if s in status_all]
-            sel_status = st.multiselect("STATUS", status_all, default=temp_valid_status, key="rec_temp_status", placeholder="Semua", label_visibility="collapsed")
-            st.session_state.temp_ugb_recap_filter['STATUS'] = sel_status
+    recap_filter_bar(up3_all, ulp_all, ulp_by_up3)
     # -- tombol akan dirender setelah data terfilter agar Export memakai hasil filter yang aktif --
 
     # Terapkan filter (berdasarkan state yang sudah di-Apply)
     f = st.session_state.ugb_recap_filter_state
-    filtered = df_ui.copy()
-    if f.get('UP3'):
-        filtered = filtered[filtered['UP3'].astype(str).isin(f['UP3'])]
-    if f.get('ULP'):
-        filtered = filtered[filtered['ULP'].astype(str).isin(f['ULP'])]
-    if f.get('STATUS') and 'STATUS_NORM' in filtered.columns:
-        filtered = filtered[filtered['STATUS_NORM'].isin(f['STATUS'])]
+    filtered = apply_filters(df_ui, f)
 
     # Siapkan data untuk export (berdasarkan filter yang sudah di-Apply)
-    def to_excel_bytes(df_export: pd.DataFrame) -> bytes:
-        buf = BytesIO()
-        try:
-            with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Rekap UGB")
-        except Exception:
-            with pd.ExcelWriter(buf) as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Rekap UGB")
-        return buf.getvalue()
-
-    export_df = filtered.drop(columns=['STATUS_NORM'], errors='ignore').copy()
+    with span('siapkan export_df', rows=len(filtered)):
+        export_df = filtered.drop(columns=['STATUS_NORM'] + list(DATE_COLUMNS.values()), errors='ignore').copy()
     if 'NO' not in export_df.columns:
         export_df.insert(0, 'NO', range(1, len(export_df) + 1))
 
@@ -856,15 +861,10 @@ def page_recap():
         if st.button("🔍 Apply Filter", use_container_width=True, key="rec_apply"):
             st.session_state.ugb_recap_filter_state = st.session_state.temp_ugb_recap_filter.copy()
             st.rerun()
+    filter_key = tuple((k, tuple(f.get(k, []))) for k in ('UP3', 'ULP', 'STATUS'))
+    summaries = get_recap_summaries(dataset_version, filter_key, filtered)
     with b3:
-        st.download_button(
-            label=f"📥 Export Data ({len(export_df):,})",
-            data=to_excel_bytes(export_df),
-            file_name=f"UGB_Rekap_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True,
-            key="rec_export_btn",
-        )
+        recap_export_button(dataset_version, filter_key, export_df, summaries)
 
     # Info jumlah data setelah tombol
     if len(filtered) != len(df_ui):
@@ -874,10 +874,100 @@ def page_recap():
 
     # (Hapus export button lama yang ada di bawah)
 
+    st.subheader("🧮 Ringkasan")
+    recap_summary_tabs(summaries)
+
     st.subheader("📊 Hasil Data")
 
     # ===== TABEL INTERAKTIF TANPA LIMIT =====
-    display_df = export_df  # tampilkan sesuai yang diekspor
+    recap_results_table(export_df)  # tampilkan sesuai yang diekspor
+
+@page_fragment
+def recap_filter_bar(up3_all: list, ulp_all: list, ulp_by_up3: dict):
+    """Slicer rekap. Klik multiselect hanya menjalankan ulang fragment ini (tabel & export tidak dihitung ulang)."""
+    status_all = ['RUSAK', 'STAND BY', 'TERPASANG']
+    with st.container():
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.markdown('<div class="filter-header">🏢 UP3</div>', unsafe_allow_html=True)
+            sel_up3 = st.multiselect("UP3", up3_all, default=st.session_state.temp_ugb_recap_filter.get('UP3', []), key="rec_temp_up3", placeholder="Semua", label_visibility="collapsed")
+            st.session_state.temp_ugb_recap_filter['UP3'] = sel_up3
+        # ULP tergantung UP3 (temp selection)
+        if sel_up3 and ulp_by_up3:
+            ulp_opts = sorted({u for up3 in sel_up3 for u in ulp_by_up3.get(up3, [])})
+        else:
+            ulp_opts = ulp_all
+        with c2:
+            st.markdown('<div class="filter-header">🏪 ULP</div>', unsafe_allow_html=True)
+            # Pastikan default tetap valid jika opsi berubah
+            temp_valid_ulp = [u for u in st.session_state.temp_ugb_recap_filter.get('ULP', []) if u in ulp_opts]
+            sel_ulp = st.multiselect("ULP", ulp_opts, default=temp_valid_ulp, key="rec_temp_ulp", placeholder="Semua", label_visibility="collapsed")
+            st.session_state.temp_ugb_recap_filter['ULP'] = sel_ulp
+        with c3:
+            st.markdown('<div class="filter-header">⚡ STATUS</div>', unsafe_allow_html=True)
+            temp_valid_status = [s for s in st.session_state.temp_ugb_recap_filter.get('STATUS', []) if s in status_all]
+            sel_status = st.multiselect("STATUS", status_all, default=temp_valid_status, key="rec_temp_status", placeholder="Semua", label_visibility="collapsed")
+            st.session_state.temp_ugb_recap_filter['STATUS'] = sel_status
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_recap_summaries(version: str, filter_key: tuple, _filtered: pd.DataFrame) -> dict:
+    """Pivot ringkasan per (versi dataset, filter yang di-Apply); pindah halaman/rerun tidak menghitung ulang."""
+    with span('build_recap_summaries', rows=len(_filtered)):
+        return build_recap_summaries(_filtered)
+
+def recap_summary_tabs(summaries: dict):
+    """Tab pivot ringkasan (baris TOTAL di bawah, kolom TOTAL di kanan)."""
+    tabs = st.tabs(list(summaries))
+    for tab, (title, table) in zip(tabs, summaries.items()):
+        with tab:
+            record_payload(f'ringkasan {title}', table)
+            st.dataframe(table, use_container_width=True, hide_index=True)
+
+def to_excel_bytes(df_export: pd.DataFrame, summaries: Optional[dict] = None) -> bytes:
+    """Workbook export: sheet 'Rekap UGB' (baris mentah) + satu sheet per pivot ringkasan."""
+    def write(writer):
+        df_export.to_excel(writer, index=False, sheet_name="Rekap UGB")
+        for title, table in (summaries or {}).items():
+            table.to_excel(writer, index=False, sheet_name=title[:31])
+    buf = BytesIO()
+    try:
+        with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+            write(writer)
+    except Exception:
+        buf = BytesIO()
+        with pd.ExcelWriter(buf) as writer:
+            write(writer)
+    return buf.getvalue()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_export_bytes(version: str, filter_key: tuple, _export_df: pd.DataFrame, _summaries: Optional[dict] = None) -> bytes:
+    """Workbook export per (versi dataset, filter yang di-Apply); tidak diserialisasi ulang tiap rerun."""
+    with span('to_excel_bytes', rows=len(_export_df)):
+        return to_excel_bytes(_export_df, _summaries)
+
+@page_fragment
+def recap_export_button(version: str, filter_key: tuple, export_df: pd.DataFrame, summaries: Optional[dict] = None):
+    """
+    Tombol export (baris mentah + pivot ringkasan); klik unduh tidak memicu rerun (on_click='ignore').
+    Workbook dibuat sekali per (versi dataset, filter) lewat get_export_bytes, rerun berikutnya memakai cache.
+    """
+    export_bytes = get_export_bytes(version, filter_key, export_df, summaries)
+    record_payload('export xlsx', export_bytes)
+
+    st.download_button(
+        label=f"📥 Export Data ({len(export_df):,})",
+        data=export_bytes,
+        file_name=f"UGB_Rekap_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore",
+        use_container_width=True,
+        key="rec_export_btn",
+    )
+
+@page_fragment
+def recap_results_table(display_df: pd.DataFrame):
+    """Tabel hasil; pencarian cepat hanya menjalankan ulang fragment ini."""
+    record_payload('tabel hasil (DataFrame)', display_df)
 
     # Coba gunakan AgGrid untuk performa & style seperti INSPEKSI
     try:
@@ -910,12 +1000,142 @@ def page_recap():
         # Fallback standar
         st.dataframe(display_df, use_container_width=True, height=600)
 
+# ===== HALAMAN LACAK NO SERI (lineage lintas upload) =====
+@profiled()
+def page_serial_lineage():
+    """Riwayat perpindahan satu unit UGB (berdasarkan NO SERI) di semua upload."""
+    st.header("🔎 Lacak No Seri", divider="rainbow")
+
+    stats = lineage_stats()
+    st.caption(f"Indeks berisi {stats['observations']:,} observasi untuk {stats['serials']:,} unit dari {stats['uploads']:,} upload")
+    if stats['observations'] == 0:
+        st.info("Indeks masih kosong. Indeks terisi otomatis pada setiap upload, atau bangun dari file backup di bawah.")
+
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        query = st.text_input("No Seri", value="", placeholder="Ketik NO SERI unit UGB...", key="lineage_query")
+    with c2:
+        st.markdown('<div class="button-container">', unsafe_allow_html=True)
+        if st.button("🧱 Bangun dari Backup", use_container_width=True, key="lineage_rebuild"):
+            with st.spinner("Membaca seluruh backup..."):
+                written = rebuild_lineage_from_backups(DATABASE_PATH, get_dataset_version(DATABASE_PATH))
+            st.success(f"✅ {written:,} observasi baru ditambahkan ke indeks")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    if not query.strip():
+        return
+
+    hist = get_serial_history(query)
+    if hist.empty:
+        suggestions = search_serials(query)
+        if suggestions:
+            st.info("No Seri tidak ditemukan persis. Mungkin maksud Anda: " + ", ".join(suggestions))
+        else:
+            st.warning("⚠️ No Seri tidak ditemukan di indeks")
+        return
+
+    n_coords = hist['KOORDINAT TAGGING'].replace('', pd.NA).nunique()
+    st.info(f"📍 {len(hist)} observasi • {n_coords} koordinat berbeda • {hist['UPLOAD_ID'].nunique()} upload")
+    show_cols = ['UPLOAD_ID', 'KOORDINAT TAGGING', 'STATUS', 'TANGGAL TERPASANG', 'TANGGAL TERBONGKAR',
+                 'PENOMORAN UGB BARU', 'UP3', 'ULP', 'NO SERI']
+    st.dataframe(hist[show_cols], use_container_width=True, hide_index=True)
+
+# ===== PROFILER RERUN (opsional: env UGB_PROFILE=1 atau ?profile=1) =====
+def profiler_enabled() -> bool:
+    if os.environ.get(PROFILER_ENV_VAR, '') not in ('', '0'):
+        return True
+    try:
+        return st.query_params.get(PROFILER_QUERY_PARAM) == '1'
+    except Exception:
+        return False
+
+def _format_bytes(n) -> str:
+    if n is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:,.0f} {unit}" if unit == 'B' else f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} GB"
+
+def render_profiler_panel():
+    """Panel debug: rincian span, payload, dan unduhan cProfile untuk rerun yang dipilih."""
+    history = st.session_state.get('ugb_profiler_history', [])
+    opts = st.session_state.setdefault('ugb_profiler_opts', {'memory': False, 'cprofile': False})
+    with st.expander(f"🐞 Profil Rerun ({len(history)} terakhir)", expanded=False):
+        c1, c2 = st.columns(2)
+        with c1:
+            opts['memory'] = st.checkbox("Ukur memori (tracemalloc)", value=opts['memory'], key="ugb_prof_memory",
+                                         help="Berlaku mulai rerun berikutnya; memperlambat eksekusi")
+        with c2:
+            opts['cprofile'] = st.checkbox("Rekam cProfile", value=opts['cprofile'], key="ugb_prof_cprofile",
+                                           help="Berlaku mulai rerun berikutnya")
+        if not history:
+            st.caption("Belum ada rerun yang terekam.")
+            return
+        labels = [f"#{i + 1} • {r['started_at']} • {r['label']} • {r['total_seconds']:.2f} dtk" for i, r in enumerate(history)]
+        idx = st.selectbox("Rerun", range(len(history)), index=len(history) - 1,
+                           format_func=lambda i: labels[i], key="ugb_prof_pick")
+        record = history[idx]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Total", f"{record['total_seconds']:.3f} dtk")
+        m2.metric("Puncak memori", _format_bytes(record['peak_bytes']))
+        m3.metric("Payload", _format_bytes(sum(p['bytes'] for p in record['payloads'])))
+        spans = pd.DataFrame([{
+            'SPAN': '\u2003' * s['depth'] + s['name'],
+            'DETIK': round(s['seconds'], 4),
+            'BARIS': '-' if s['rows'] is None else f"{s['rows']:,}",
+            'PUNCAK MEMORI': _format_bytes(s['peak_bytes']),
+        } for s in sorted(record['spans'], key=lambda s: s['offset'])])
+        if not spans.empty:
+            st.dataframe(spans, use_container_width=True, hide_index=True)
+        if record['payloads']:
+            st.dataframe(pd.DataFrame([{'PAYLOAD': p['name'], 'UKURAN': _format_bytes(p['bytes'])} for p in record['payloads']]),
+                         use_container_width=True, hide_index=True)
+        if record['profile']:
+            stamp = record['started_at'].replace(':', '').replace(' ', '_').replace('-', '')
+            d1, d2 = st.columns(2)
+            with d1:
+                st.download_button("⬇️ cProfile (.prof)", data=record['profile'], file_name=f"rerun_{stamp}.prof",
+                                   mime="application/octet-stream", use_container_width=True, key="ugb_prof_dl_prof")
+            with d2:
+                st.download_button("⬇️ Flamegraph (collapsed)", data=profile_to_collapsed(record), file_name=f"rerun_{stamp}.collapsed.txt",
+                                   mime="text/plain", use_container_width=True, key="ugb_prof_dl_collapsed")
+            st.code(profile_to_text(record), language=None)
+
+def store_profile_record(record):
+    if record is not None:
+        history = st.session_state.setdefault('ugb_profiler_history', [])
+        history.append(record)
+        del history[:-PROFILER_HISTORY_SIZE]
+
+def run_app():
+    """Titik masuk: jalankan main() apa adanya, atau dibungkus profiler jika diaktifkan."""
+    if not profiler_enabled():
+        main()
+        return
+    opts = st.session_state.setdefault('ugb_profiler_opts', {'memory': False, 'cprofile': False})
+    start_rerun(st.session_state.page, memory=opts['memory'], cprofile=opts['cprofile'])
+    try:
+        with span('main'):
+            main()
+    finally:
+        # Tetap direkam walau rerun diputus oleh st.rerun()/st.stop()
+        store_profile_record(finish_rerun())
+    render_profiler_panel()
+
 # ===== MAIN APPLICATION =====
 def main():
     # Header
     display_header()
+    # Pasang hasil upload latar belakang yang sudah selesai
+    collect_ingest_result()
     # Sidebar nav
     render_sidebar_nav()
+    job = get_job(st.session_state.get('ugb_ingest_job'))
+    if job is not None and job['status'] not in TERMINAL_STATUSES and st.session_state.page != "upload":
+        with st.sidebar:
+            sidebar_ingest_status(job['id'])
     # Routing halaman
     if st.session_state.page == "upload":
         page_upload_data()
@@ -923,9 +1143,11 @@ def main():
         page_dashboard()
     elif st.session_state.page == "recap":
         page_recap()
+    elif st.session_state.page == "lineage":
+        page_serial_lineage()
     # Footer
     st.markdown("---")
     st.caption("© 2025 – Dashboard Geo-Monitor UGB • Dibuat untuk Magang MBKM PLN UID Lampung oleh Ganiya Syazwa")
 
 if __name__ == "__main__":
-    main()
+    run_app()
@@ -0,0 +1,175 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark pipeline ingest -> simpan -> render untuk Dashboard UGB.
+
+Contoh:
+    python -m benchmarks.run_benchmarks                       # 1k & 10k baris
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 100000 500000 --repeat 1
+    python -m benchmarks.run_benchmarks --stages process save load --sizes 100000
+
+Setiap run ditambahkan ke benchmarks/history.json, lalu dibandingkan dengan run
+sebelumnya untuk ukuran & tahap yang sama (ditandai REGRESI bila melambat melewati
+--threshold). Workbook sintetis di-cache di benchmarks/.cache.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.workload import cached_workbook
+from utils.data_processor import (
+    process_excel_file, save_to_database, load_database,
+    add_status_norm, apply_filters, compute_kpis,
+)
+
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "history.json")
+CACHE_DIR = os.path.join(ROOT, "benchmarks", ".cache")
+ALL_STAGES = ["process", "save", "load", "filter", "kpi", "map"]
+# Kombinasi filter yang mewakili pemakaian slicer di dashboard
+FILTER_CASES = [
+    {'UP3': 'Semua', 'ULP': 'Semua', 'STATUS': 'Semua'},
+    {'UP3': 'KARANG', 'ULP': 'Semua', 'STATUS': 'Semua'},
+    {'UP3': 'Semua', 'ULP': 'Semua', 'STATUS': 'RUSAK'},
+    {'UP3': ['METRO', 'KOTABUMI'], 'ULP': [], 'STATUS': ['STAND BY', 'TERPASANG']},
+]
+
+def _timeit(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Jalankan fn sebanyak repeat kali; kembalikan statistik detik + hasil run terakhir."""
+    times: List[float] = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return {'min': min(times), 'median': statistics.median(times), 'runs': len(times), '_result': result}
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def run_size(total_rows: int, stages: List[str], repeat: int) -> Dict[str, Any]:
+    """Benchmark semua tahap untuk satu ukuran data. Berjalan di direktori kerja sementara."""
+    results: Dict[str, Any] = {}
+    workbook = cached_workbook(CACHE_DIR, total_rows)
+    df = None
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)  # DATABASE/BACKUP/LINEAGE_PATH relatif -> tidak menyentuh data asli
+        try:
+            db_path = os.path.join("data", "ugb_database.csv")
+            os.makedirs("data", exist_ok=True)
+
+            r = _timeit(lambda: process_excel_file(workbook), repeat if "process" in stages else 1)
+            ok, msg, df = r.pop('_result')
+            if not ok:
+                raise RuntimeError(msg)
+            if "process" in stages:
+                results['process'] = r
+            if "save" in stages:
+                results['save'] = _timeit(lambda: save_to_database(df, db_path), repeat)
+                results['save'].pop('_result')
+            else:
+                save_to_database(df, db_path)
+            if "load" in stages:
+                results['load'] = _timeit(lambda: load_database(db_path), repeat)
+                results['load'].pop('_result')
+
+            df_ui = add_status_norm(df)
+            if "filter" in stages:
+                results['filter'] = _timeit(lambda: [apply_filters(df_ui, f) for f in FILTER_CASES], repeat)
+                results['filter'].pop('_result')
+            if "kpi" in stages:
+                results['kpi'] = _timeit(lambda: compute_kpis(df_ui), repeat)
+                results['kpi'].pop('_result')
+            if "map" in stages:
+                from utils.map_view import new_coordinate_history, build_folium_map
+                def _map():
+                    history = new_coordinate_history(df_ui)
+                    m, n_markers = build_folium_map(history, df_ui.index)
+                    html = m.get_root().render()
+                    return n_markers, len(html)
+                r = _timeit(_map, repeat)
+                n_markers, html_bytes = r.pop('_result')
+                r.update(markers=n_markers, html_bytes=html_bytes)
+                results['map'] = r
+        finally:
+            os.chdir(cwd)
+    results['_rows'] = len(df) if df is not None else 0
+    return results
+
+def _load_history() -> List[Dict[str, Any]]:
+    try:
+        with open(HISTORY_PATH, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return []
+
+def _previous(history: List[Dict[str, Any]], size: str, stage: str):
+    for run in reversed(history):
+        stat = run.get('sizes', {}).get(size, {}).get(stage)
+        if stat:
+            return stat
+    return None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline UGB (ingest -> store -> render)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="total baris per workbook")
+    parser.add_argument("--stages", nargs="+", choices=ALL_STAGES, default=ALL_STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=1.2, help="rasio perlambatan yang dianggap regresi")
+    parser.add_argument("--no-save", action="store_true", help="jangan tulis ke history.json")
+    args = parser.parse_args(argv)
+
+    history = _load_history()
+    run = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'sizes': {},
+    }
+    regressions = 0
+    for size in args.sizes:
+        print(f"== {size:,} baris ==")
+        res = run_size(size, args.stages, args.repeat)
+        print(f"   (baris valid setelah ingest: {res.pop('_rows'):,})")
+        run['sizes'][str(size)] = res
+        for stage in args.stages:
+            stat = res[stage]
+            prev = _previous(history, str(size), stage)
+            note = ""
+            if prev:
+                ratio = stat['median'] / prev['median'] if prev['median'] > 0 else 1.0
+                note = f"  x{ratio:.2f} vs run sebelumnya"
+                if ratio > args.threshold:
+                    note += "  <-- REGRESI"
+                    regressions += 1
+            extra = f"  ({stat['markers']:,} marker, {stat['html_bytes'] / 1e6:.1f} MB HTML)" if stage == 'map' else ""
+            print(f"   {stage:<8} median {stat['median'] * 1000:10.1f} ms  min {stat['min'] * 1000:10.1f} ms{extra}{note}")
+
+    if not args.no_save:
+        history.append(run)
+        with open(HISTORY_PATH, 'w', encoding='utf-8') as fh:
+            json.dump(history, fh, indent=1)
+        print(f"Hasil ditambahkan ke {os.path.relpath(HISTORY_PATH, ROOT)}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
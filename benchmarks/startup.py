@@ -0,0 +1,135 @@
+# benchmarks/startup.py
+"""
+Benchmark cold start aplikasi per halaman: tiap halaman dijalankan di interpreter baru
+(streamlit.testing AppTest) dengan dataset aktif di data/, lalu dicatat:
+
+    framework   import streamlit + AppTest (konstan, bukan bagian aplikasi)
+    cold        render pertama halaman (import modul aplikasi + load data + render)
+    rerun       render kedua di proses yang sama (modul & cache sudah hangat)
+    modul berat yang ikut ter-import (plotly.express, folium, pydeck, st_aggrid, ...)
+
+Contoh:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --pages upload dashboard --repeat 5
+
+Setiap run ditambahkan ke benchmarks/startup_history.json dan dibandingkan dengan run
+sebelumnya (mis. sebelum/sesudah perubahan import).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "startup_history.json")
+PAGES = ["upload", "dashboard", "recap", "lineage"]
+HEAVY_MODULES = ["plotly.express", "folium", "streamlit_folium", "pydeck", "st_aggrid", "utils.map_view"]
+
+def _child(page: str, timeout: float) -> Dict[str, Any]:
+    """Dijalankan di proses anak: ukur render pertama & kedua satu halaman."""
+    import warnings
+    warnings.filterwarnings("ignore")
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    t_framework = time.perf_counter() - t0
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state['page'] = page
+    t1 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t1
+    t2 = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - t2
+    return {
+        'framework': t_framework,
+        'cold': cold,
+        'rerun': rerun,
+        'heavy': [m for m in HEAVY_MODULES if m in sys.modules],
+        'exceptions': len(at.exception),
+    }
+
+def measure_page(page: str, timeout: float) -> Dict[str, Any]:
+    """Satu pengukuran cold start di interpreter baru (wall = dari spawn sampai proses selesai)."""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child", page, "--timeout", str(timeout)],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"halaman {page} gagal:\n{proc.stderr[-2000:]}")
+    return {**json.loads(lines[-1]), 'wall': wall}
+
+def _load_history() -> List[Dict[str, Any]]:
+    try:
+        with open(HISTORY_PATH, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return []
+
+def _previous(history: List[Dict[str, Any]], page: str):
+    for run in reversed(history):
+        stat = run.get('pages', {}).get(page)
+        if stat:
+            return stat
+    return None
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold start & render pertama per halaman")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=PAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="batas detik per render AppTest")
+    parser.add_argument("--no-save", action="store_true", help="jangan tulis ke startup_history.json")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.timeout)))
+        return 0
+
+    history = _load_history()
+    run = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pages': {},
+    }
+    print(f"{'HALAMAN':<10} {'WALL':>8} {'COLD':>8} {'RERUN':>8} {'FRAMEWORK':>10}  MODUL BERAT")
+    for page in args.pages:
+        samples = [measure_page(page, args.timeout) for _ in range(args.repeat)]
+        stat = {key: statistics.median(s[key] for s in samples) for key in ('wall', 'cold', 'rerun', 'framework')}
+        stat['heavy'] = samples[-1]['heavy']
+        stat['exceptions'] = samples[-1]['exceptions']
+        run['pages'][page] = stat
+        prev = _previous(history, page)
+        note = f"  (cold x{stat['cold'] / prev['cold']:.2f} vs {prev.get('git', 'sebelumnya')})" if prev and prev['cold'] > 0 else ""
+        print(f"{page:<10} {stat['wall']:>7.2f}s {stat['cold']:>7.2f}s {stat['rerun']:>7.2f}s {stat['framework']:>9.2f}s  "
+              f"{', '.join(stat['heavy']) or '-'}{note}")
+        if stat['exceptions']:
+            print(f"   ! {stat['exceptions']} exception saat render {page}")
+
+    if not args.no_save:
+        for stat in run['pages'].values():
+            stat['git'] = run['git']
+        history.append(run)
+        with open(HISTORY_PATH, 'w', encoding='utf-8') as fh:
+            json.dump(history, fh, indent=1)
+        print(f"Hasil ditambahkan ke {os.path.relpath(HISTORY_PATH, ROOT)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# benchmarks/workload.py
+"""
+Generator workbook UGB sintetis untuk benchmark.
+
+Workbook dibuat per sheet VALID_SHEETS dengan pola data lapangan yang realistis:
+typo header, baris kosong, koordinat ganda (riwayat di satu titik), NO SERI yang
+berpindah lokasi, dan format tanggal campuran (tanggal Excel, dd/mm/yyyy,
+nama bulan Indonesia, nomor seri Excel, nilai rusak).
+"""
+
+import hashlib
+import json
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, Optional, Union
+
+from openpyxl import Workbook
+
+from config import VALID_SHEETS, VALID_COLUMNS
+
+ULP_BY_SHEET = {
+    "UGB UP3 KARANG": ["ULP WAY HALIM", "ULP TELUK BETUNG", "ULP KEDATON", "ULP SUTAMI"],
+    "UGB UP3 METRO": ["ULP METRO", "ULP SRIBHAWONO", "ULP KOTA GAJAH", "ULP SUKADANA"],
+    "UGB UP3 KOTABUMI": ["ULP KOTABUMI", "ULP BUKIT KEMUNING", "ULP MENGGALA", "ULP LIWA"],
+    "UGB UP3 PRINGSEWU": ["ULP PRINGSEWU", "ULP TALANG PADANG", "ULP KOTA AGUNG", "ULP GEDONG TATAAN"],
+}
+STATUS_VARIANTS = ["TERPASANG", "TERPASANG", "TERPASANG", "STAND BY", "STANDBY", "RUSAK", "Rusak", "terpasang"]
+CAPACITIES = ["25", "50", "100", "160", "200", "250"]
+BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+         "Agustus", "September", "Oktober", "November", "Desember"]
+# Pusat kira-kira wilayah tiap UP3 (lat, lon)
+CENTERS = {
+    "UGB UP3 KARANG": (-5.40, 105.26),
+    "UGB UP3 METRO": (-5.11, 105.31),
+    "UGB UP3 KOTABUMI": (-4.83, 104.89),
+    "UGB UP3 PRINGSEWU": (-5.36, 104.97),
+}
+
+DEFAULT_OPTIONS = {
+    'header_typo_rate': 0.3,     # peluang satu header diberi typo (1 karakter)
+    'blank_row_rate': 0.01,      # peluang menyisipkan baris kosong
+    'dup_coord_rate': 0.15,      # peluang baris memakai koordinat yang sudah ada
+    'messy_date_rate': 0.3,      # peluang tanggal ditulis dalam format non-standar
+    'bad_date_rate': 0.005,      # peluang tanggal tidak bisa dibaca
+    'serial_pool_ratio': 0.8,    # jumlah NO SERI unik relatif terhadap jumlah baris
+}
+
+def _typo(header: str, rnd: random.Random) -> str:
+    """Satu kesalahan ketik (hapus / tukar huruf) pada header panjang; header pendek dibiarkan."""
+    if len(header) < 8:
+        return header
+    i = rnd.randrange(1, len(header) - 1)
+    if header[i] == ' ' or header[i - 1] == ' ':
+        return header
+    if rnd.random() < 0.5:
+        return header[:i] + header[i + 1:]
+    return header[:i - 1] + header[i] + header[i - 1] + header[i + 1:]
+
+def _messy_date(d: date, rnd: random.Random, opts: Dict[str, float]):
+    """Tanggal dalam salah satu format yang biasa ditemui di file lapangan."""
+    r = rnd.random()
+    if r < opts['bad_date_rate']:
+        return rnd.choice(["-", "belum diisi", "32/13/2023"])
+    if r >= opts['messy_date_rate']:
+        return d  # sel tanggal Excel asli
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return d.strftime('%d/%m/%Y')
+    if kind == 1:
+        return f"{d.day} {BULAN[d.month - 1]} {d.year}"
+    return (d - date(1899, 12, 30)).days  # nomor seri Excel sebagai angka
+
+def generate_workbook(path: str, rows_per_sheet: Union[int, Dict[str, int]], seed: int = 42,
+                      options: Optional[Dict[str, float]] = None) -> str:
+    """
+    Tulis workbook sintetis ke `path` (mode write-only openpyxl agar cepat untuk jutaan sel).
+
+    Args:
+        rows_per_sheet: jumlah baris data per sheet, atau dict {nama sheet: jumlah}
+        options: override DEFAULT_OPTIONS
+    """
+    opts = {**DEFAULT_OPTIONS, **(options or {})}
+    rnd = random.Random(seed)
+    counts = rows_per_sheet if isinstance(rows_per_sheet, dict) else {s: rows_per_sheet for s in VALID_SHEETS}
+    total = max(1, sum(counts.values()))
+    serial_pool = max(1, int(total * opts['serial_pool_ratio']))
+
+    wb = Workbook(write_only=True)
+    for sheet in VALID_SHEETS:
+        n = counts.get(sheet, 0)
+        if n <= 0:
+            continue
+        ws = wb.create_sheet(sheet)
+        headers = ["NO"] + [_typo(h, rnd) if rnd.random() < opts['header_typo_rate'] else h for h in VALID_COLUMNS]
+        ws.append(headers)
+        up3 = sheet.replace("UGB UP3 ", "")
+        code = up3[:3]
+        clat, clon = CENTERS[sheet]
+        coords = []
+        for i in range(n):
+            if rnd.random() < opts['blank_row_rate']:
+                ws.append([None] * len(headers))
+            if coords and rnd.random() < opts['dup_coord_rate']:
+                coord = rnd.choice(coords)
+            else:
+                coord = f"{clat + rnd.uniform(-0.35, 0.35):.6f}, {clon + rnd.uniform(-0.35, 0.35):.6f}"
+                if len(coords) < 50000:
+                    coords.append(coord)
+            installed = date(2019, 1, 1) + timedelta(days=rnd.randrange(2400))
+            status = rnd.choice(STATUS_VARIANTS)
+            removed = installed + timedelta(days=rnd.randrange(30, 600)) if status.upper() == "RUSAK" else None
+            ws.append([
+                i + 1,
+                up3,
+                rnd.choice(ULP_BY_SHEET[sheet]),
+                rnd.choice(["", "GANTI UNIT", "PEMELIHARAAN", "UPRATING"]),
+                rnd.choice(CAPACITIES),
+                status,
+                f"SN{rnd.randrange(serial_pool):08d}",
+                f"Jl. Sintetis No. {rnd.randrange(1, 500)}, {up3}",
+                f"UGB-{code}-{i:06d}",
+                coord,
+                rnd.choice(["TIDAK", "YA", "TDK", ""]),
+                _messy_date(installed, rnd, opts),
+                _messy_date(removed, rnd, opts) if removed else None,
+            ])
+    wb.save(path)
+    return path
+
+def cached_workbook(cache_dir: str, total_rows: int, seed: int = 42,
+                    options: Optional[Dict[str, float]] = None) -> str:
+    """Workbook dengan total_rows dibagi rata ke semua sheet; dibuat sekali lalu dipakai ulang."""
+    key = json.dumps({'rows': total_rows, 'seed': seed, 'options': options or {}}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    path = os.path.join(cache_dir, f"ugb_{total_rows}_{digest}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        per_sheet = max(1, total_rows // len(VALID_SHEETS))
+        generate_workbook(path + ".tmp.xlsx", per_sheet, seed, options)
+        os.replace(path + ".tmp.xlsx", path)
+    return path
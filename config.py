@@ -14,6 +14,45 @@ LAYOUT = "wide"
 DATABASE_PATH = "data/ugb_database.csv"
 BACKUP_PATH = "data/backup/"
 
+# Indeks riwayat (lineage) per NO SERI lintas upload (append-only)
+LINEAGE_PATH = "data/ugb_lineage.csv"
+
+# Log rincian waktu per tahap untuk setiap upload (JSON Lines)
+INGEST_LOG_PATH = "data/ingest_log.jsonl"
+
+# Deteksi perubahan antar upload: ringkasan per upload (JSON Lines) + rincian per versi
+CHANGES_LOG_PATH = "data/ugb_changes.jsonl"
+CHANGES_DIR = "data/changes/"
+
+# Riwayat status ringkas per upload (Parquet kolumnar, satu file part per versi) untuk grafik tren
+STATUS_HISTORY_PATH = "data/ugb_status_history/"
+# File tunggal format lama; dipecah ke folder di atas saat upload berikutnya
+STATUS_HISTORY_LEGACY_PATH = "data/ugb_status_history.parquet"
+
+# Snapshot dashboard pra-render (KPI + HTML peta per UP3 & "Semua"), satu folder per versi dataset
+SNAPSHOT_DIR = "data/snapshots/"
+SNAPSHOT_KEEP_VERSIONS = 3      # folder versi lama di luar jumlah ini dihapus setelah render
+# Di atas jumlah baris ini snapshot menjadi pilihan awal peta (di bawahnya tetap peta interaktif)
+SNAPSHOT_AUTO_THRESHOLD = 200000
+
+# ===== CACHE TURUNAN DATA =====
+# Jumlah versi dataset bertipe yang disimpan bersama antar sesi (versi aktif + sebelumnya)
+DATASET_CACHE_VERSIONS = 2
+
+# ===== WORKER INGEST LATAR BELAKANG =====
+INGEST_MAX_WORKERS = 1          # job ingest paralel per proses (commit tetap serial)
+INGEST_JOB_HISTORY = 20         # jumlah job selesai yang disimpan di registry
+INGEST_POLL_SECONDS = 1.0       # interval polling status job di UI
+
+# ===== BATCH MULTI-WORKBOOK =====
+BATCH_MAX_WORKERS = 4           # proses paralel untuk parsing beberapa workbook sekaligus
+SOURCE_FILE_COLUMN = "SOURCE_FILE"  # kolom asal file (pendamping SOURCE_SHEET) pada hasil batch
+
+# ===== TIPE DATA DI MEMORI =====
+# Kolom teks dengan nilai unik <= rasio x jumlah baris disimpan sebagai `category`
+# (UP3, ULP, STATUS, KAPASITAS, ...); kolom teks lain sebagai string Arrow.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
 # ===== OPSIONAL: Gunakan Google Sheets sebagai database =====
 # Set True untuk memakai Google Sheets sebagai database utama.
 # Jika False, sistem memakai CSV lokal (DATABASE_PATH).
@@ -60,6 +99,51 @@ VALID_COLUMNS = [
     "TANGGAL TERBONGKAR"               # Kolom M
 ]
 
+# ===== VALIDASI KUALITAS DATA (saat ingest) =====
+# Batas wilayah koordinat yang wajar (Provinsi Lampung + margin); di luar ini ditandai,
+# biasanya lat/lon tertukar atau tanda minus hilang
+QUALITY_COORD_BOUNDS = {'lat': (-6.3, -3.5), 'lon': (103.4, 106.4)}
+# Jumlah baris daftar masalah yang ditampilkan di halaman upload (unduhan selalu lengkap)
+QUALITY_PREVIEW_ROWS = 500
+
+# ===== RESOLUSI HEADER (FUZZY) =====
+# Header yang tidak cocok persis dengan varian yang dikenal dicocokkan memakai jarak edit
+# (Levenshtein) terbatas. Batas jarak = min(MAX_DISTANCE, panjang header * MAX_RATIO), minimal 1.
+HEADER_FUZZY_MAX_DISTANCE = 3
+HEADER_FUZZY_MAX_RATIO = 0.2
+# Header lebih pendek dari ini hanya dicocokkan secara persis
+HEADER_FUZZY_MIN_LENGTH = 5
+
+# ===== PARSING TANGGAL (saat ingest) =====
+# Kolom tanggal sumber -> kolom datetime ter-tipe yang ditambahkan saat ingest.
+# Nilai asli kolom sumber TIDAK diubah; kolom turunan dipakai untuk sorting/timeline.
+DATE_COLUMNS = {
+    'TANGGAL TERPASANG': 'TERPASANG_DT',
+    'TANGGAL TERBONGKAR': 'TERBONGKAR_DT',
+}
+# Kandidat format, urutan = prioritas saat jumlah cocok sama (day-first didahulukan).
+# Sengaja tanpa format month-first (%m/%d/%Y): nilai seperti 12/25/2023 di kolom dd/mm dibiarkan
+# tidak terbaca (dilaporkan) alih-alih diam-diam dibaca sebagai bulan/tanggal.
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%d/%m/%y',
+    '%d-%m-%y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%Y/%m/%d',
+]
+# Format eksplisit per kolom sumber, menggantikan DATE_FORMATS untuk kolom itu
+# (mis. {'TANGGAL TERBONGKAR': ['%m/%d/%Y']} bila kolom tersebut memang month-first)
+DATE_COLUMN_FORMATS = {}
+# Jumlah nilai unik yang dipakai untuk menebak format per kolom
+DATE_INFER_SAMPLE_SIZE = 200
+# Rentang nomor seri tanggal Excel yang dianggap valid (~1954 s/d ~2119)
+EXCEL_SERIAL_RANGE = (20000, 80000)
+
 # ===== NORMALISASI TEKS =====
 # Untuk mengatasi variasi penulisan seperti TDK, tdk, Tidak, TIDAK, tidak
 NORMALIZATION_DICTIONARY = {
@@ -89,18 +173,64 @@ MAP_CONFIG = {
     'default_zoom': 9,
     'marker_colors': {
         'STANDBY': 'green',
+        'STAND BY': 'green',
         'RUSAK': 'red', 
         'TERPASANG': 'orange'
+    },
+    # Warna RGB mode WebGL (setara ikon Folium red/orange/green)
+    'deck_colors': {
+        'STAND BY': [114, 176, 38],
+        'RUSAK': [214, 62, 42],
+        'TERPASANG': [246, 151, 48]
     }
 }
 
+# Mesin peta di dashboard: Folium (marker + tooltip riwayat) atau WebGL/pydeck (ratusan ribu titik)
+MAP_ENGINES = {
+    'folium': '📍 Folium (marker)',
+    'deck': '⚡ WebGL (pydeck)',
+    'viewport': '🧭 Folium (viewport)',
+}
+# Di atas jumlah koordinat ini mode WebGL menjadi pilihan awal
+MAP_ENGINE_AUTO_THRESHOLD = 3000
+# Batas titik WebGL yang masih membawa data tooltip; di atasnya hanya posisi (detail lewat klik)
+DECK_TOOLTIP_MAX_POINTS = 50000
+
+# Mode viewport (Folium): hanya titik di area terlihat yang dikirim ke browser
+VIEWPORT_MAX_MARKERS = 300        # di atas ini titik diagregasi per sel grid
+VIEWPORT_AGG_GRID = 24            # perkiraan jumlah sel agregasi selebar viewport
+VIEWPORT_INDEX_CELL_DEG = 0.05    # ukuran sel indeks spasial (derajat, ~5,5 km)
+
+# Pencarian UGB terdekat (panel samping): radius / k-terdekat dengan jarak haversine
+NEARBY_INDEX_CELL_DEG = 0.02      # ukuran sel indeks spasial per entri (derajat, ~2,2 km)
+NEARBY_DEFAULT_RADIUS_KM = 5.0
+NEARBY_DEFAULT_K = 10
+NEARBY_MAX_RESULTS = 500          # batas baris hasil mode radius yang ditampilkan
+NEARBY_DEFAULT_STATUS = ['STAND BY']
+
+# Agregasi grid multi-resolusi (dibangun sekali per versi dataset) untuk tampilan jauh
+GRID_LEVELS_DEG = [0.4, 0.2, 0.1, 0.05, 0.025]   # ukuran sel per level (derajat)
+CHOROPLETH_MAX_ZOOM = 11          # zoom <= ini: choropleth grid; di atasnya marker / cluster viewport
+CHOROPLETH_CELL_PX = 40           # ukuran sel di layar yang dituju saat memilih level
+CHOROPLETH_PALETTE = ['#ffffb2', '#fed976', '#feb24c', '#fd8d3c', '#f03b20', '#bd0026']
+
 # ===== KONFIGURASI FILTER =====
 FILTER_COLUMNS = ['UP3', 'ULP', 'STATUS']
 
+# ===== PROFILER RERUN (opsional, untuk debugging performa) =====
+# Aktif jika environment UGB_PROFILE=1 atau URL dibuka dengan ?profile=1
+PROFILER_ENV_VAR = "UGB_PROFILE"
+PROFILER_QUERY_PARAM = "profile"
+# Jumlah rerun terakhir yang disimpan di panel debug (per sesi)
+PROFILER_HISTORY_SIZE = 10
+
 # ===== PATH ASSETS =====
 ASSETS_PATH = "assets/"
 LOGO_DANANTARA_PATH = os.path.join(ASSETS_PATH, "LOGO DANANTARA.png")
 LOGO_PLN_PATH = os.path.join(ASSETS_PATH, "LOGO PLN.png")
+APP_CSS_PATH = os.path.join(ASSETS_PATH, "style.css")
+# Logo header diperkecil ke tinggi ini (2x tinggi CSS terbesar, tetap tajam di layar HiDPI)
+LOGO_MAX_HEIGHT_PX = 180
 
 # ===== FORMAT FILE YANG DITERIMA =====
 ACCEPTED_FILE_TYPES = ['xlsx', 'xlsm']
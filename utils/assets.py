@@ -0,0 +1,102 @@
+# utils/assets.py
+"""
+Aset statis aplikasi (logo header & CSS) yang dibaca, diperkecil, dan di-encode sekali per
+proses. Cache dikunci mtime/ukuran file: mengganti file di assets/ langsung terpakai tanpa
+restart, sedangkan rerun biasa tidak melakukan I/O gambar maupun encoding sama sekali.
+"""
+
+import base64
+import os
+import re
+import threading
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from config import APP_CSS_PATH, LOGO_DANANTARA_PATH, LOGO_PLN_PATH, LOGO_MAX_HEIGHT_PX
+
+_lock = threading.Lock()
+_cache: Dict[Tuple, Tuple[Any, Any]] = {}
+
+def _file_key(path: str):
+    try:
+        st_ = os.stat(path)
+        return st_.st_mtime_ns, st_.st_size
+    except OSError:
+        return None
+
+def _cached(key: Tuple, stamp: Any, build):
+    """Nilai cache untuk `key` selama `stamp` (mtime/ukuran file sumber) tidak berubah."""
+    with _lock:
+        hit = _cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    value = build()
+    with _lock:
+        _cache[key] = (stamp, value)
+    return value
+
+def _encode_logo(path: str, max_height: Optional[int]) -> Optional[str]:
+    """PNG base64; diperkecil ke max_height piksel bila lebih tinggi. Tanpa Pillow: byte file apa adanya."""
+    try:
+        from PIL import Image
+    except ImportError:
+        with open(path, 'rb') as fh:
+            return base64.b64encode(fh.read()).decode()
+    with Image.open(path) as image:
+        image.load()
+        if max_height and image.height > max_height:
+            width = max(1, round(image.width * max_height / image.height))
+            image = image.resize((width, max_height), Image.LANCZOS)
+        buf = BytesIO()
+        image.save(buf, format="PNG", optimize=True)
+    return base64.b64encode(buf.getvalue()).decode()
+
+def logo_base64(path: str, max_height: Optional[int] = LOGO_MAX_HEIGHT_PX) -> Optional[str]:
+    """Logo sebagai base64 (None bila file tidak ada / tidak bisa dibaca)."""
+    stamp = _file_key(path)
+    if stamp is None:
+        return None
+    try:
+        return _cached(('logo', path, max_height), stamp, lambda: _encode_logo(path, max_height))
+    except Exception as e:
+        print(f"Gagal memuat logo {path}: {str(e)}")
+        return None
+
+def _minify_css(css: str) -> str:
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};:,>])\s*', r'\1', css).strip()
+
+def app_css_html(path: str = APP_CSS_PATH) -> str:
+    """Blok <style> aplikasi dari assets/style.css (diringkas sekali per versi file)."""
+    stamp = _file_key(path)
+    if stamp is None:
+        return ""
+    def build():
+        with open(path, encoding='utf-8') as fh:
+            return f"<style>{_minify_css(fh.read())}</style>"
+    return _cached(('css', path), stamp, build)
+
+def header_html() -> Optional[str]:
+    """HTML header (logo Danantara - judul dua baris - logo PLN); None bila salah satu logo tidak tersedia."""
+    stamp = (_file_key(LOGO_DANANTARA_PATH), _file_key(LOGO_PLN_PATH))
+    def build():
+        b64_logo_dinantara = logo_base64(LOGO_DANANTARA_PATH)
+        b64_logo_pln = logo_base64(LOGO_PLN_PATH)
+        if not (b64_logo_dinantara and b64_logo_pln):
+            return None
+        return (
+            '<div class="header-container">'
+            '<div class="logo-container logo-left">'
+            f'<img src="data:image/png;base64,{b64_logo_dinantara}" class="logo-img-dinantara" />'
+            '</div>'
+            '<div class="title-container"><h1 class="main-title">'
+            '<span class="title-line1">Dashboard Geo-Monitor UGB</span>'
+            '<span class="title-line2">PT. PLN UID Lampung</span>'
+            '</h1></div>'
+            '<div class="logo-container logo-right">'
+            f'<img src="data:image/png;base64,{b64_logo_pln}" class="logo-img-pln" />'
+            '</div>'
+            '</div>'
+        )
+    return _cached(('header',), stamp, build)
@@ -0,0 +1,135 @@
+# utils/changes.py
+"""
+Deteksi perubahan antar upload (hash join): baris dikunci dengan PENOMORAN UGB BARU + NO SERI,
+isi baris di-hash, lalu dataset baru dicocokkan ke versi sebelumnya dalam O(n).
+
+Ringkasan tiap upload ditambahkan ke CHANGES_LOG_PATH (JSON Lines), rincian baris
+(ADDED / REMOVED / MODIFIED) disimpan per versi dataset di CHANGES_DIR.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import VALID_COLUMNS, CHANGES_LOG_PATH, CHANGES_DIR
+from .lineage import normalize_serial
+
+KEY_COLUMNS = ['PENOMORAN UGB BARU', 'NO SERI']
+COMPARE_COLUMNS = [c for c in VALID_COLUMNS if c not in KEY_COLUMNS]
+DETAIL_COLUMNS = ['CHANGE', 'PENOMORAN UGB BARU', 'NO SERI', 'UP3', 'ULP', 'PERUBAHAN']
+
+def _text(s: pd.Series) -> np.ndarray:
+    """Nilai sel sebagai teks ter-trim ('' untuk kosong), sama untuk CSV lama maupun frame baru."""
+    return s.astype(object).where(s.notna(), "").astype(str).str.strip().to_numpy(dtype=object)
+
+def _prepare(df: pd.DataFrame) -> Dict[str, Any]:
+    """Array teks per kolom + hash kunci (dengan nomor kemunculan untuk kunci ganda) + hash isi."""
+    cols = {c: (_text(df[c]) if c in df.columns else np.full(len(df), "", dtype=object))
+            for c in KEY_COLUMNS + COMPARE_COLUMNS}
+    peno = pd.Series(cols['PENOMORAN UGB BARU'], dtype=object).str.upper().str.replace(r'\s+', '', regex=True)
+    key = peno.astype(str) + '|' + normalize_serial(pd.Series(cols['NO SERI'], dtype=object)).astype(str)
+    occurrence = key.groupby(key, sort=False).cumcount()
+    key_hash = pd.util.hash_pandas_object(pd.DataFrame({'k': key, 'n': occurrence}), index=False).to_numpy()
+    content = pd.DataFrame({c: cols[c] for c in COMPARE_COLUMNS})
+    content_hash = pd.util.hash_pandas_object(content, index=False).to_numpy()
+    return {'cols': cols, 'key_hash': key_hash, 'content_hash': content_hash}
+
+def diff_datasets(previous: Optional[pd.DataFrame], current: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Bandingkan dataset baru dengan versi sebelumnya.
+
+    Returns:
+        dict: 'summary' {'added', 'removed', 'modified', 'unchanged', 'fields': {kolom: jumlah}}
+        dan 'details' DataFrame[DETAIL_COLUMNS] (PERUBAHAN = "KOLOM: lama → baru; ...").
+    """
+    new = _prepare(current)
+    old = _prepare(previous if previous is not None else pd.DataFrame(columns=KEY_COLUMNS))
+    # Hash join: tabel hash kunci lama, lalu satu lookup per baris baru
+    pos = pd.Index(old['key_hash']).get_indexer(new['key_hash'])
+    matched = pos >= 0
+    added = np.flatnonzero(~matched)
+    old_matched = np.zeros(len(old['key_hash']), dtype=bool)
+    old_matched[pos[matched]] = True
+    removed = np.flatnonzero(~old_matched)
+    new_idx = np.flatnonzero(matched)
+    modified_mask = new['content_hash'][new_idx] != old['content_hash'][pos[new_idx]]
+    mod_new, mod_old = new_idx[modified_mask], pos[new_idx][modified_mask]
+
+    fields: Dict[str, int] = {}
+    changes = [[] for _ in range(len(mod_new))]
+    for col in COMPARE_COLUMNS:
+        before, after = old['cols'][col][mod_old], new['cols'][col][mod_new]
+        diff = np.flatnonzero(before != after)
+        if len(diff):
+            fields[col] = int(len(diff))
+        for i in diff:
+            changes[i].append(f"{col}: {before[i] or '-'} → {after[i] or '-'}")
+
+    def rows(side: Dict[str, Any], idx: np.ndarray, label: str, notes: List[str]) -> pd.DataFrame:
+        return pd.DataFrame({
+            'CHANGE': label,
+            'PENOMORAN UGB BARU': side['cols']['PENOMORAN UGB BARU'][idx],
+            'NO SERI': side['cols']['NO SERI'][idx],
+            'UP3': side['cols']['UP3'][idx],
+            'ULP': side['cols']['ULP'][idx],
+            'PERUBAHAN': notes,
+        }, columns=DETAIL_COLUMNS)
+
+    details = pd.concat([
+        rows(new, added, 'ADDED', [''] * len(added)),
+        rows(old, removed, 'REMOVED', [''] * len(removed)),
+        rows(new, mod_new, 'MODIFIED', ['; '.join(c) for c in changes]),
+    ], ignore_index=True)
+    summary = {
+        'added': int(len(added)),
+        'removed': int(len(removed)),
+        'modified': int(len(mod_new)),
+        'unchanged': int(len(new_idx) - len(mod_new)),
+        'fields': fields,
+    }
+    return {'summary': summary, 'details': details}
+
+def read_previous_dataset(database_path: str) -> Optional[pd.DataFrame]:
+    """Versi sebelumnya sebagai teks apa adanya (tanpa inferensi tipe), hanya kolom yang dibandingkan."""
+    if not os.path.exists(database_path):
+        return None
+    wanted = set(KEY_COLUMNS + COMPARE_COLUMNS)
+    return pd.read_csv(database_path, dtype=str, keep_default_na=False, usecols=lambda c: c in wanted)
+
+def _details_path(version: str) -> str:
+    return os.path.join(CHANGES_DIR, f"{version}.csv")
+
+def record_changes(diff: Dict[str, Any], version: str, previous_version: Optional[str]) -> Dict[str, Any]:
+    """Simpan rincian per versi + tambahkan ringkasan ke log perubahan. Kembalikan entri log."""
+    entry = {
+        'dataset_version': version,
+        'previous_version': previous_version,
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        **diff['summary'],
+    }
+    os.makedirs(CHANGES_DIR, exist_ok=True)
+    diff['details'].to_csv(_details_path(version), index=False)
+    os.makedirs(os.path.dirname(CHANGES_LOG_PATH) or ".", exist_ok=True)
+    with open(CHANGES_LOG_PATH, 'a', encoding='utf-8') as fh:
+        fh.write(json.dumps(entry) + "\n")
+    return entry
+
+def load_change_log(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Ringkasan perubahan per upload, terbaru di depan."""
+    if not os.path.exists(CHANGES_LOG_PATH):
+        return []
+    with open(CHANGES_LOG_PATH, encoding='utf-8') as fh:
+        entries = [json.loads(line) for line in fh if line.strip()]
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+def load_change_details(version: str) -> pd.DataFrame:
+    """Rincian baris ADDED / REMOVED / MODIFIED untuk satu versi dataset (kosong bila tidak ada)."""
+    path = _details_path(version)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=DETAIL_COLUMNS)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
@@ -3,13 +3,36 @@
 Utilitas untuk pemrosesan data UGB dengan normalisasi teks intelligent
 """
 
+import numpy as np
 import pandas as pd
 import re
 import os
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 import shutil
+from io import BytesIO
 from datetime import datetime
-from typing import Dict, List, Tuple, Any, Optional, Union
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple, Any, Optional, Union
 from config import NORMALIZATION_DICTIONARY, VALID_COLUMNS, VALID_SHEETS, BACKUP_PATH, USE_GOOGLE_SHEETS, REPLACE_ON_UPLOAD, DEDUPE_ON_UPLOAD
+from config import HEADER_FUZZY_MAX_DISTANCE, HEADER_FUZZY_MAX_RATIO, HEADER_FUZZY_MIN_LENGTH
+from config import DATE_COLUMNS, DATE_FORMATS, DATE_COLUMN_FORMATS, DATE_INFER_SAMPLE_SIZE, EXCEL_SERIAL_RANGE, INGEST_LOG_PATH
+from config import BATCH_MAX_WORKERS, SOURCE_FILE_COLUMN, CATEGORY_MAX_UNIQUE_RATIO
+from .lineage import record_lineage
+from .changes import diff_datasets, read_previous_dataset, record_changes
+from .status_history import append_status_snapshot
+from .xlsx_sniff import read_workbook_outline
+from .profiler import profiled
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 try:
     if USE_GOOGLE_SHEETS:
         from .gsheets_adapter import load_sheet as gs_load_sheet, save_merge as gs_save_merge
@@ -114,55 +137,239 @@ def build_dedupe_keys_vectorized(df: pd.DataFrame, key_cols: List[str]) -> pd.Se
         key = key.str.cat(s, sep='|')
     return key
 
-def normalize_header(header: str) -> str:
-    """
-    Normalisasi nama header untuk mengatasi typo dan variasi penulisan
-    """
+# ===== Resolusi header: tabel varian dibangun sekali + fuzzy match + memo =====
+# Varian penulisan header yang sering muncul di file lapangan
+HEADER_VARIANTS: Dict[str, List[str]] = {
+    'UP3': ['UP3', 'UP 3', 'UNIT PELAKSANA PELAYANAN PELANGGAN'],
+    'ULP': ['ULP', 'UL P', 'UNIT LAYANAN PELANGGAN'],
+    'KETERANGAN': ['KETERANGAN', 'KETERANGN', 'KETERANAGN', 'KET'],
+    'KAPASITAS': ['KAPASITAS', 'KAPASTAS', 'KAPASITS', 'CAPACITY'],
+    'STATUS': ['STATUS', 'STATS', 'STATE'],
+    'NO SERI': ['NO SERI', 'NOMOR SERI', 'SERIAL NUMBER', 'SN'],
+    'ALAMAT TERPASANG': ['ALAMAT TERPASANG', 'ALAMAT PASANG', 'LOKASI PASANG'],
+    'PENOMORAN UGB BARU': ['PENOMORAN UGB BARU', 'NOMOR UGB BARU', 'NO UGB BARU'],
+    'KOORDINAT TAGGING': ['KOORDINAT TAGGING', 'KOORDINAT TAG', 'COORD TAGGING', 'KOORDINAT'],
+    'MENGGUNAKAN TRAFO RETROFIT/NIAGA': [
+        'MENGGUNAKAN TRAFO RETROFIT/NIAGA',
+        'MENGGUNAKAN TRAFO RETROFIT / NIAGA',
+        'MENGUNAKAN TRAFO RETROFIT/NIAGA',
+        'MENGUNAKAN TRAFO RETROFIT / NIAGA',
+        'MENGUNAKAKAN TRAFO RETROFIT/NIAGA',
+        'MENGUNAKAKAN TRAFO RETROFIT / NIAGA',
+        'MENGGUNAKAKAN TRAFO RETROFIT/NIAGA',
+        'MENGGUNAKAKAN TRAFO RETROFIT / NIAGA',
+        'TRAFO RETROFIT NIAGA',
+        'TRAFO RETROFIT/NIAGA',
+        'TRAFO RETROFIT / NIAGA',
+        'RETROFIT NIAGA',
+        'RETROFIT/NIAGA',
+        'RETROFIT / NIAGA'
+    ],
+    'TANGGAL TERPASANG': ['TANGGAL TERPASANG', 'TGL TERPASANG', 'DATE INSTALLED'],
+    'TANGGAL TERBONGKAR': ['TANGGAL TERBONGKAR', 'TGL TERBONGKAR', 'DATE REMOVED']
+}
+
+def _clean_header(header: Any) -> str:
+    """Bersihkan header mentah: uppercase, buang simbol (kecuali '/'), kompakkan spasi."""
     if pd.isna(header) or header == "":
         return ""
-    
-    # Bersihkan header
     header = str(header).strip().upper()
     header = re.sub(r'[^\w\s/]', ' ', header)
-    header = ' '.join(header.split())
-    
-    # Mapping khusus untuk header yang sering typo
-    header_mappings = {
-        'UP3': ['UP3', 'UP 3', 'UNIT PELAKSANA PELAYANAN PELANGGAN'],
-        'ULP': ['ULP', 'UL P', 'UNIT LAYANAN PELANGGAN'],
-        'KETERANGAN': ['KETERANGAN', 'KETERANGN', 'KETERANAGN', 'KET'],
-        'KAPASITAS': ['KAPASITAS', 'KAPASTAS', 'KAPASITS', 'CAPACITY'],
-        'STATUS': ['STATUS', 'STATS', 'STATE'],
-        'NO SERI': ['NO SERI', 'NOMOR SERI', 'SERIAL NUMBER', 'SN'],
-        'ALAMAT TERPASANG': ['ALAMAT TERPASANG', 'ALAMAT PASANG', 'LOKASI PASANG'],
-        'PENOMORAN UGB BARU': ['PENOMORAN UGB BARU', 'NOMOR UGB BARU', 'NO UGB BARU'],
-        'KOORDINAT TAGGING': ['KOORDINAT TAGGING', 'KOORDINAT TAG', 'COORD TAGGING', 'KOORDINAT'],
-        'MENGGUNAKAN TRAFO RETROFIT/NIAGA': [
-            'MENGGUNAKAN TRAFO RETROFIT/NIAGA',
-            'MENGGUNAKAN TRAFO RETROFIT / NIAGA',
-            'MENGUNAKAN TRAFO RETROFIT/NIAGA',
-            'MENGUNAKAN TRAFO RETROFIT / NIAGA',
-            'MENGUNAKAKAN TRAFO RETROFIT/NIAGA',
-            'MENGUNAKAKAN TRAFO RETROFIT / NIAGA',
-            'MENGGUNAKAKAN TRAFO RETROFIT/NIAGA',
-            'MENGGUNAKAKAN TRAFO RETROFIT / NIAGA',
-            'TRAFO RETROFIT NIAGA',
-            'TRAFO RETROFIT/NIAGA',
-            'TRAFO RETROFIT / NIAGA',
-            'RETROFIT NIAGA',
-            'RETROFIT/NIAGA',
-            'RETROFIT / NIAGA'
-        ],
-        'TANGGAL TERPASANG': ['TANGGAL TERPASANG', 'TGL TERPASANG', 'DATE INSTALLED'],
-        'TANGGAL TERBONGKAR': ['TANGGAL TERBONGKAR', 'TGL TERBONGKAR', 'DATE REMOVED']
+    return ' '.join(header.split())
+
+def _build_header_variant_table() -> Dict[str, str]:
+    """Bangun tabel varian (sudah dibersihkan) -> header baku. Dipanggil sekali saat import."""
+    table: Dict[str, str] = {}
+    for standard, variants in HEADER_VARIANTS.items():
+        table[_clean_header(standard)] = standard
+        for v in variants:
+            table[_clean_header(v)] = standard
+    return table
+
+_HEADER_VARIANT_TABLE = _build_header_variant_table()
+
+def _bounded_edit_distance(a: str, b: str, max_dist: int) -> int:
+    """
+    Jarak edit (Levenshtein + tukar dua huruf bersebelahan dihitung 1, "optimal string
+    alignment") dengan batas atas: berhenti lebih awal dan mengembalikan max_dist + 1
+    begitu jaraknya dipastikan melebihi batas.
+    """
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            # Transposisi (mis. KAPSAITAS -> KAPASITAS) = satu kesalahan ketik
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < cur[j]:
+                cur[j] = prev2[j - 2] + 1
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > max_dist:
+            return max_dist + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= max_dist else max_dist + 1
+
+@lru_cache(maxsize=2048)
+def _resolve_clean_header(cleaned: str) -> Tuple[str, float, str]:
+    """Keputusan resolusi untuk header yang sudah dibersihkan (di-memo per string)."""
+    if cleaned == "":
+        return "", 0.0, "empty"
+    if cleaned == 'NO':
+        return 'NO', 1.0, "exact"
+    standard = _HEADER_VARIANT_TABLE.get(cleaned)
+    if standard is not None:
+        return standard, 1.0, "exact"
+
+    # Header pendek terlalu rawan salah cocok (mis. 'SN' vs 'NO'), jadi tidak di-fuzzy
+    if len(cleaned) < HEADER_FUZZY_MIN_LENGTH:
+        return cleaned, 0.0, "unmatched"
+    max_dist = max(1, min(HEADER_FUZZY_MAX_DISTANCE, int(len(cleaned) * HEADER_FUZZY_MAX_RATIO)))
+
+    best: Optional[str] = None
+    best_dist = max_dist + 1
+    best_len = 0
+    ambiguous = False
+    for variant, standard in _HEADER_VARIANT_TABLE.items():
+        if len(variant) < HEADER_FUZZY_MIN_LENGTH:
+            continue
+        d = _bounded_edit_distance(cleaned, variant, max_dist)
+        if d < best_dist:
+            best, best_dist, best_len, ambiguous = standard, d, len(variant), False
+        elif d == best_dist and d <= max_dist and standard != best:
+            ambiguous = True
+
+    if best is None or best_dist > max_dist or ambiguous:
+        return cleaned, 0.0, "unmatched"
+    confidence = round(1.0 - best_dist / max(len(cleaned), best_len), 3)
+    return best, confidence, "fuzzy"
+
+def resolve_header(header: Any) -> Tuple[str, float, str]:
+    """
+    Resolusi header ke nama baku di VALID_COLUMNS.
+
+    Returns:
+        Tuple[str, float, str]: (header hasil, confidence 0..1, metode: exact/fuzzy/unmatched/empty)
+    """
+    return _resolve_clean_header(_clean_header(header))
+
+def normalize_header(header: str) -> str:
+    """
+    Normalisasi nama header untuk mengatasi typo dan variasi penulisan
+    """
+    return resolve_header(header)[0]
+
+# ===== Parsing tanggal saat ingest (inferensi format sekali per kolom) =====
+_MONTH_NAMES = {
+    'JANUARI': 1, 'JANUARY': 1, 'JAN': 1,
+    'FEBRUARI': 2, 'FEBRUARY': 2, 'PEBRUARI': 2, 'FEB': 2, 'PEB': 2,
+    'MARET': 3, 'MARCH': 3, 'MAR': 3,
+    'APRIL': 4, 'APR': 4,
+    'MEI': 5, 'MAY': 5,
+    'JUNI': 6, 'JUNE': 6, 'JUN': 6,
+    'JULI': 7, 'JULY': 7, 'JUL': 7,
+    'AGUSTUS': 8, 'AUGUST': 8, 'AGS': 8, 'AGT': 8, 'AUG': 8, 'AGU': 8,
+    'SEPTEMBER': 9, 'SEPT': 9, 'SEP': 9,
+    'OKTOBER': 10, 'OCTOBER': 10, 'OKT': 10, 'OCT': 10,
+    'NOVEMBER': 11, 'NOPEMBER': 11, 'NOV': 11, 'NOP': 11,
+    'DESEMBER': 12, 'DECEMBER': 12, 'DES': 12, 'DEC': 12,
+}
+_MONTH_PATTERN = re.compile(r'\b(' + '|'.join(sorted(_MONTH_NAMES, key=len, reverse=True)) + r')\b')
+
+def _month_names_to_numeric(s: pd.Series) -> pd.Series:
+    """'15 Januari 2024' / '15-Jan-2024' -> '15/01/2024' (hanya untuk nilai yang mengandung huruf)."""
+    s = s.str.upper().str.replace(_MONTH_PATTERN, lambda m: f"{_MONTH_NAMES[m.group(1)]:02d}", regex=True)
+    s = s.str.replace(r'[\s\-\.,]+', '/', regex=True).str.strip('/')
+    return s
+
+def parse_date_series(series: pd.Series, formats: Optional[List[str]] = None) -> Tuple[pd.Series, Dict[str, Any]]:
+    """
+    Parse satu kolom tanggal menjadi datetime64 dengan inferensi format sekali per kolom.
+
+    Urutan: nomor seri Excel -> nama bulan (ID/EN) -> format kandidat yang paling banyak cocok
+    pada sampel nilai unik. Bila kolom berisi campuran format, langkah inferensi diulang untuk
+    sisa nilai yang belum ter-parse. Kandidat: `formats`, atau DATE_COLUMN_FORMATS[nama kolom],
+    atau DATE_FORMATS. Nilai yang tidak cocok dengan kandidat mana pun tetap NaT (unparseable).
+
+    Returns:
+        Tuple[pd.Series, Dict]: (series datetime, ringkasan: formats/excel_serial/parsed/unparseable)
+    """
+    if formats is None:
+        formats = DATE_COLUMN_FORMATS.get(series.name, DATE_FORMATS)
+    text = series.astype(object).where(series.notna(), "").astype(str).str.strip()
+    text = text.mask(text.isin(['nan', 'NaN', 'None', 'NaT']), "")
+    nonempty = text.ne("").to_numpy()
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+    # 1) Nomor seri Excel (sel tanggal yang tersimpan sebagai angka)
+    num = pd.to_numeric(text.where(nonempty), errors='coerce')
+    lo, hi = EXCEL_SERIAL_RANGE
+    serial_mask = num.between(lo, hi).to_numpy()
+    if serial_mask.any():
+        result[serial_mask] = pd.Timestamp('1899-12-30') + pd.to_timedelta(num[serial_mask], unit='D')
+
+    # 2) Nama bulan -> angka, agar bisa ikut format dd/mm/yyyy
+    has_alpha = (text.str.contains(r'[A-Za-z]', regex=True) & ~pd.Series(serial_mask, index=text.index)).to_numpy()
+    if has_alpha.any():
+        text = text.copy()
+        text[has_alpha] = _month_names_to_numeric(text[has_alpha])
+
+    # 3) Inferensi format pada sampel nilai unik, lalu parse vektorisasi
+    formats_used: List[Dict[str, Any]] = []
+    pending = nonempty & ~serial_mask
+    for _ in range(len(formats)):
+        if not pending.any():
+            break
+        sample = text[pending].drop_duplicates().head(DATE_INFER_SAMPLE_SIZE)
+        best_fmt, best_hits = None, 0
+        for fmt in formats:
+            hits = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+            if hits > best_hits:
+                best_fmt, best_hits = fmt, hits
+        if best_fmt is None:
+            break
+        parsed = pd.to_datetime(text[pending], format=best_fmt, errors='coerce')
+        ok = parsed.notna().to_numpy()
+        idx = np.flatnonzero(pending)[ok]
+        result.iloc[idx] = parsed[ok].to_numpy()
+        formats_used.append({'format': best_fmt, 'rows': int(ok.sum())})
+        pending[idx] = False
+
+    summary = {
+        'formats': formats_used,
+        'excel_serial': int(serial_mask.sum()),
+        'parsed': int(result.notna().sum()),
+        'empty': int((~nonempty).sum()),
+        'unparseable': int(pending.sum()),
     }
-    
-    # Cari header yang cocok
-    for standard, variants in header_mappings.items():
-        if header in variants:
-            return standard
-    
-    return header
+    return result, summary
+
+@profiled()
+def add_typed_date_columns(df: pd.DataFrame, report: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Tambahkan kolom datetime ter-tipe (lihat DATE_COLUMNS) dari kolom tanggal sumber.
+    Ringkasan parsing per kolom ditulis ke report['date_parsing'] bila report diberikan.
+    """
+    for src, dst in DATE_COLUMNS.items():
+        if src not in df.columns:
+            continue
+        parsed, summary = parse_date_series(df[src])
+        df[dst] = parsed
+        if report is not None:
+            report.setdefault('date_parsing', {})[src] = summary
+    return df
+
+def date_sort_key(df: pd.DataFrame, column: str = 'TANGGAL TERPASANG') -> pd.Series:
+    """Kunci urut tanggal: pakai kolom ter-tipe hasil ingest bila ada, parse sebagai fallback."""
+    typed = DATE_COLUMNS.get(column)
+    if typed and typed in df.columns:
+        return df[typed]
+    if column in df.columns:
+        return parse_date_series(df[column])[0]
+    return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
 
 def validate_sheet_name(sheet_name: str) -> bool:
     """
@@ -181,110 +388,325 @@ def validate_sheet_name(sheet_name: str) -> bool:
     
     return False
 
-def process_excel_file(file_data) -> Tuple[bool, str, pd.DataFrame]:
+# ===== Validasi struktur workbook (dipakai sniffing & parsing penuh) =====
+# Kolom yang boleh tidak ada di sheet (diisi kosong saat ingest)
+OPTIONAL_COLUMNS = {'MENGGUNAKAN TRAFO RETROFIT/NIAGA'}
+
+def _resolve_sheet_headers(columns) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Petakan header mentah ke VALID_COLUMNS (atau 'NO'); header lain dipertahankan apa adanya.
+
+    Returns:
+        (nama kolom hasil normalisasi, [{'raw', 'header', 'confidence', 'method'}, ...])
+    """
+    normalized_cols = []
+    mappings = []
+    for col in columns:
+        norm, confidence, method = resolve_header(col)
+        if norm in VALID_COLUMNS or norm == 'NO':
+            normalized_cols.append(norm)
+        else:
+            normalized_cols.append(str(col))  # pertahankan nama asli
+            norm, confidence, method = str(col), 0.0, "unmatched"
+        mappings.append({'raw': str(col), 'header': norm, 'confidence': confidence, 'method': method})
+    return normalized_cols, mappings
+
+def _missing_columns(columns) -> List[str]:
+    present = set(columns)
+    return [c for c in VALID_COLUMNS if c not in present]
+
+def sniff_workbook(file_data) -> Dict[str, Any]:
+    """
+    Pre-flight cepat (< 1 dtk, tanpa membaca data): nama sheet + baris header + perkiraan
+    jumlah baris dari utils.xlsx_sniff, divalidasi dengan validate_sheet_name & resolve_header.
+
+    Returns:
+        dict: {'sheets': [{'sheet', 'valid', 'est_rows', 'exact', 'missing', 'fuzzy'}],
+               'errors': [pesan penolakan], 'warnings': [pesan], 'est_rows', 'seconds'}.
+        Bila sniffing sendiri gagal (format tidak dikenal), 'skipped' berisi alasannya dan
+        tidak ada error: parsing penuh tetap dijalankan dan menjadi penentu.
+    """
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {'sheets': [], 'errors': [], 'warnings': [], 'est_rows': 0}
+    try:
+        outline = read_workbook_outline(file_data)
+    except Exception as e:
+        result['skipped'] = str(e)
+        result['seconds'] = round(time.perf_counter() - t0, 4)
+        return result
+
+    for item in outline:
+        valid = validate_sheet_name(str(item['sheet']))
+        entry = {'sheet': str(item['sheet']), 'valid': valid, 'est_rows': item['est_rows'],
+                 'exact': item['exact'], 'missing': [], 'fuzzy': 0}
+        if valid:
+            header = [h for h in item['header'] if h is not None and str(h).strip() != '']
+            normalized, mappings = _resolve_sheet_headers(header)
+            entry['missing'] = _missing_columns(normalized)
+            entry['fuzzy'] = sum(1 for m in mappings if m['method'] == 'fuzzy')
+            result['est_rows'] += item['est_rows']
+        result['sheets'].append(entry)
+
+    valid_sheets = [e for e in result['sheets'] if e['valid']]
+    ignored = [e['sheet'] for e in result['sheets'] if not e['valid']]
+    if not valid_sheets:
+        result['errors'].append(f"Tidak ditemukan sheet yang valid. Sheet harus salah satu dari: {', '.join(VALID_SHEETS)}")
+    for e in valid_sheets:
+        blocking = [c for c in e['missing'] if c not in OPTIONAL_COLUMNS]
+        if blocking:
+            result['errors'].append(f"Sheet '{e['sheet']}' kehilangan kolom: {', '.join(blocking)}")
+        elif e['missing']:
+            result['warnings'].append(f"Sheet '{e['sheet']}' tanpa kolom {', '.join(e['missing'])} (diisi kosong)")
+        if e['est_rows'] == 0:
+            result['warnings'].append(f"Sheet '{e['sheet']}' tidak berisi baris data")
+    if ignored and valid_sheets:
+        result['warnings'].append(f"Sheet diabaikan (nama tidak dikenal): {', '.join(ignored)}")
+    result['seconds'] = round(time.perf_counter() - t0, 4)
+    return result
+
+# ===== Event progres & timing per tahap ingest =====
+# Label tahap untuk UI/CLI
+INGEST_STAGE_LABELS = {
+    'sniff': 'Memeriksa struktur workbook',
+    'open': 'Membuka workbook',
+    'workbook': 'Memproses workbook',
+    'read': 'Membaca sheet',
+    'header': 'Normalisasi header',
+    'clean': 'Membersihkan data',
+    'filter': 'Menyaring baris',
+    'merge': 'Menggabungkan sheet',
+    'dates': 'Parsing tanggal',
+    'sort': 'Mengurutkan data',
+    'quality': 'Validasi kualitas data',
+    'dtypes': 'Optimasi tipe data',
+    'backup': 'Backup database lama',
+    'save': 'Menyimpan database',
+    'diff': 'Mendeteksi perubahan',
+    'post_commit': 'Memperbarui versi & indeks',
+}
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+class IngestCancelled(BaseException):
+    """
+    Dilempar oleh callback progres untuk membatalkan ingest di batas tahap.
+    Turunan BaseException agar tidak tertelan `except Exception` di dalam pipeline.
+    """
+
+# Satu commit database pada satu waktu per proses (worker latar belakang, batch, CLI)
+_COMMIT_LOCK = threading.Lock()
+
+@contextmanager
+def _database_file_lock(database_path: str):
+    """
+    Kunci antar proses (file <database>.lock) agar CLI ingest dan aplikasi Streamlit tidak
+    commit bersamaan. Tanpa fcntl (Windows) hanya _COMMIT_LOCK per proses yang berlaku.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+    with open(f"{database_path}.lock", 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+def _plan_stages(report: Dict[str, Any], n: int) -> None:
+    """
+    Tambah jumlah tahap yang direncanakan (penyebut progres). Setelah ada tahap selesai yang
+    terkirim ke on_progress, total tidak dinaikkan lagi agar progres tidak pernah mundur.
+    """
+    if report.get('_progress_shown'):
+        return
+    report['stages_total'] = report.get('stages_total', 0) + n
+
+def _hold_progress(report: Dict[str, Any]) -> None:
+    """Tahan event progres sampai _release_progress (dipakai selama jumlah tahap belum diketahui)."""
+    report.setdefault('_held_events', [])
+
+def _release_progress(report: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> None:
+    """Kirim event yang ditahan dengan total terbaru; no-op bila tidak sedang menahan."""
+    for event in report.pop('_held_events', None) or []:
+        event['total'] = max(report.get('stages_total', 0), event['done'] + (event['status'] == 'start'))
+        _emit_stage(report, on_progress, event)
+
+def _emit(on_progress: Optional[ProgressCallback], event: Dict[str, Any]) -> None:
+    if on_progress is None:
+        return
+    try:
+        on_progress(event)
+    except Exception as e:
+        print(f"Callback progres gagal: {str(e)}")
+
+def _emit_stage(report: Dict[str, Any], on_progress: Optional[ProgressCallback], event: Dict[str, Any]) -> None:
+    held = report.get('_held_events')
+    if held is not None:
+        held.append(event)
+        return
+    if event['done'] and on_progress is not None:
+        report['_progress_shown'] = True
+    _emit(on_progress, event)
+
+@contextmanager
+def _stage(report: Dict[str, Any], on_progress: Optional[ProgressCallback], stage: str, sheet: Optional[str] = None):
+    """
+    Ukur satu tahap ingest. Kirim event 'start'/'done' ke on_progress dan catat
+    {'stage', 'sheet', 'seconds', 'rows'} ke report['timings']. Isi info['rows'] di dalam blok
+    bila jumlah baris hasil tahap diketahui.
+    """
+    timings = report.setdefault('timings', [])
+    base = {'stage': stage, 'sheet': sheet, 'label': INGEST_STAGE_LABELS.get(stage, stage)}
+    _emit_stage(report, on_progress, {**base, 'status': 'start', 'done': len(timings), 'total': max(report.get('stages_total', 0), len(timings) + 1)})
+    info: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - t0
+        timings.append({'stage': stage, 'sheet': sheet, 'seconds': round(seconds, 4), 'rows': info.get('rows')})
+        _emit_stage(report, on_progress, {**base, 'status': 'done', 'seconds': seconds, 'rows': info.get('rows'),
+                                          'done': len(timings), 'total': max(report.get('stages_total', 0), len(timings))})
+
+@profiled()
+def process_excel_file(file_data, report: Optional[Dict[str, Any]] = None,
+                       on_progress: Optional[ProgressCallback] = None,
+                       sniff: bool = True, validate: bool = True) -> Tuple[bool, str, pd.DataFrame]:
     """
     Proses file Excel yang diupload
+
+    Args:
+        file_data: path atau file-like object workbook
+        report: dict opsional yang akan diisi detail proses, mis.
+            report['header_mappings'][sheet] = [{'raw', 'header', 'confidence', 'method'}, ...]
+            report['date_parsing'][kolom] = ringkasan parse_date_series + 'unparseable_rows'
+            report['timings'] = [{'stage', 'sheet', 'seconds', 'rows'}, ...]
+            report['quality'] / ['quality_issues'] / ['quality_matrix'] = hasil utils.quality.check_data_quality
+        on_progress: callback opsional yang menerima event per tahap
+            {'stage', 'sheet', 'label', 'status': 'start'|'done', 'done', 'total', 'seconds', 'rows'}
+        sniff: jalankan sniff_workbook dulu (hasil di report['sniff']); False bila sudah dilakukan pemanggil
+        validate: jalankan validasi kualitas data; False bila pemanggil memvalidasi hasil gabungan (batch)
     
     Returns:
         Tuple[bool, str, pd.DataFrame]: (success, message, dataframe)
     """
+    if report is None:
+        report = {}
+    report.setdefault('header_mappings', {})
+    # Total tahap bergantung jumlah sheet valid: event ditahan sampai total final direncanakan
+    # sekali, agar penyebut progres tidak berubah setelah tampil
+    _hold_progress(report)
+    # sniff, open, 4 tahap per sheet, merge, dates, sort (+ quality)
+    stages = lambda n_sheets: int(sniff) + 1 + 4 * n_sheets + 3 + int(validate)
     try:
-        # Baca file Excel
-        excel_file = pd.ExcelFile(file_data)
-        
-        # Validasi sheet names
-        valid_sheets = []
-        for sheet_name in excel_file.sheet_names:
-            if validate_sheet_name(str(sheet_name)):
-                valid_sheets.append(str(sheet_name))
+        if sniff:
+            with _stage(report, on_progress, 'sniff'):
+                # Pre-flight murah: tolak workbook yang pasti gagal sebelum parsing penuh
+                preflight = sniff_workbook(file_data)
+                report['sniff'] = preflight
+            if preflight['errors']:
+                return False, preflight['errors'][0], pd.DataFrame()
+            if not preflight.get('skipped'):
+                _plan_stages(report, stages(sum(e['valid'] for e in preflight['sheets'])))
+                _release_progress(report, on_progress)
+        with _stage(report, on_progress, 'open'):
+            # Baca file Excel
+            excel_file = pd.ExcelFile(file_data)
+            
+            # Validasi sheet names
+            valid_sheets = []
+            for sheet_name in excel_file.sheet_names:
+                if validate_sheet_name(str(sheet_name)):
+                    valid_sheets.append(str(sheet_name))
         
         if not valid_sheets:
             return False, f"Tidak ditemukan sheet yang valid. Sheet harus salah satu dari: {', '.join(VALID_SHEETS)}", pd.DataFrame()
+
+        if '_held_events' in report:
+            # Sniff dilewati / tidak dijalankan: jumlah sheet baru diketahui setelah workbook dibuka
+            _plan_stages(report, stages(len(valid_sheets)))
+            _release_progress(report, on_progress)
         
         # Proses setiap sheet yang valid
         all_dataframes = []
         
         for sheet_name in valid_sheets:
             try:
-                # Baca seluruh kolom sheet (kita akan buang kolom NO sumber secara eksplisit)
-                df = pd.read_excel(
-                    excel_file,
-                    sheet_name=sheet_name,
-                    header=0,
-                    dtype=str  # Baca sebagai string untuk menjaga nilai asli
-                )
-
-                # Normalisasi hanya untuk header yang dikenal; sisanya biarkan apa adanya
-                normalized_cols = []
-                for col in df.columns:
-                    norm = normalize_header(col)
-                    if norm in VALID_COLUMNS or norm == 'NO':
-                        normalized_cols.append(norm)
-                    else:
-                        normalized_cols.append(str(col))  # pertahankan nama asli
-                df.columns = normalized_cols
-
-                # Jika ada kolom yang ter-normalisasi ganda (nama sama), gabungkan nilainya dan sisakan satu kolom
-                # Prioritaskan nilai pertama yang tidak kosong per baris
-                from collections import Counter, defaultdict
-                name_counts = Counter(df.columns)
-                dup_names = [n for n, c in name_counts.items() if c > 1]
-                for name in dup_names:
-                    # Ambil semua kolom dengan nama ini dalam urutan kemunculan
-                    same_cols = [c for c in df.columns if c == name]
-                    base = df[same_cols[0]].astype(str)
-                    for extra in same_cols[1:]:
-                        extra_series = df[extra].astype(str)
-                        base = base.where(base.str.strip().ne(''), extra_series)
-                    # Tulis kembali ke kolom pertama dan drop sisanya
-                    df[same_cols[0]] = base
-                    df = df.drop(columns=same_cols[1:])
-
-                # Pastikan kolom 'NO' dari file sumber tidak ikut dipakai
-                df = df.drop(columns=['NO'], errors='ignore')
-                
-                # Validasi struktur kolom
-                missing_columns = []
-                for required_col in VALID_COLUMNS:
-                    if required_col not in df.columns:
-                        missing_columns.append(required_col)
+                with _stage(report, on_progress, 'read', sheet_name) as info:
+                    # Baca seluruh kolom sheet (kita akan buang kolom NO sumber secara eksplisit)
+                    df = pd.read_excel(
+                        excel_file,
+                        sheet_name=sheet_name,
+                        header=0,
+                        dtype=str  # Baca sebagai string untuk menjaga nilai asli
+                    )
+                    info['rows'] = len(df)
 
-                # Kolom opsional yang boleh tidak ada
-                optional_cols = {'MENGGUNAKAN TRAFO RETROFIT/NIAGA'}
-                blocking_missing = [c for c in missing_columns if c not in optional_cols]
+                with _stage(report, on_progress, 'header', sheet_name):
+                    # Normalisasi hanya untuk header yang dikenal; sisanya biarkan apa adanya
+                    normalized_cols, sheet_mappings = _resolve_sheet_headers(df.columns)
+                    df.columns = normalized_cols
+                    report['header_mappings'][sheet_name] = sheet_mappings
+
+                    # Jika ada kolom yang ter-normalisasi ganda (nama sama), gabungkan nilainya dan sisakan satu kolom
+                    # Prioritaskan nilai pertama yang tidak kosong per baris
+                    from collections import Counter, defaultdict
+                    name_counts = Counter(df.columns)
+                    dup_names = [n for n, c in name_counts.items() if c > 1]
+                    for name in dup_names:
+                        # Ambil semua kolom dengan nama ini dalam urutan kemunculan
+                        same_cols = [c for c in df.columns if c == name]
+                        base = df[same_cols[0]].astype(str)
+                        for extra in same_cols[1:]:
+                            extra_series = df[extra].astype(str)
+                            base = base.where(base.str.strip().ne(''), extra_series)
+                        # Tulis kembali ke kolom pertama dan drop sisanya
+                        df[same_cols[0]] = base
+                        df = df.drop(columns=same_cols[1:])
+
+                    # Pastikan kolom 'NO' dari file sumber tidak ikut dipakai
+                    df = df.drop(columns=['NO'], errors='ignore')
+                    
+                    # Validasi struktur kolom
+                    blocking_missing = [c for c in _missing_columns(df.columns) if c not in OPTIONAL_COLUMNS]
 
                 if blocking_missing:
                     return False, f"Sheet '{sheet_name}' kehilangan kolom: {', '.join(blocking_missing)}", pd.DataFrame()
 
-                # Tambahkan kolom opsional yang hilang sebagai kosong
-                for opt in optional_cols:
-                    if opt not in df.columns:
-                        df[opt] = ""
+                with _stage(report, on_progress, 'clean', sheet_name) as info:
+                    # Tambahkan kolom opsional yang hilang sebagai kosong
+                    for opt in OPTIONAL_COLUMNS:
+                        if opt not in df.columns:
+                            df[opt] = ""
 
-                # Reorder: letakkan kolom yang wajib di depan, tapi JANGAN buang kolom-kolom lain
-                known_cols_ordered = [c for c in VALID_COLUMNS if c in df.columns]
-                other_cols = [c for c in df.columns if c not in known_cols_ordered]
-                df = df[known_cols_ordered + other_cols]
+                    # Reorder: letakkan kolom yang wajib di depan, tapi JANGAN buang kolom-kolom lain
+                    known_cols_ordered = [c for c in VALID_COLUMNS if c in df.columns]
+                    other_cols = [c for c in df.columns if c not in known_cols_ordered]
+                    df = df[known_cols_ordered + other_cols]
 
-                # Tambah kolom source sheet (di akhir)
-                df['SOURCE_SHEET'] = sheet_name
-                
-                # PRESERVE: Jangan normalisasi isi kolom (hindari mengubah kata seperti "RUSAK" -> "BURUK")
-                # Hanya bersihkan spasi awal/akhir dan ubah NaN menjadi string kosong
-                for col in df.columns:
-                    if col != 'SOURCE_SHEET':
-                        df[col] = df[col].apply(lambda v: "" if pd.isna(v) else str(v).strip())
-                
-                # Hapus baris kosong (benar-benar kosong di semua kolom)
-                df = df.dropna(how='all')
-                df = df[df.apply(lambda x: x.astype(str).str.strip().ne('').any(), axis=1)]
+                    # Tambah kolom source sheet (di akhir)
+                    df['SOURCE_SHEET'] = sheet_name
+                    
+                    # PRESERVE: Jangan normalisasi isi kolom (hindari mengubah kata seperti "RUSAK" -> "BURUK")
+                    # Hanya bersihkan spasi awal/akhir dan ubah NaN menjadi string kosong (vektorisasi per kolom)
+                    data_cols = [c for c in df.columns if c != 'SOURCE_SHEET']
+                    for col in data_cols:
+                        df[col] = df[col].fillna("").astype(str).str.strip()
+                    
+                    # Hapus baris kosong (benar-benar kosong di semua kolom data)
+                    if data_cols:
+                        df = df[df[data_cols].ne("").any(axis=1)]
+                    info['rows'] = len(df)
                 
-                if not df.empty:
-                    # Batasi per lembar: hanya baris dengan PENOMORAN UGB BARU non-empty
-                    if 'PENOMORAN UGB BARU' in df.columns:
-                        df = df[df['PENOMORAN UGB BARU'].astype(str).str.strip().ne('')]
+                with _stage(report, on_progress, 'filter', sheet_name) as info:
                     if not df.empty:
-                        all_dataframes.append(df)
+                        # Batasi per lembar: hanya baris dengan PENOMORAN UGB BARU non-empty
+                        if 'PENOMORAN UGB BARU' in df.columns:
+                            df = df[df['PENOMORAN UGB BARU'].astype(str).str.strip().ne('')]
+                        if not df.empty:
+                            all_dataframes.append(df)
+                    info['rows'] = len(df)
                     
             except Exception as e:
                 return False, f"Error memproses sheet '{sheet_name}': {str(e)}", pd.DataFrame()
@@ -292,66 +714,138 @@ def process_excel_file(file_data) -> Tuple[bool, str, pd.DataFrame]:
         if not all_dataframes:
             return False, "Tidak ada data valid yang ditemukan dalam file", pd.DataFrame()
         
-        # Gabungkan semua dataframe
-        final_df = pd.concat(all_dataframes, ignore_index=True)
+        with _stage(report, on_progress, 'merge') as info:
+            # Gabungkan semua dataframe
+            final_df = pd.concat(all_dataframes, ignore_index=True)
 
-        # Sertakan HANYA baris yang memiliki PENOMORAN UGB BARU (non-empty)
-        if 'PENOMORAN UGB BARU' in final_df.columns:
-            final_df = final_df[final_df['PENOMORAN UGB BARU'].astype(str).str.strip().ne('')]
+            # Sertakan HANYA baris yang memiliki PENOMORAN UGB BARU (non-empty)
+            if 'PENOMORAN UGB BARU' in final_df.columns:
+                final_df = final_df[final_df['PENOMORAN UGB BARU'].astype(str).str.strip().ne('')]
+            info['rows'] = len(final_df)
 
         # Nonaktifkan deduplikasi: tampilkan persis isi file
 
-        # Urutkan berdasarkan tanggal terpasang SECARA SEMENTARA (tanpa mengubah nilai asli di kolom)
-        if 'TANGGAL TERPASANG' in final_df.columns:
-            try:
-                sort_key = pd.to_datetime(final_df['TANGGAL TERPASANG'], errors='coerce')
-                final_df = final_df.assign(_SORT_KEY=sort_key).sort_values('_SORT_KEY', ascending=False, na_position='last').drop(columns=['_SORT_KEY'])
-            except Exception:
-                # Jika gagal parsing tanggal, biarkan urutan apa adanya
-                pass
+        with _stage(report, on_progress, 'dates'):
+            # Parse kolom tanggal SEKALI di sini (nilai asli tetap; hasil ter-tipe di kolom turunan)
+            final_df = add_typed_date_columns(final_df.copy(), report)
 
-        # Tambah kolom NO otomatis (data baru di atas)
-        if 'NO' in final_df.columns:
-            final_df = final_df.drop(columns=['NO'])
-        final_df.insert(0, 'NO', range(1, len(final_df) + 1))
+        with _stage(report, on_progress, 'sort') as info:
+            # Urutkan berdasarkan tanggal terpasang (kolom ter-tipe) tanpa mengubah nilai asli di kolom
+            if DATE_COLUMNS['TANGGAL TERPASANG'] in final_df.columns:
+                final_df = final_df.sort_values(DATE_COLUMNS['TANGGAL TERPASANG'], ascending=False, na_position='last', kind='stable')
+
+            # Tambah kolom NO otomatis (data baru di atas)
+            if 'NO' in final_df.columns:
+                final_df = final_df.drop(columns=['NO'])
+            final_df.insert(0, 'NO', range(1, len(final_df) + 1))
+            info['rows'] = len(final_df)
+
+        # Catat baris yang tanggalnya tidak bisa di-parse (berdasarkan NO final)
+        _record_unparseable_dates(final_df, report)
+        if validate:
+            _check_quality(final_df, report, on_progress)
 
         msg = f"Berhasil memproses {len(final_df)} baris data dari {len(valid_sheets)} sheet"
         return True, msg, final_df
         
     except Exception as e:
         return False, f"Error membaca file: {str(e)}", pd.DataFrame()
+    finally:
+        # Gagal sebelum total direncanakan: tetap kirim event yang tertahan
+        _release_progress(report, on_progress)
+
+def _record_unparseable_dates(final_df: pd.DataFrame, report: Dict[str, Any]) -> None:
+    """Isi report['date_parsing'][kolom]['unparseable_rows'] berdasarkan NO final."""
+    provenance = [c for c in ('NO', 'SOURCE_SHEET', SOURCE_FILE_COLUMN) if c in final_df.columns]
+    for src, dst in DATE_COLUMNS.items():
+        if src in final_df.columns and dst in final_df.columns and src in report.get('date_parsing', {}):
+            bad = final_df[final_df[src].astype(str).str.strip().ne('') & final_df[dst].isna()]
+            report['date_parsing'][src]['unparseable_rows'] = bad[provenance + [src]].to_dict('records')
+
+def _check_quality(final_df: pd.DataFrame, report: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> None:
+    """Tahap 'quality': aturan utils.quality atas frame final (tidak menolak upload, hanya melaporkan)."""
+    from .quality import check_data_quality  # utils.quality mengimpor modul ini
+    with _stage(report, on_progress, 'quality') as info:
+        summary, issues, matrix = check_data_quality(final_df)
+        report['quality'] = summary
+        report['quality_issues'] = issues
+        report['quality_matrix'] = matrix
+        info['rows'] = summary['rows_with_issues']
 
-def save_to_database(df: pd.DataFrame, database_path: str) -> bool:
+@profiled()
+def save_to_database(df: pd.DataFrame, database_path: str, report: Optional[Dict[str, Any]] = None,
+                     on_progress: Optional[ProgressCallback] = None) -> bool:
     """
     Simpan dataframe ke database CSV
+
+    report/on_progress: sama seperti process_excel_file (tahap 'backup', 'save', 'diff', 'post_commit').
+    Versi dataset yang diterbitkan dicatat di report['dataset_version'], ringkasan perubahan
+    terhadap versi sebelumnya (CSV) di report['changes'], dan isi database setelah commit (CSV,
+    dibaca balik seperti load_database) di report['committed_df'].
     """
+    if report is None:
+        report = {}
+    if not report.pop('_save_planned', False):
+        _plan_stages(report, 4)
     try:
         # Jika menggunakan Google Sheets sebagai database
         if USE_GOOGLE_SHEETS and gs_save_merge is not None:
             if REPLACE_ON_UPLOAD:
                 # Replace mode: clear and write only the new data
                 try:
-                    from .gsheets_adapter import _get_client
-                    from config import GSHEETS_SPREADSHEET_ID, GSHEETS_SHEET_NAME
-                    gc = _get_client()
-                    sh = gc.open_by_key(GSHEETS_SPREADSHEET_ID)
-                    ws = sh.worksheet(GSHEETS_SHEET_NAME)
-                    ws.clear()
-                    to_write = df.drop(columns=['NO'], errors='ignore').copy()
-                    to_write.insert(0, 'NO', range(1, len(to_write) + 1))
-                    values = [to_write.columns.tolist()] + to_write.astype(str).values.tolist()
-                    ws.update(values)
+                    with _stage(report, on_progress, 'save') as info:
+                        from .gsheets_adapter import _get_client
+                        from config import GSHEETS_SPREADSHEET_ID, GSHEETS_SHEET_NAME
+                        gc = _get_client()
+                        sh = gc.open_by_key(GSHEETS_SPREADSHEET_ID)
+                        ws = sh.worksheet(GSHEETS_SHEET_NAME)
+                        ws.clear()
+                        to_write = df.drop(columns=['NO'] + list(DATE_COLUMNS.values()), errors='ignore').copy()
+                        to_write.insert(0, 'NO', range(1, len(to_write) + 1))
+                        values = [to_write.columns.tolist()] + to_write.astype(str).values.tolist()
+                        ws.update(values)
+                        info['rows'] = len(to_write)
+                    with _stage(report, on_progress, 'post_commit'):
+                        report['dataset_version'] = _post_commit(database_path, df, len(to_write))
                     return True
                 except Exception as e:
                     print(f"Gagal replace Google Sheets: {e}")
                     return False
             # Append/Merge mode
-            ok, msg = gs_save_merge(df.drop(columns=['NO'], errors='ignore'))
+            with _stage(report, on_progress, 'save') as info:
+                ok, msg = gs_save_merge(df.drop(columns=['NO'] + list(DATE_COLUMNS.values()), errors='ignore'))
+                info['rows'] = len(df)
             if not ok:
                 print(msg)
                 return False
+            with _stage(report, on_progress, 'post_commit'):
+                report['dataset_version'] = _post_commit(database_path, df, len(df))
             return True
 
+        with _COMMIT_LOCK, _database_file_lock(database_path):
+            return _commit_csv(df, database_path, report, on_progress)
+        
+    except Exception as e:
+        print(f"Error menyimpan database: {str(e)}")
+        return False
+
+def _write_csv_atomic(df: pd.DataFrame, path: str) -> None:
+    """Tulis CSV ke file sementara lalu os.replace: pembaca tidak pernah melihat file setengah jadi."""
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _commit_csv(df: pd.DataFrame, database_path: str, report: Dict[str, Any],
+                on_progress: Optional[ProgressCallback]) -> bool:
+    """Tahap backup -> save -> diff -> post_commit untuk database CSV (dipanggil di bawah _COMMIT_LOCK)."""
+    previous_version = get_dataset_version(database_path) if os.path.exists(database_path) else None
+    with _stage(report, on_progress, 'backup'):
+        # Versi lama dibaca (sebagai teks) sebelum ditimpa, untuk deteksi perubahan
+        try:
+            previous = read_previous_dataset(database_path)
+        except Exception as pe:
+            print(f"Gagal membaca versi sebelumnya: {str(pe)}")
+            previous = None
         # Jika database sudah ada, buat backup cepat dan gabungkan data
         if os.path.exists(database_path):
             # Backup file lama dengan timestamp (best-effort)
@@ -365,6 +859,7 @@ def save_to_database(df: pd.DataFrame, database_path: str) -> bool:
             except Exception as be:
                 print(f"Backup gagal: {str(be)}")
 
+    with _stage(report, on_progress, 'save') as info:
         # Tentukan mode simpan: replace atau append
         if REPLACE_ON_UPLOAD:
             combined_df = df.copy()
@@ -373,7 +868,7 @@ def save_to_database(df: pd.DataFrame, database_path: str) -> bool:
             combined_df.insert(0, 'NO', range(1, len(combined_df) + 1))
         else:
             if os.path.exists(database_path):
-                existing_df = pd.read_csv(database_path)
+                existing_df = _read_database_csv(database_path)
                 # Letakkan data baru di atas agar jika ada duplikat, versi terbaru yang dipertahankan
                 # Gabungkan dan pertahankan semua kolom (union)
                 combined_df = pd.concat([df, existing_df], ignore_index=True, sort=False)
@@ -383,14 +878,323 @@ def save_to_database(df: pd.DataFrame, database_path: str) -> bool:
             else:
                 combined_df = df
         
-        # Simpan ke CSV
-        combined_df.to_csv(database_path, index=False)
-        return True
-        
+        # Simpan ke CSV (atomik: versi lama tetap utuh sampai file baru lengkap)
+        _write_csv_atomic(combined_df, database_path)
+        info['rows'] = len(combined_df)
+        # Dibaca balik dari file (masih di bawah lock): isi & dtype sama persis dengan load_database
+        # untuk versi ini, sehingga aman mengisi cache dataset bersama tanpa baca ulang di UI
+        report['committed_df'] = _read_database_csv(database_path)
+
+    with _stage(report, on_progress, 'diff') as info:
+        changes = diff_datasets(previous, combined_df)
+        info['rows'] = len(changes['details'])
+
+    with _stage(report, on_progress, 'post_commit'):
+        report['dataset_version'] = _post_commit(database_path, df, len(combined_df), combined_df)
+        try:
+            report['changes'] = record_changes(changes, report['dataset_version'], previous_version)
+        except Exception as e:
+            print(f"Gagal mencatat perubahan: {str(e)}")
+    return True
+
+def _append_ingest_log(entry: Dict[str, Any], log_path: str = INGEST_LOG_PATH) -> None:
+    """Tambahkan satu baris JSON (rincian waktu satu upload) ke log ingest (best-effort)."""
+    try:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(entry, default=str) + "\n")
     except Exception as e:
-        print(f"Error menyimpan database: {str(e)}")
-        return False
+        print(f"Gagal menulis log ingest: {str(e)}")
+
+def run_ingest_pipeline(file_data, database_path: str, report: Optional[Dict[str, Any]] = None,
+                        on_progress: Optional[ProgressCallback] = None,
+                        source_name: Optional[str] = None) -> Tuple[bool, str, pd.DataFrame]:
+    """
+    Pipeline lengkap satu workbook: process_excel_file -> save_to_database.
+    Event progres mencakup seluruh tahap, dan rincian waktunya ditulis ke INGEST_LOG_PATH.
+    Bila on_progress melempar IngestCancelled, log tetap ditulis lalu pengecualian diteruskan.
+
+    Returns:
+        Tuple[bool, str, pd.DataFrame]: (success, message, dataframe hasil proses)
+    """
+    if report is None:
+        report = {}
+    return _run_pipeline(lambda: process_excel_file(file_data, report, on_progress),
+                         source_name or getattr(file_data, 'name', str(file_data)),
+                         database_path, report, on_progress)
+
+def run_batch_ingest_pipeline(files: List[Tuple[str, Any]], database_path: str,
+                              report: Optional[Dict[str, Any]] = None,
+                              on_progress: Optional[ProgressCallback] = None,
+                              max_workers: int = BATCH_MAX_WORKERS) -> Tuple[bool, str, pd.DataFrame]:
+    """
+    Seperti run_ingest_pipeline untuk beberapa workbook sekaligus (process_excel_files):
+    semua file digabung lalu disimpan sebagai SATU versi dataset.
+    """
+    if report is None:
+        report = {}
+    return _run_pipeline(lambda: process_excel_files(files, report, on_progress, max_workers),
+                         ", ".join(name for name, _ in files), database_path, report, on_progress)
+
+def _quality_log(summary: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Ringkasan kualitas untuk log ingest: baris bermasalah + jumlah per aturan yang dilanggar."""
+    if not summary:
+        return None
+    return {'rows_with_issues': summary['rows_with_issues'],
+            'rules': {r['rule']: r['count'] for r in summary['rules'] if r['count']}}
+
+def _run_pipeline(process: Callable[[], Tuple[bool, str, pd.DataFrame]], source: str, database_path: str,
+                  report: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> Tuple[bool, str, pd.DataFrame]:
+    """Kerangka bersama pipeline ingest: proses -> simpan -> log (lihat run_ingest_pipeline)."""
+    started = datetime.now()
+    t0 = time.perf_counter()
+    # Rencanakan tahap simpan sejak awal agar progres tidak mundur setelah parsing selesai
+    _plan_stages(report, 5)
+    report['_save_planned'] = True
+    df = pd.DataFrame()
+    try:
+        success, message, df = process()
+        if success:
+            with _stage(report, on_progress, 'dtypes') as info:
+                df = optimize_dtypes(df, report)
+                info['rows'] = len(df)
+            os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+            if not save_to_database(df, database_path, report, on_progress):
+                success, message = False, "Gagal menyimpan ke database"
+                report['save_failed'] = True
+    except IngestCancelled:
+        success, message = False, "Dibatalkan"
+        report['cancelled'] = True
+    report.pop('_save_planned', None)
+    report.pop('_progress_shown', None)
+    report['total_seconds'] = round(time.perf_counter() - t0, 4)
+    _append_ingest_log({
+        'started_at': started.isoformat(timespec='seconds'),
+        'source': source,
+        'success': success,
+        'message': message,
+        'rows': len(df),
+        'dataset_version': report.get('dataset_version'),
+        'total_seconds': report['total_seconds'],
+        'memory': report.get('memory'),
+        'quality': _quality_log(report.get('quality')),
+        'timings': report.get('timings', []),
+    })
+    if report.get('cancelled'):
+        raise IngestCancelled()
+    return success, message, df
+
+# ===== Batch multi-workbook (parsing paralel antar proses) =====
+def _process_workbook(name: str, file_data: Any) -> Tuple[bool, str, pd.DataFrame, Dict[str, Any], float]:
+    """Worker batch: process_excel_file untuk satu workbook (harus top-level agar bisa di-pickle)."""
+    t0 = time.perf_counter()
+    sub_report: Dict[str, Any] = {}
+    if isinstance(file_data, (bytes, bytearray)):
+        file_data = BytesIO(file_data)
+    # Sniffing sudah dilakukan untuk semua file sebelum pool dijalankan
+    # Validasi kualitas dijalankan sekali atas hasil gabungan (duplikat lintas file ikut terdeteksi)
+    success, message, df = process_excel_file(file_data, sub_report, sniff=False, validate=False)
+    return success, message, df, sub_report, time.perf_counter() - t0
+
+def _merge_date_parsing(target: Dict[str, Any], summary: Dict[str, Any]) -> None:
+    """Jumlahkan ringkasan parse_date_series satu workbook ke ringkasan gabungan."""
+    for key in ('excel_serial', 'parsed', 'empty', 'unparseable'):
+        target[key] = target.get(key, 0) + summary.get(key, 0)
+    formats = {f['format']: f for f in target.setdefault('formats', [])}
+    for f in summary.get('formats', []):
+        if f['format'] in formats:
+            formats[f['format']]['rows'] += f['rows']
+        else:
+            target['formats'].append(dict(f))
+            formats[f['format']] = target['formats'][-1]
 
+def _iter_workbook_results(files: List[Tuple[str, Any]], max_workers: int):
+    """
+    Yield (indeks, hasil _process_workbook) sesuai urutan selesai. Lebih dari satu file diproses
+    di ProcessPoolExecutor (parsing openpyxl terikat GIL) sebanyak core yang ada; bila hanya satu
+    core atau pool tidak bisa dibuat, berurutan.
+    """
+    # Lebih banyak proses daripada core hanya menambah biaya spawn
+    workers = min(max_workers, len(files), os.cpu_count() or 1)
+    if workers > 1:
+        try:
+            # spawn: aman dipanggil dari thread Streamlit/worker ingest (fork + thread rawan deadlock)
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        except (OSError, ValueError, NotImplementedError) as e:
+            print(f"Pool proses tidak tersedia, batch diproses berurutan: {str(e)}")
+        else:
+            try:
+                futures = {pool.submit(_process_workbook, name, data): i for i, (name, data) in enumerate(files)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # Worker mati (mis. kehabisan memori / __main__ tidak bisa diimpor): ulangi di proses ini
+                        result = _process_workbook(*files[i])
+                    yield i, result
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+            return
+    for i, (name, data) in enumerate(files):
+        yield i, _process_workbook(name, data)
+
+@profiled()
+def process_excel_files(files: List[Tuple[str, Any]], report: Optional[Dict[str, Any]] = None,
+                        on_progress: Optional[ProgressCallback] = None,
+                        max_workers: int = BATCH_MAX_WORKERS) -> Tuple[bool, str, pd.DataFrame]:
+    """
+    Proses beberapa workbook (mis. satu per UP3) secara paralel lalu gabungkan.
+
+    Args:
+        files: list (nama file, path/bytes/file-like). Bytes lebih murah dikirim ke proses worker.
+        report: seperti process_excel_file; header_mappings dikunci "file • sheet", plus
+            report['files'] = [{'file', 'success', 'message', 'sheets', 'rows', 'seconds'}, ...] dan
+            report['duplicate_sheets'] = {sheet: [file, ...]} bila satu sheet UP3 muncul di beberapa file,
+            report['sniff'] = {file: hasil sniff_workbook}.
+        on_progress: event tahap 'sniff' & 'workbook' (sheet = nama file), 'merge', 'sort', 'quality'
+
+    Returns:
+        Tuple[bool, str, pd.DataFrame]: gagal seluruhnya bila satu workbook gagal (tidak ada commit parsial).
+        NO dinomori ulang setelah gabungan; asal baris di SOURCE_SHEET + SOURCE_FILE_COLUMN.
+    """
+    if report is None:
+        report = {}
+    report.setdefault('header_mappings', {})
+    report.setdefault('timings', [])
+    if not files:
+        return False, "Tidak ada file yang diunggah", pd.DataFrame()
+    # Bytes/file-like dibaca di sini agar bisa dikirim ke proses worker
+    payload = [(name, data.getvalue() if hasattr(data, 'getvalue') else data) for name, data in files]
+    _plan_stages(report, 2 * len(payload) + 3)
+
+    # Pre-flight semua file dulu: satu workbook rusak menolak batch sebelum parsing penuh dimulai
+    report['sniff'] = {}
+    for name, data in payload:
+        with _stage(report, on_progress, 'sniff', name):
+            report['sniff'][name] = sniff_workbook(BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+    rejected = [f"{name}: {result['errors'][0]}" for name, result in report['sniff'].items() if result['errors']]
+    if rejected:
+        return False, "; ".join(rejected), pd.DataFrame()
+    for name, _ in payload:
+        _emit(on_progress, {'stage': 'workbook', 'sheet': name, 'label': INGEST_STAGE_LABELS['workbook'],
+                            'status': 'start', 'done': len(report['timings']), 'total': report['stages_total']})
+
+    results: List[Optional[Tuple]] = [None] * len(payload)
+    for i, result in _iter_workbook_results(payload, max_workers):
+        results[i] = result
+        success, _message, df, _sub, seconds = result
+        report['timings'].append({'stage': 'workbook', 'sheet': payload[i][0], 'seconds': round(seconds, 4),
+                                  'rows': len(df) if success else None})
+        _emit(on_progress, {'stage': 'workbook', 'sheet': payload[i][0], 'label': INGEST_STAGE_LABELS['workbook'],
+                            'status': 'done', 'seconds': seconds, 'rows': len(df) if success else None,
+                            'done': len(report['timings']), 'total': report['stages_total']})
+
+    report['files'] = []
+    sheets_by_file: Dict[str, List[str]] = {}
+    for (name, _), (success, message, df, sub, seconds) in zip(payload, results):
+        sheets = sorted(df['SOURCE_SHEET'].unique().tolist()) if success and 'SOURCE_SHEET' in df.columns else []
+        report['files'].append({'file': name, 'success': success, 'message': message,
+                                'sheets': sheets, 'rows': len(df) if success else 0, 'seconds': round(seconds, 4)})
+        for sheet, mappings in sub.get('header_mappings', {}).items():
+            report['header_mappings'][f"{name} • {sheet}"] = mappings
+        for t in sub.get('timings', []):
+            report['timings'].append({**t, 'sheet': f"{name} • {t['sheet']}" if t['sheet'] else name})
+        for sheet in sheets:
+            sheets_by_file.setdefault(sheet, []).append(name)
+    failed = [f for f in report['files'] if not f['success']]
+    if failed:
+        return False, "; ".join(f"{f['file']}: {f['message']}" for f in failed), pd.DataFrame()
+    report['duplicate_sheets'] = {sheet: names for sheet, names in sheets_by_file.items() if len(names) > 1}
+
+    with _stage(report, on_progress, 'merge') as info:
+        frames = []
+        for (name, _), (_success, _message, df, sub, _seconds) in zip(payload, results):
+            df = df.drop(columns=['NO'])
+            df.insert(df.columns.get_loc('SOURCE_SHEET') + 1, SOURCE_FILE_COLUMN, name)
+            frames.append(df)
+            for col, summary in sub.get('date_parsing', {}).items():
+                _merge_date_parsing(report.setdefault('date_parsing', {}).setdefault(col, {}), summary)
+        final_df = pd.concat(frames, ignore_index=True, sort=False)
+        # Kolom tambahan yang hanya ada di sebagian file diisi kosong (sama seperti isi sel kosong)
+        text_cols = [c for c in final_df.columns if c not in DATE_COLUMNS.values()]
+        final_df[text_cols] = final_df[text_cols].fillna("")
+        info['rows'] = len(final_df)
+
+    with _stage(report, on_progress, 'sort') as info:
+        if DATE_COLUMNS['TANGGAL TERPASANG'] in final_df.columns:
+            final_df = final_df.sort_values(DATE_COLUMNS['TANGGAL TERPASANG'], ascending=False, na_position='last', kind='stable')
+        final_df.insert(0, 'NO', range(1, len(final_df) + 1))
+        final_df = final_df.reset_index(drop=True)
+        info['rows'] = len(final_df)
+
+    _record_unparseable_dates(final_df, report)
+    _check_quality(final_df, report, on_progress)
+    msg = f"Berhasil memproses {len(final_df)} baris data dari {len(payload)} file"
+    return True, msg, final_df
+
+# ===== Tipe data hemat memori (string Arrow + kategori) =====
+def _arrow_string_dtype():
+    """
+    Dtype string berbasis Arrow dengan semantik NaN (sama dengan dtype `str` bawaan pandas 3),
+    agar perbandingan/mask tetap bool biasa. None bila pyarrow/pandas tidak mendukung.
+    """
+    for args, kwargs in ((('pyarrow',), {'na_value': np.nan}), (('pyarrow_numpy',), {})):
+        try:
+            return pd.StringDtype(*args, **kwargs)
+        except (TypeError, ValueError, ImportError):
+            continue
+    return None
+
+_ARROW_STRING = _arrow_string_dtype()
+
+def optimize_dtypes(df: pd.DataFrame, report: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Kurangi memori dataset: kolom teks berkardinalitas rendah (nilai unik <=
+    CATEGORY_MAX_UNIQUE_RATIO x jumlah baris, mis. UP3/ULP/STATUS/KAPASITAS) menjadi
+    `category`, kolom teks lain menjadi string Arrow. Kolom angka/tanggal tidak disentuh.
+
+    report['memory'] = {'before_bytes', 'after_bytes', 'category', 'string'} bila report diberikan.
+    """
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    out = df.copy(deep=False)
+    converted: Dict[str, List[str]] = {'category': [], 'string': []}
+    n = len(out)
+    for col in out.columns:
+        s = out[col]
+        if not (pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)) \
+                or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if n and s.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * n:
+            if _ARROW_STRING is not None and s.dtype != _ARROW_STRING:
+                s = s.astype(_ARROW_STRING)
+            out[col] = s.astype('category')
+            converted['category'].append(col)
+        elif _ARROW_STRING is not None and s.dtype != _ARROW_STRING:
+            try:
+                out[col] = s.astype(_ARROW_STRING)
+                converted['string'].append(col)
+            except (TypeError, ValueError):
+                # Kolom campuran (mis. angka + teks dari CSV lama): biarkan object
+                pass
+    if report is not None:
+        report['memory'] = {'before_bytes': before,
+                            'after_bytes': int(out.memory_usage(index=True, deep=True).sum()),
+                            **converted}
+    return out
+
+def _read_database_csv(database_path: str) -> pd.DataFrame:
+    """Baca CSV database dan kembalikan kolom tanggal ter-tipe (diturunkan ulang untuk CSV lama)."""
+    df = pd.read_csv(database_path)
+    for src, dst in DATE_COLUMNS.items():
+        if dst in df.columns:
+            df[dst] = pd.to_datetime(df[dst], errors='coerce', format='ISO8601')
+        elif src in df.columns:
+            df[dst] = parse_date_series(df[src])[0]
+    return optimize_dtypes(df)
+
+@profiled()
 def load_database(database_path: str) -> pd.DataFrame:
     """
     Load database dari file CSV
@@ -399,10 +1203,10 @@ def load_database(database_path: str) -> pd.DataFrame:
         # Jika menggunakan Google Sheets sebagai database
         if USE_GOOGLE_SHEETS and gs_load_sheet is not None:
             df = gs_load_sheet()
-            return df if isinstance(df, pd.DataFrame) else pd.DataFrame()
+            return add_typed_date_columns(df) if isinstance(df, pd.DataFrame) else pd.DataFrame()
 
         if os.path.exists(database_path):
-            return pd.read_csv(database_path)
+            return _read_database_csv(database_path)
         else:
             return pd.DataFrame()
     except Exception as e:
@@ -425,6 +1229,63 @@ def get_filter_options(df: pd.DataFrame) -> Dict[str, List[str]]:
     
     return options
 
+def normalize_status(s: str) -> str:
+    """Normalisasi STATUS agar 'STANDBY' == 'STAND BY'."""
+    if s is None:
+        return ""
+    x = str(s).strip().upper()
+    if x.replace(" ", "") == "STANDBY":
+        return "STAND BY"
+    return x
+
+def normalize_status_series(s: pd.Series) -> pd.Series:
+    """Versi vektorisasi normalize_status untuk satu kolom penuh."""
+    x = s.astype(str).str.strip().str.upper()
+    return x.mask(x.str.replace(" ", "", regex=False).eq("STANDBY"), "STAND BY")
+
+@profiled()
+def add_status_norm(df: pd.DataFrame) -> pd.DataFrame:
+    """Salin dataframe dan tambahkan kolom STATUS_NORM (versi vektorisasi normalize_status)."""
+    out = df.copy()
+    if 'STATUS' in out.columns:
+        out['STATUS_NORM'] = normalize_status_series(out['STATUS'])
+    return out
+
+@profiled()
+def apply_filters(df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Terapkan filter slicer. Nilai 'Semua'/None/list kosong berarti tidak difilter;
+    string -> sama dengan, list -> salah satu dari. Filter STATUS memakai STATUS_NORM.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, val in filters.items():
+        target = 'STATUS_NORM' if col == 'STATUS' else col
+        if target not in df.columns or val is None or val == 'Semua':
+            continue
+        values = [val] if isinstance(val, str) else list(val)
+        if not values:
+            continue
+        mask &= df[target].astype(str).isin(values).to_numpy()
+    return df[mask]
+
+@profiled()
+def compute_kpis(df: pd.DataFrame) -> Dict[str, Any]:
+    """KPI dashboard: total UGB dan persentase RUSAK / STAND BY / TERPASANG."""
+    if 'PENOMORAN UGB BARU' in df.columns:
+        total = int(df['PENOMORAN UGB BARU'].astype(str).str.strip().replace({'None': ''}).ne('').sum())
+    else:
+        total = len(df)
+    status = df['STATUS_NORM'] if 'STATUS_NORM' in df.columns else pd.Series([], dtype=str)
+    counts = {k: int((status == k).sum()) for k in ('RUSAK', 'STAND BY', 'TERPASANG')}
+    denom = sum(counts.values())
+    def pct(val):
+        return (val/denom*100) if denom > 0 else 0
+    return {
+        'total': total,
+        'rusak': counts['RUSAK'], 'stand_by': counts['STAND BY'], 'terpasang': counts['TERPASANG'],
+        'pct_rusak': pct(counts['RUSAK']), 'pct_standby': pct(counts['STAND BY']), 'pct_terpasang': pct(counts['TERPASANG']),
+    }
+
 def parse_coordinates(coord_str: str) -> Tuple[Optional[float], Optional[float]]:
     """
     Parse string koordinat menjadi latitude, longitude
@@ -454,3 +1315,235 @@ def parse_coordinates(coord_str: str) -> Tuple[Optional[float], Optional[float]]
             
     except (ValueError, IndexError):
         return None, None
+
+@profiled()
+def parse_coordinates_vectorized(coords: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Versi vektorisasi parse_coordinates untuk satu kolom penuh.
+    Nilai yang tidak valid menjadi NaN pada kedua series (lat, lon).
+    """
+    s = coords.astype(object).where(coords.notna(), "").astype(str).str.strip()
+    has_comma = s.str.contains(',', regex=False)
+    lat = pd.Series(np.nan, index=s.index)
+    lon = pd.Series(np.nan, index=s.index)
+    for mask, parts in (
+        (has_comma, s[has_comma].str.split(',')),
+        (~has_comma, s[~has_comma].str.split()),
+    ):
+        if not mask.any():
+            continue
+        # astype(str): bagian yang tidak ada (NaN) tidak boleh membuat seluruh kolom bertipe float
+        lat[mask] = pd.to_numeric(parts.str[0].astype(str).str.strip(), errors='coerce')
+        lon[mask] = pd.to_numeric(parts.str[1].astype(str).str.strip(), errors='coerce')
+    invalid = lat.isna() | lon.isna()
+    return lat.mask(invalid), lon.mask(invalid)
+
+# ===== Agregat status per upload (riwayat tren) =====
+def status_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """Jumlah unit & total kapasitas per UP3 x ULP x STATUS_NORM untuk satu versi dataset."""
+    frame = add_status_norm(df) if 'STATUS_NORM' not in df.columns else df
+    keys = pd.DataFrame({
+        col: frame[col].astype(object).where(frame[col].notna(), "").astype(str) if col in frame.columns else ""
+        for col in ('UP3', 'ULP', 'STATUS_NORM')
+    }, index=frame.index)
+    keys['CAPACITY'] = _capacity_numeric(frame['KAPASITAS']) if 'KAPASITAS' in frame.columns else 0.0
+    return keys.groupby(['UP3', 'ULP', 'STATUS_NORM'], sort=True).agg(
+        COUNT=('CAPACITY', 'size'), CAPACITY=('CAPACITY', 'sum'),
+    ).reset_index()
+
+# ===== Ringkasan pivot halaman rekap =====
+RECAP_STATUSES = ['RUSAK', 'STAND BY', 'TERPASANG']
+
+def _text_dim(df: pd.DataFrame, col: str) -> pd.Series:
+    """Dimensi pivot sebagai teks; kosong ditampilkan sebagai '(kosong)'."""
+    if col not in df.columns:
+        return pd.Series("(kosong)", index=df.index)
+    s = df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip()
+    return s.mask(s.eq(""), "(kosong)")
+
+def _with_totals(pivot: pd.DataFrame) -> pd.DataFrame:
+    """Tambah kolom TOTAL dan baris TOTAL di bawah."""
+    pivot = pivot.copy()
+    pivot['TOTAL'] = pivot.sum(axis=1)
+    total = pivot.sum(axis=0).to_frame().T
+    if isinstance(pivot.index, pd.MultiIndex):
+        total.index = pd.MultiIndex.from_tuples([('TOTAL',) + ('',) * (pivot.index.nlevels - 1)], names=pivot.index.names)
+    else:
+        total.index = pd.Index(['TOTAL'], name=pivot.index.name)
+    return pd.concat([pivot, total])
+
+@profiled()
+def build_recap_summaries(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Pivot ringkasan untuk halaman rekap (input: hasil add_status_norm + apply_filters).
+
+    Returns:
+        {judul: DataFrame datar siap tampil/ekspor}:
+        'Status per ULP' (jumlah unit UP3 x ULP x STATUS), 'Kapasitas per UP3' (total kVA per
+        STATUS + jumlah unit + rata-rata), 'Pemasangan per Bulan' (jumlah unit per bulan TANGGAL
+        TERPASANG x UP3).
+    """
+    installed = date_sort_key(df)
+    frame = pd.DataFrame({
+        'UP3': _text_dim(df, 'UP3'),
+        'ULP': _text_dim(df, 'ULP'),
+        'STATUS': df['STATUS_NORM'].astype(str) if 'STATUS_NORM' in df.columns else "(kosong)",
+        'KAPASITAS': _capacity_numeric(df['KAPASITAS']) if 'KAPASITAS' in df.columns else np.nan,
+        'BULAN': installed.dt.to_period('M').astype(str).where(installed.notna(), "(tanpa tanggal)"),
+    }, index=df.index)
+    statuses = RECAP_STATUSES + sorted(set(frame['STATUS'].unique()) - set(RECAP_STATUSES))
+
+    by_ulp = frame.pivot_table(index=['UP3', 'ULP'], columns='STATUS', values='KAPASITAS', aggfunc='size', fill_value=0)
+    by_ulp = _with_totals(by_ulp.reindex(columns=[c for c in statuses if c in by_ulp.columns]).astype('int64'))
+
+    cap = frame.pivot_table(index='UP3', columns='STATUS', values='KAPASITAS', aggfunc='sum', fill_value=0.0)
+    cap = _with_totals(cap.reindex(columns=[c for c in statuses if c in cap.columns]))
+    cap.columns = [f"kVA {c}" if c != 'TOTAL' else 'TOTAL kVA' for c in cap.columns]
+    units = frame.groupby('UP3').size()
+    cap['JUMLAH UNIT'] = units.reindex(cap.index[:-1]).tolist() + [int(units.sum())]
+    cap['RATA-RATA kVA'] = (cap['TOTAL kVA'] / cap['JUMLAH UNIT'].where(cap['JUMLAH UNIT'] > 0)).round(1)
+
+    monthly = frame.pivot_table(index='BULAN', columns='UP3', values='KAPASITAS', aggfunc='size', fill_value=0)
+    monthly = _with_totals(monthly.sort_index().astype('int64'))
+
+    return {
+        'Status per ULP': by_ulp.reset_index().rename_axis(None, axis=1),
+        'Kapasitas per UP3': cap.reset_index().rename_axis(None, axis=1),
+        'Pemasangan per Bulan': monthly.reset_index().rename_axis(None, axis=1),
+    }
+
+# ===== Indeks riwayat per koordinat (timeline) =====
+def _peno_suffix_series(s: pd.Series) -> pd.Series:
+    """Angka di akhir PENOMORAN UGB BARU (mis. 'UGB-KRG-012' -> 12), 0 bila tidak ada."""
+    return pd.to_numeric(s.astype(str).str.extract(r'(\d+)$', expand=False), errors='coerce').fillna(0).astype('int64')
+
+def _capacity_numeric(s: pd.Series) -> pd.Series:
+    """KAPASITAS sebagai angka (koma desimal didukung), NaN bila bukan angka."""
+    return pd.to_numeric(s.astype(str).str.strip().str.replace(',', '.', regex=False), errors='coerce')
+
+@profiled()
+def build_coordinate_index(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[Tuple[float, float], Tuple[int, int]]]:
+    """
+    Bangun indeks riwayat per koordinat sekali untuk seluruh dataset.
+
+    Baris diurutkan per koordinat (dibulatkan 6 desimal) lalu tanggal terpasang ->
+    suffix angka PENOMORAN UGB BARU -> NO, dan dilengkapi kolom bantu:
+    _LAT/_LON (koordinat kunci), _CAP_NUM, _CAP_DELTA (selisih dengan entri sebelumnya
+    di koordinat yang sama) serta _PREV_* (nilai entri sebelumnya, kosong untuk entri pertama).
+
+    Returns:
+        Tuple[pd.DataFrame, Dict]: (frame terurut, {(lat, lon): (awal, akhir) posisi baris})
+    """
+    if df.empty or 'KOORDINAT TAGGING' not in df.columns:
+        return df.iloc[0:0].copy(), {}
+
+    lat, lon = parse_coordinates_vectorized(df['KOORDINAT TAGGING'])
+    frame = df.assign(_LAT=lat.round(6), _LON=lon.round(6))
+    frame = frame[frame['_LAT'].notna()]
+    frame = frame.assign(
+        _TS=date_sort_key(frame),
+        _PENO=_peno_suffix_series(frame['PENOMORAN UGB BARU']) if 'PENOMORAN UGB BARU' in frame.columns else 0,
+        _NO=frame['NO'] if 'NO' in frame.columns else np.arange(1, len(frame) + 1),
+        _CAP_NUM=_capacity_numeric(frame['KAPASITAS']) if 'KAPASITAS' in frame.columns else np.nan,
+    )
+    frame = frame.sort_values(['_LAT', '_LON', '_TS', '_PENO', '_NO'], na_position='last', kind='stable')
+
+    grouped = frame.groupby(['_LAT', '_LON'], sort=False)
+    frame['_CAP_DELTA'] = frame['_CAP_NUM'] - grouped['_CAP_NUM'].shift(1)
+    for col in ('PENOMORAN UGB BARU', 'KAPASITAS', 'NO SERI'):
+        if col in frame.columns:
+            frame['_PREV_' + col] = frame[col].astype(object).groupby([frame['_LAT'], frame['_LON']], sort=False).shift(1)
+
+    # Posisi awal/akhir setiap koordinat pada frame terurut
+    lat_a = frame['_LAT'].to_numpy()
+    lon_a = frame['_LON'].to_numpy()
+    change = np.ones(len(frame), dtype=bool)
+    change[1:] = (lat_a[1:] != lat_a[:-1]) | (lon_a[1:] != lon_a[:-1])
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], len(frame))
+    slices = {(float(lat_a[a]), float(lon_a[a])): (int(a), int(b)) for a, b in zip(starts, ends)}
+    return frame, slices
+
+# ===== Versi dataset =====
+def _version_manifest_path(database_path: str) -> str:
+    return os.path.splitext(database_path)[0] + ".version.json"
+
+def _write_version_manifest(database_path: str, rows: int) -> str:
+    """
+    Tulis manifest versi dataset setelah database berhasil disimpan; kembalikan id versi.
+    Manifest mencatat mtime/ukuran CSV yang di-commit agar versi tidak pernah dipasangkan
+    dengan isi CSV lain (lihat get_dataset_version).
+    """
+    version = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    manifest = {'version': version, 'rows': int(rows), 'saved_at': datetime.now().isoformat(timespec='seconds')}
+    try:
+        st_ = os.stat(database_path)
+        manifest.update(csv_mtime_ns=st_.st_mtime_ns, csv_size=st_.st_size)
+    except OSError:
+        pass
+    path = _version_manifest_path(database_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh)
+    os.replace(f"{path}.tmp", path)
+    return version
+
+# Hook tambahan setelah commit: fn(database_path, version, committed_df). Didaftarkan oleh modul
+# yang hanya dimuat aplikasi (mis. utils.snapshots) agar CLI tetap tanpa dependensi UI/peta.
+_POST_COMMIT_HOOKS: List[Callable[[str, str, pd.DataFrame], None]] = []
+
+def register_post_commit_hook(hook: Callable[[str, str, pd.DataFrame], None]) -> None:
+    if hook not in _POST_COMMIT_HOOKS:
+        _POST_COMMIT_HOOKS.append(hook)
+
+def _post_commit(database_path: str, new_df: pd.DataFrame, rows: int,
+                 committed_df: Optional[pd.DataFrame] = None) -> str:
+    """
+    Langkah setelah database tersimpan: terbitkan versi baru lalu perbarui indeks turunan
+    (best-effort; kegagalan indeks tidak membatalkan upload).
+    committed_df = isi database setelah commit (mode append), default new_df.
+    """
+    version = _write_version_manifest(database_path, rows)
+    committed = committed_df if committed_df is not None else new_df
+    try:
+        record_lineage(new_df, version)
+    except Exception as e:
+        print(f"Gagal mencatat lineage: {str(e)}")
+    try:
+        append_status_snapshot(status_snapshot(committed), version)
+    except Exception as e:
+        print(f"Gagal mencatat riwayat status: {str(e)}")
+    for hook in list(_POST_COMMIT_HOOKS):
+        try:
+            hook(database_path, version, committed)
+        except Exception as e:
+            print(f"Hook setelah commit gagal: {str(e)}")
+    return version
+
+def get_dataset_version(database_path: str) -> str:
+    """
+    Id versi dataset aktif. Dipakai sebagai kunci cache semua turunan data.
+    Fallback ke mtime/ukuran CSV bila manifest belum ada (database lama) atau manifest
+    belum menunjuk CSV yang sekarang (jeda singkat di tengah commit).
+    """
+    try:
+        st_ = os.stat(database_path)
+    except OSError:
+        st_ = None
+    try:
+        with open(_version_manifest_path(database_path), encoding='utf-8') as fh:
+            manifest = json.load(fh)
+        if 'csv_mtime_ns' not in manifest or (
+                st_ is not None and manifest['csv_mtime_ns'] == st_.st_mtime_ns and manifest['csv_size'] == st_.st_size):
+            return str(manifest['version'])
+    except Exception:
+        pass
+    if st_ is not None:
+        return f"csv-{st_.st_mtime_ns}-{st_.st_size}"
+    return "empty"
+
+if __name__ == "__main__":
+    # python -m utils.data_processor ingest <file/folder ...> (lihat utils/ingest_cli.py)
+    import sys
+    from utils.ingest_cli import main
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# utils/ingest_cli.py
+"""
+Ingest tanpa UI (mis. cron malam untuk folder berisi workbook):
+
+    python -m utils.data_processor ingest data/masuk/              # semua .xlsx/.xlsm di folder
+    python -m utils.data_processor ingest UP3_METRO.xlsx UP3_KOTABUMI.xlsx --workers 4
+    python -m utils.data_processor ingest data/masuk/ --dry-run    # validasi saja, tanpa commit
+
+Pipeline sama dengan halaman upload (run_ingest_pipeline / run_batch_ingest_pipeline:
+process_excel_file(s) -> optimize_dtypes -> save_to_database), sehingga versi dataset,
+lineage, riwayat status, dan log ingest ikut diperbarui; sesi Streamlit yang terbuka
+memuat ulang data begitu versi di disk berubah.
+Modul ini sengaja tidak mengimpor streamlit, folium, maupun PIL.
+
+Kode keluar: 0 sukses, 1 workbook ditolak/gagal diproses, 2 argumen/file tidak valid,
+3 gagal menyimpan database, 130 dihentikan (Ctrl+C).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from config import DATABASE_PATH, BATCH_MAX_WORKERS
+from utils.data_processor import (
+    run_ingest_pipeline, run_batch_ingest_pipeline, process_excel_file, process_excel_files,
+)
+
+EXIT_OK = 0
+EXIT_INGEST_FAILED = 1
+EXIT_USAGE = 2
+EXIT_SAVE_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+
+def collect_workbooks(paths: List[str]) -> List[str]:
+    """Path file apa adanya; folder diperluas ke workbook di dalamnya (file kunci Excel '~$' dilewati)."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$') and os.path.isfile(full):
+                    found.append(full)
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(path)
+    return found
+
+def _print_progress(ev: Dict[str, Any]) -> None:
+    if ev['status'] != 'done':
+        return
+    sheet = f" [{ev['sheet']}]" if ev.get('sheet') else ""
+    rows = f", {ev['rows']:,} baris" if ev.get('rows') is not None else ""
+    print(f"  {ev['done']:>3}/{ev['total']:<3} {ev['label']}{sheet}: {ev['seconds']:.2f}s{rows}", file=sys.stderr)
+
+def format_timings(report: Dict[str, Any]) -> str:
+    """Tabel waktu per tahap (urutan selesai) + total dan throughput."""
+    lines = [f"{'TAHAP':<14} {'SHEET/FILE':<28} {'DETIK':>8} {'BARIS':>10}"]
+    for t in report.get('timings', []):
+        rows = f"{t['rows']:,}" if t.get('rows') is not None else "-"
+        lines.append(f"{t['stage']:<14} {str(t.get('sheet') or '-')[:28]:<28} {t['seconds']:>8.3f} {rows:>10}")
+    total = report.get('total_seconds')
+    if total is not None:
+        lines.append(f"{'TOTAL':<14} {'':<28} {total:>8.3f}")
+    return "\n".join(lines)
+
+def format_quality(quality: Dict[str, Any]) -> str:
+    """Ringkasan validasi kualitas data: baris bermasalah + jumlah per aturan yang dilanggar."""
+    lines = [f"Kualitas data: {quality['rows_with_issues']:,} dari {quality['rows']:,} baris bermasalah"]
+    for r in quality['rules']:
+        if r['count']:
+            lines.append(f"  {r['rule']:<30} {r['count']:>10,}  {r['label']}")
+    return "\n".join(lines)
+
+def _exit_code(success: bool, report: Dict[str, Any]) -> int:
+    if success:
+        return EXIT_OK
+    return EXIT_SAVE_FAILED if report.get('save_failed') else EXIT_INGEST_FAILED
+
+def run_ingest(files: List[str], database_path: str, workers: int = BATCH_MAX_WORKERS,
+               dry_run: bool = False, quiet: bool = False) -> Dict[str, Any]:
+    """
+    Jalankan ingest untuk daftar workbook. Satu file -> run_ingest_pipeline,
+    beberapa file -> run_batch_ingest_pipeline (satu versi dataset, parsing paralel).
+
+    Returns:
+        dict ringkasan: exit_code, success, message, rows, dataset_version, seconds, report
+    """
+    report: Dict[str, Any] = {}
+    on_progress = None if quiet else _print_progress
+    t0 = time.perf_counter()
+    if dry_run:
+        if len(files) == 1:
+            success, message, df = process_excel_file(files[0], report, on_progress)
+        else:
+            success, message, df = process_excel_files([(os.path.basename(f), f) for f in files],
+                                                       report, on_progress, workers)
+        report['total_seconds'] = round(time.perf_counter() - t0, 4)
+    elif len(files) == 1:
+        success, message, df = run_ingest_pipeline(files[0], database_path, report, on_progress,
+                                                   source_name=os.path.basename(files[0]))
+    else:
+        success, message, df = run_batch_ingest_pipeline([(os.path.basename(f), f) for f in files],
+                                                         database_path, report, on_progress, workers)
+    seconds = time.perf_counter() - t0
+    return {
+        'exit_code': _exit_code(success, report),
+        'success': success,
+        'message': message,
+        'files': files,
+        'rows': len(df),
+        'dataset_version': report.get('dataset_version'),
+        'changes': report.get('changes'),
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(len(df) / seconds, 1) if seconds > 0 and len(df) else None,
+        'report': report,
+    }
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m utils.data_processor",
+                                     description="Ingest workbook UGB tanpa UI Streamlit.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help="proses workbook lalu simpan sebagai versi dataset baru")
+    ingest.add_argument('paths', nargs='+', help="file .xlsx/.xlsm atau folder berisi workbook")
+    ingest.add_argument('--db', default=DATABASE_PATH, help=f"path database CSV (default: {DATABASE_PATH})")
+    ingest.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS,
+                        help=f"proses paralel untuk batch (default: {BATCH_MAX_WORKERS}, dibatasi jumlah core)")
+    ingest.add_argument('--dry-run', action='store_true', help="validasi & parsing saja, database tidak diubah")
+    ingest.add_argument('--json', action='store_true', help="cetak ringkasan sebagai JSON di stdout")
+    ingest.add_argument('-q', '--quiet', action='store_true', help="tanpa progres per tahap (stderr)")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        files = collect_workbooks(args.paths)
+    except FileNotFoundError as e:
+        print(f"File tidak ditemukan: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not files:
+        print("Tidak ada workbook .xlsx/.xlsm yang ditemukan", file=sys.stderr)
+        return EXIT_USAGE
+    if args.workers < 1:
+        print("--workers minimal 1", file=sys.stderr)
+        return EXIT_USAGE
+
+    if not args.quiet:
+        mode = " (dry run)" if args.dry_run else ""
+        print(f"Ingest {len(files)} workbook -> {args.db}{mode}", file=sys.stderr)
+    try:
+        result = run_ingest(files, args.db, args.workers, args.dry_run, args.quiet)
+    except KeyboardInterrupt:
+        print("Dihentikan", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
+    if args.json:
+        summary = {k: v for k, v in result.items() if k != 'report'}
+        summary['timings'] = result['report'].get('timings', [])
+        summary['memory'] = result['report'].get('memory')
+        summary['quality'] = result['report'].get('quality')
+        print(json.dumps(summary, default=str, indent=2))
+    else:
+        print(format_timings(result['report']))
+        quality = result['report'].get('quality')
+        if quality:
+            print(format_quality(quality))
+        status = "OK" if result['success'] else "GAGAL"
+        print(f"{status}: {result['message']}")
+        if result['success']:
+            rate = f" ({result['rows_per_second']:,.0f} baris/detik)" if result['rows_per_second'] else ""
+            print(f"{result['rows']:,} baris dalam {result['seconds']:.2f}s{rate}")
+            if result['dataset_version']:
+                print(f"Versi dataset: {result['dataset_version']}")
+            changes = result['changes']
+            if changes:
+                print(f"Perubahan: +{changes['added']:,} baru, -{changes['removed']:,} dihapus, "
+                      f"~{changes['modified']:,} berubah")
+    return result['exit_code']
+
+if __name__ == "__main__":
+    sys.exit(main())
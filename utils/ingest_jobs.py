@@ -0,0 +1,153 @@
+# utils/ingest_jobs.py
+"""
+Worker ingest latar belakang: upload dijalankan sebagai job (thread pool) agar sesi
+Streamlit tidak terblokir. Halaman cukup menyimpan job id lalu mem-poll statusnya.
+
+Job bisa berisi satu workbook atau batch beberapa workbook (satu versi dataset).
+
+Status job: queued -> running -> committing -> done | failed | cancelled
+Pembatalan dihormati di batas tahap sampai tepat sebelum commit database
+(tahap 'backup'); setelah itu job selalu diselesaikan agar versi dataset konsisten.
+"""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import INGEST_MAX_WORKERS, INGEST_JOB_HISTORY
+from .data_processor import IngestCancelled, run_ingest_pipeline, run_batch_ingest_pipeline
+
+TERMINAL_STATUSES = ('done', 'failed', 'cancelled')
+# Tahap mulai dari sini = commit sedang berjalan, tidak bisa dibatalkan lagi
+_COMMIT_STAGES = ('backup', 'save', 'diff', 'post_commit')
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_MAX_WORKERS, thread_name_prefix='ugb-ingest')
+_jobs: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Salinan aman untuk dibaca UI (tanpa objek internal & dataframe hasil)."""
+    return {k: v for k, v in job.items() if not k.startswith('_')}
+
+def _update(job_id: str, **fields) -> None:
+    with _lock:
+        if job_id in _jobs:
+            _jobs[job_id].update(fields)
+
+def _prune() -> None:
+    """Buang job selesai paling lama bila riwayat melebihi INGEST_JOB_HISTORY (dipanggil di bawah _lock)."""
+    finished = [j for j in _jobs.values() if j['status'] in TERMINAL_STATUSES]
+    for job in sorted(finished, key=lambda j: j['created_at'])[:max(len(_jobs) - INGEST_JOB_HISTORY, 0)]:
+        _jobs.pop(job['id'], None)
+
+def submit_ingest_job(file_bytes: bytes, source_name: str, database_path: str) -> str:
+    """Antrekan ingest satu workbook; kembalikan job id."""
+    def run(report, on_progress):
+        buf = BytesIO(file_bytes)
+        buf.name = source_name
+        return run_ingest_pipeline(buf, database_path, report, on_progress, source_name=source_name)
+    return _submit(source_name, run)
+
+def submit_batch_ingest_job(files: List[Tuple[str, bytes]], database_path: str) -> str:
+    """Antrekan ingest beberapa workbook sekaligus (satu versi dataset); kembalikan job id."""
+    def run(report, on_progress):
+        return run_batch_ingest_pipeline(files, database_path, report, on_progress)
+    return _submit(", ".join(name for name, _ in files), run)
+
+def _submit(source: str, run: Callable) -> str:
+    job_id = uuid.uuid4().hex[:12]
+    job = {
+        'id': job_id,
+        'source': source,
+        'status': 'queued',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'finished_at': None,
+        'progress': {'label': 'Menunggu antrean', 'sheet': None, 'done': 0, 'total': 1},
+        'message': '',
+        'rows': None,
+        'dataset_version': None,
+        'report': {},
+        '_cancel': threading.Event(),
+        '_df': None,
+    }
+    with _lock:
+        _prune()
+        _jobs[job_id] = job
+    job['_future'] = _executor.submit(_run_job, job_id, run)
+    return job_id
+
+def _run_job(job_id: str, run: Callable) -> None:
+    job = _jobs[job_id]
+    cancel = job['_cancel']
+    if cancel.is_set():
+        _update(job_id, status='cancelled', message='Dibatalkan', finished_at=datetime.now().isoformat(timespec='seconds'))
+        return
+    _update(job_id, status='running')
+
+    def on_progress(ev):
+        if ev['stage'] in _COMMIT_STAGES and job['status'] == 'running':
+            _update(job_id, status='committing')
+        if cancel.is_set() and job['status'] == 'running':
+            raise IngestCancelled()
+        _update(job_id, progress={'label': ev['label'], 'sheet': ev.get('sheet'), 'status': ev['status'],
+                                  'done': ev['done'], 'total': ev['total']})
+
+    report: Dict[str, Any] = {}
+    try:
+        success, message, df = run(report, on_progress)
+    except IngestCancelled:
+        _update(job_id, status='cancelled', message='Dibatalkan', report=report,
+                finished_at=datetime.now().isoformat(timespec='seconds'))
+        return
+    except Exception as e:
+        _update(job_id, status='failed', message=f"Gagal memproses file: {str(e)}", report=report,
+                finished_at=datetime.now().isoformat(timespec='seconds'))
+        return
+    # Hasil job = isi database yang ter-commit (bukan hanya baris upload, lihat mode append)
+    committed = report.pop('committed_df', None)
+    _update(job_id,
+            status='done' if success else 'failed',
+            message=message,
+            rows=len(df) if success else None,
+            dataset_version=report.get('dataset_version'),
+            report=report,
+            _df=committed if success else None,
+            finished_at=datetime.now().isoformat(timespec='seconds'))
+
+def get_job(job_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    with _lock:
+        job = _jobs.get(job_id) if job_id else None
+        return _snapshot(job) if job else None
+
+def list_jobs() -> List[Dict[str, Any]]:
+    with _lock:
+        return [_snapshot(j) for j in sorted(_jobs.values(), key=lambda j: j['created_at'], reverse=True)]
+
+def cancel_job(job_id: str) -> bool:
+    """Minta pembatalan. False jika job sudah selesai atau sudah masuk tahap commit."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return False
+        job['_cancel'].set()
+        future = job.get('_future')
+    if future is not None and future.cancel():
+        _update(job_id, status='cancelled', message='Dibatalkan', finished_at=datetime.now().isoformat(timespec='seconds'))
+    return True
+
+def take_job_result(job_id: str) -> Optional[pd.DataFrame]:
+    """
+    Ambil isi database yang di-commit job sukses, sama seperti load_database untuk versinya
+    (sekali; referensi di registry dilepas agar memori bebas). None bila tidak tersedia.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        df, job['_df'] = job['_df'], None
+        return df
@@ -0,0 +1,190 @@
+# utils/lineage.py
+"""
+Indeks riwayat (lineage) unit UGB berdasarkan NO SERI lintas upload.
+
+Setiap ingest mencatat observasi (serial, koordinat, status, tanggal, penomoran, upload id)
+ke store CSV append-only. Observasi yang sama dengan observasi terakhir unit tersebut tidak
+ditulis ulang, sehingga store hanya bertambah saat unit benar-benar berpindah/berubah
+(termasuk kembali ke lokasi sebelumnya, mis. A -> B -> A).
+"""
+
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import LINEAGE_PATH, BACKUP_PATH
+
+# Kolom observasi yang menentukan "perubahan" sebuah unit
+OBSERVATION_COLUMNS = [
+    'NO SERI', 'KOORDINAT TAGGING', 'STATUS', 'TANGGAL TERPASANG',
+    'TANGGAL TERBONGKAR', 'PENOMORAN UGB BARU', 'UP3', 'ULP',
+]
+LINEAGE_COLUMNS = ['SERI_KEY'] + OBSERVATION_COLUMNS + ['UPLOAD_ID', 'RECORDED_AT', 'OBS_HASH']
+
+# Nilai NO SERI yang dianggap kosong
+_EMPTY_SERIALS = {'', '-', 'NAN', 'NONE', 'NULL', 'TIDAK ADA', 'TDK ADA'}
+
+_lock = threading.Lock()
+_cache: Dict[str, Any] = {'key': None, 'frame': None, 'index': {}, 'latest': None}
+
+def normalize_serial(s: pd.Series) -> pd.Series:
+    """Kunci NO SERI: uppercase, tanpa spasi; nilai kosong menjadi ''."""
+    key = s.astype(object).where(s.notna(), "").astype(str).str.upper().str.replace(r'\s+', '', regex=True)
+    return key.mask(key.isin(_EMPTY_SERIALS), "")
+
+def _observations(df: pd.DataFrame, upload_id: str) -> pd.DataFrame:
+    """Ubah dataframe upload menjadi baris observasi lineage (hanya yang punya NO SERI)."""
+    if df.empty or 'NO SERI' not in df.columns:
+        return pd.DataFrame(columns=LINEAGE_COLUMNS)
+    obs = pd.DataFrame(index=df.index)
+    for col in OBSERVATION_COLUMNS:
+        obs[col] = df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip() if col in df.columns else ""
+    obs.insert(0, 'SERI_KEY', normalize_serial(obs['NO SERI']))
+    obs = obs[obs['SERI_KEY'].ne("")]
+    obs['UPLOAD_ID'] = upload_id
+    obs['RECORDED_AT'] = datetime.now().isoformat(timespec='seconds')
+    hashed = pd.util.hash_pandas_object(obs[['SERI_KEY'] + OBSERVATION_COLUMNS[1:]], index=False)
+    obs['OBS_HASH'] = hashed.astype(str)
+    return obs.drop_duplicates('OBS_HASH').reset_index(drop=True)
+
+def _file_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st_ = os.stat(path)
+        return st_.st_mtime_ns, st_.st_size
+    except OSError:
+        return None
+
+def _load_index(path: str) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """Muat store lineage + indeks SERI_KEY -> posisi baris (di-cache per mtime file)."""
+    key = (path, _file_key(path))
+    if _cache['key'] == key and _cache['frame'] is not None:
+        return _cache['frame'], _cache['index']
+    if key[1] is None:
+        frame = pd.DataFrame(columns=LINEAGE_COLUMNS)
+    else:
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    index = frame.groupby('SERI_KEY', sort=False).indices if not frame.empty else {}
+    _cache.update(key=key, frame=frame, index=index, latest=None)
+    return frame, index
+
+def _state_hashes(frame: pd.DataFrame) -> set:
+    """OBS_HASH observasi terakhir tiap unit (semua baris pada UPLOAD_ID terbesar unit tersebut)."""
+    if frame.empty:
+        return set()
+    last = frame.groupby('SERI_KEY', sort=False)['UPLOAD_ID'].transform('max')
+    return set(frame.loc[frame['UPLOAD_ID'].eq(last), 'OBS_HASH'])
+
+def _previous_state(frame: pd.DataFrame, upload_id: str) -> set:
+    """
+    Keadaan tiap unit per upload_id: observasi terakhir dari upload <= upload_id. Upload baru
+    (kasus umum) memakai hasil yang di-cache; upload lama (rebuild dari backup) dihitung ulang.
+    """
+    if frame.empty or upload_id >= frame['UPLOAD_ID'].max():
+        if _cache['latest'] is None:
+            _cache['latest'] = _state_hashes(frame)
+        return _cache['latest']
+    return _state_hashes(frame[frame['UPLOAD_ID'] <= upload_id])
+
+def record_lineage(df: pd.DataFrame, upload_id: str, path: str = LINEAGE_PATH) -> int:
+    """
+    Catat observasi NO SERI dari satu upload ke store lineage. Observasi hanya dilewati bila sama
+    dengan observasi terakhir unit yang sama (sebelum / pada upload ini), bukan dengan semua
+    observasi lama, sehingga unit yang kembali ke keadaan lama tetap tercatat.
+
+    Returns:
+        int: jumlah observasi baru yang ditulis
+    """
+    with _lock:
+        obs = _observations(df, upload_id)
+        if obs.empty:
+            return 0
+        frame, _ = _load_index(path)
+        # OBS_HASH sudah memuat SERI_KEY: cocok = unit sama dengan keadaan sama
+        new = obs[~obs['OBS_HASH'].isin(_previous_state(frame, upload_id))]
+        if new.empty:
+            return 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_header = _file_key(path) is None
+        new[LINEAGE_COLUMNS].to_csv(path, mode='a', header=write_header, index=False)
+        return len(new)
+
+def get_serial_history(serial: str, path: str = LINEAGE_PATH) -> pd.DataFrame:
+    """
+    Riwayat perpindahan satu unit (NO SERI) lintas upload, urut kronologis.
+    Lookup memakai indeks hash SERI_KEY sehingga tidak memindai seluruh store.
+    """
+    key = normalize_serial(pd.Series([serial])).iloc[0]
+    with _lock:
+        frame, index = _load_index(path)
+    pos = index.get(key)
+    if not key or pos is None:
+        return pd.DataFrame(columns=LINEAGE_COLUMNS)
+    from .data_processor import parse_date_series  # import lokal: data_processor mengimpor modul ini
+    rows = frame.iloc[pos]
+    rows = rows.assign(_TS=parse_date_series(rows['TANGGAL TERPASANG'])[0])
+    rows = rows.sort_values(['UPLOAD_ID', '_TS', 'RECORDED_AT'], kind='stable', na_position='last')
+    return rows.drop(columns=['_TS']).reset_index(drop=True)
+
+def search_serials(prefix: str, limit: int = 20, path: str = LINEAGE_PATH) -> List[str]:
+    """Saran NO SERI (berdasarkan awalan kunci) untuk kotak pencarian."""
+    key = normalize_serial(pd.Series([prefix])).iloc[0]
+    if not key:
+        return []
+    with _lock:
+        _, index = _load_index(path)
+    return sorted(k for k in index if k.startswith(key))[:limit]
+
+def lineage_stats(path: str = LINEAGE_PATH) -> Dict[str, int]:
+    """Ringkasan store: jumlah observasi, unit unik, dan upload."""
+    with _lock:
+        frame, index = _load_index(path)
+    return {
+        'observations': len(frame),
+        'serials': len(index),
+        'uploads': int(frame['UPLOAD_ID'].nunique()) if not frame.empty else 0,
+    }
+
+def rebuild_lineage_from_backups(database_path: str, current_version: str,
+                                 backup_path: str = BACKUP_PATH, path: str = LINEAGE_PATH) -> int:
+    """
+    Isi store lineage dari CSV backup database ini (urut waktu) lalu database aktif.
+    Aman dijalankan berulang karena observasi yang sudah tercatat untuk upload yang sama tidak
+    ditulis dua kali.
+
+    Timestamp nama backup adalah saat isinya DIGANTI upload berikutnya, bukan saat diupload.
+    Isi backup ke-k diupload saat backup ke-(k-1) dibuat, jadi itulah UPLOAD_ID-nya
+    ("<timestamp>_backup"). Backup tertua tidak punya waktu upload yang diketahui: id-nya
+    "<timestamp diganti>_awal", yang terurut sebelum backup berikutnya.
+
+    Returns:
+        int: jumlah observasi baru yang ditulis
+    """
+    name = os.path.splitext(os.path.basename(database_path))[0]
+    replaced_at: List[Tuple[str, str]] = []
+    if os.path.isdir(backup_path):
+        for file_name in os.listdir(backup_path):
+            m = re.fullmatch(re.escape(name) + r'_(\d{8}_\d{6})\.csv', file_name)
+            if m:
+                replaced_at.append((m.group(1), os.path.join(backup_path, file_name)))
+    replaced_at.sort()
+    # Format id mengikuti id versi (YYYYmmdd_HHMMSS_...) agar urutan kronologis terjaga
+    sources: List[Tuple[str, str]] = [
+        (file_path, f"{replaced_at[i - 1][0]}_backup" if i else f"{ts}_awal")
+        for i, (ts, file_path) in enumerate(replaced_at)
+    ]
+    if os.path.exists(database_path):
+        sources.append((database_path, current_version))
+    written = 0
+    for file_path, upload_id in sources:
+        try:
+            df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+        except Exception as e:
+            print(f"Lineage: gagal membaca {file_path}: {e}")
+            continue
+        written += record_lineage(df, upload_id, path)
+    return written
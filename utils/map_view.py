@@ -0,0 +1,475 @@
+# utils/map_view.py
+"""
+Komponen tampilan peta UGB: indeks riwayat per koordinat, HTML riwayat (tooltip & panel)
+dan pembangunan peta Folium. Tidak bergantung pada Streamlit agar bisa dipakai ulang
+(benchmark, pre-render) di luar sesi aplikasi.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import folium
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+from pydeck.bindings.json_tools import default_serialize
+
+from config import MAP_CONFIG, DECK_TOOLTIP_MAX_POINTS
+from config import VIEWPORT_MAX_MARKERS, VIEWPORT_AGG_GRID, VIEWPORT_INDEX_CELL_DEG
+from config import GRID_LEVELS_DEG, CHOROPLETH_CELL_PX, CHOROPLETH_PALETTE
+from config import NEARBY_INDEX_CELL_DEG
+from utils.data_processor import build_coordinate_index, apply_filters
+from utils.profiler import profiled
+from utils.spatial import STATUS_PRIORITY, PRIORITY_STATUS, build_grid_index, query_bbox, aggregate_cells
+from utils.spatial import build_grid_pyramid, pyramid_level_for_zoom, query_radius, query_nearest, CandidateFilter
+
+# Prefix id layer deck.gl; dipakai untuk mengenali objek hasil picking
+DECK_LAYER_PREFIX = 'ugb-'
+
+HISTORY_DOT_COLOR = { 'STAND BY': '#28a745', 'RUSAK': '#dc3545', 'TERPASANG': '#ffc107' }
+HISTORY_PANEL_CSS = """
+<style>
+.side-panel { background:rgba(255,255,255,0.92); color:#222; border-radius:12px; box-shadow:0 6px 24px rgba(0,0,0,0.15); padding:16px 18px; border-left:4px solid #ff8c00; backdrop-filter: blur(2px); }
+.side-title { font-weight:800; font-size:18px; margin:0 0 8px 0; }
+.side-sub { font-size:12px; color:#555; margin-bottom:10px; }
+.tl-item { position:relative; padding-left:18px; margin:10px 0; }
+.tl-item .tl-dot { position:absolute; left:0; top:6px; width:8px; height:8px; border-radius:50%; }
+.tl-content { background:rgba(255,140,0,0.06); border-left:2px solid #ff8c00; padding:8px 10px; border-radius:6px; }
+</style>
+"""
+
+# Kolom yang dibaca renderer riwayat (disimpan sebagai array agar slice per koordinat murah)
+_HISTORY_FIELDS = ['STATUS_NORM', 'PENOMORAN UGB BARU', 'NO SERI', 'KAPASITAS', '_CAP_DELTA',
+                   '_PREV_PENOMORAN UGB BARU', '_PREV_KAPASITAS', '_PREV_NO SERI']
+
+@profiled()
+def new_coordinate_history(df: pd.DataFrame) -> dict:
+    """Bangun indeks riwayat per koordinat + wadah memo HTML (satu per versi dataset)."""
+    frame, slices = build_coordinate_index(df)
+    arrays = {c: frame[c].to_numpy(dtype=object) for c in _HISTORY_FIELDS if c in frame.columns}
+    return {'frame': frame, 'slices': slices, 'arrays': arrays, 'html': {}, 'points': {}}
+
+def coordinate_history_html(history: dict, coord, variant: str) -> str:
+    """HTML riwayat koordinat ('tooltip' atau 'panel'), di-memo per (versi dataset, koordinat)."""
+    key = (coord, variant)
+    html = history['html'].get(key)
+    if html is None:
+        html = _render_coordinate_history(history, coord, variant)
+        history['html'][key] = html
+    return html
+
+def _render_coordinate_history(history: dict, coord, variant: str) -> str:
+    start, stop = history['slices'][coord]
+    arrays = history['arrays']
+    rows = [{c: a[pos] for c, a in arrays.items()} for pos in range(start, stop)]
+    arrow_up = '&#8593;'; arrow_down = '&#8595;'
+    items = []
+    for i, r in enumerate(rows):
+        status = str(r.get('STATUS_NORM',''))
+        pn = str(r.get('PENOMORAN UGB BARU','-'))
+        sn = str(r.get('NO SERI','-'))
+        cap_raw = str(r.get('KAPASITAS','-'))
+        cap_str = cap_raw
+        # panah naik/turun untuk kapasitas (selisih sudah dihitung di indeks)
+        delta = r.get('_CAP_DELTA')
+        if pd.notna(delta):
+            if delta > 0: cap_str = f"{arrow_up} {cap_str}"
+            elif delta < 0: cap_str = f"{arrow_down} {cap_str}"
+        dot = HISTORY_DOT_COLOR.get(status, '#6c757d')
+        if variant == 'tooltip':
+            items.append(
+                f"""
+                <div style='margin:6px 0;'>
+                  <span style='display:inline-block;width:8px;height:8px;border-radius:50%;background:{dot};margin-right:6px;vertical-align:middle'></span>
+                  <span style='font-weight:700;'>{pn}</span>
+                  <div style='margin-left:14px;color:#333'>Capacity: <b>{cap_str}</b></div>
+                  <div style='margin-left:14px;color:#333'>No Seri: {sn}</div>
+                </div>
+                """
+            )
+            continue
+        def diff(label, val, raw, prev_col):
+            prev_val = str(r.get(prev_col, '-'))
+            if i > 0 and raw != prev_val:
+                return f'<div><b>{label}:</b> <span style="color:#ff8c00">{val}</span> <span style="color:#888">(sebelumnya: {prev_val})</span></div>'
+            return f'<div><b>{label}:</b> {val}</div>'
+        items.append(f'''
+        <div class="tl-item">
+          <div class="tl-dot" style="background:{dot}"></div>
+          <div class="tl-content">
+            {diff('UGB', pn, pn, '_PREV_PENOMORAN UGB BARU')}
+            {diff('Capacity', cap_str, cap_raw, '_PREV_KAPASITAS')}
+            {diff('No Seri', sn, sn, '_PREV_NO SERI')}
+          </div>
+        </div>
+        ''')
+
+    if variant == 'tooltip':
+        return """
+        <div style='font-family: Inter, Roboto, Arial; font-size:12px; max-width: 280px;'>
+          <div style='font-weight:800; margin-bottom:6px; color:#1f4e79;'>UGB pada Koordinat Ini</div>
+          {}
+        </div>
+        """.format("".join(items))
+    koor = f"{coord[0]:.6f}, {coord[1]:.6f}"
+    return HISTORY_PANEL_CSS + f"""
+    <div class=side-panel>
+      <div class=side-title>Detail & Ringkasan di Koordinat</div>
+      <div class=side-sub>Koordinat: {koor} • Total entri: <b>{len(rows)}</b></div>
+      {''.join(items)}
+    </div>
+    """
+
+@profiled()
+def coordinate_points(history: dict, filtered_index: pd.Index) -> pd.DataFrame:
+    """
+    Satu baris per koordinat dari baris terfilter (vektorisasi, dipakai Folium & WebGL).
+    Kolom: lat, lon, status (warna prioritas RUSAK > TERPASANG > STAND BY), n (jumlah entri)
+    + ringkasan entri terakhir (NO terbesar): peno, kapasitas, ulp, status_last.
+    Dimemo per isi index terfilter (klik peta menjalankan ulang fragment dengan filter yang sama).
+    """
+    key = (len(filtered_index), hash(np.asarray(filtered_index).tobytes()))
+    memo = history.setdefault('points', {})
+    if key not in memo:
+        if len(memo) >= 4:
+            memo.pop(next(iter(memo)))
+        memo[key] = _coordinate_points(history, filtered_index)
+    return memo[key]
+
+def _coordinate_points(history: dict, filtered_index: pd.Index) -> pd.DataFrame:
+    index_frame = history['frame']
+    # Hanya kolom yang dibutuhkan (frame indeks memuat puluhan kolom)
+    needed = [c for c in ('_LAT', '_LON', '_NO', 'STATUS_NORM', 'PENOMORAN UGB BARU', 'KAPASITAS', 'ULP') if c in index_frame.columns]
+    groups = index_frame.loc[index_frame.index.isin(filtered_index), needed]
+    columns = ['lat', 'lon', 'status', 'n', 'peno', 'kapasitas', 'ulp', 'status_last']
+    if groups.empty:
+        return pd.DataFrame(columns=columns)
+    status = groups['STATUS_NORM']
+    flags = groups.assign(
+        _RUSAK=status.eq('RUSAK'),
+        _TERPASANG=status.eq('TERPASANG'),
+    ).groupby(['_LAT', '_LON'], sort=False).agg(
+        rusak=('_RUSAK', 'any'), terpasang=('_TERPASANG', 'any'), n=('_NO', 'size'))
+    # Popup ringkas: entri terakhir (NO terbesar) sebagai ringkasan
+    last_rows = groups.sort_values('_NO', kind='stable').groupby(['_LAT', '_LON'], sort=False).tail(1).set_index(['_LAT', '_LON'])
+    last_rows = last_rows.reindex(flags.index)
+
+    def _col(name):
+        return last_rows[name].to_numpy(dtype=object) if name in last_rows.columns else np.full(len(flags), '-', dtype=object)
+
+    return pd.DataFrame({
+        'lat': flags.index.get_level_values(0).to_numpy(dtype=float),
+        'lon': flags.index.get_level_values(1).to_numpy(dtype=float),
+        'status': np.where(flags['rusak'], 'RUSAK', np.where(flags['terpasang'], 'TERPASANG', 'STAND BY')),
+        'n': flags['n'].to_numpy(),
+        'peno': _col('PENOMORAN UGB BARU'),
+        'kapasitas': _col('KAPASITAS'),
+        'ulp': _col('ULP'),
+        'status_last': last_rows['STATUS_NORM'].fillna('').to_numpy(dtype=object),
+    })
+
+@profiled()
+def build_folium_map(history: dict, filtered_index: pd.Index) -> Tuple[folium.Map, int]:
+    """
+    Bangun peta Folium: satu marker per koordinat untuk baris terfilter.
+    Warna mengikuti prioritas RUSAK > TERPASANG > STAND BY; tooltip = riwayat koordinat.
+
+    Returns:
+        Tuple[folium.Map, int]: (peta, jumlah marker)
+    """
+    m = new_base_map()
+    points = coordinate_points(history, filtered_index)
+    return m, _add_point_markers(m, history, points)
+
+def new_base_map() -> folium.Map:
+    """Peta dasar kosong pada posisi awal Lampung (identik di setiap rerun)."""
+    return folium.Map(location=MAP_CONFIG['default_center'], zoom_start=MAP_CONFIG.get('default_zoom', 9), tiles='OpenStreetMap')
+
+def _add_point_markers(target, history: dict, points: pd.DataFrame) -> int:
+    """Tambahkan satu marker per baris coordinate_points ke peta / FeatureGroup."""
+    marker_count = 0
+    for lat, lon, point_status, nomor, kapasitas, ulp, status in zip(
+            points['lat'], points['lon'], points['status'], points['peno'],
+            points['kapasitas'], points['ulp'], points['status_last']):
+        marker_count += 1
+        # Prioritas warna: RUSAK > TERPASANG > STAND BY
+        color = MAP_CONFIG['marker_colors'][point_status]
+        tooltip_html = coordinate_history_html(history, (lat, lon), 'tooltip')
+        popup_text = f"""
+        <div style=\"font-family: Arial; width: 260px;\">
+            <h4 style=\"color: #1f4e79; margin-bottom: 10px;\">🔧 {nomor}</h4>
+            <hr style=\"margin: 10px 0;\">
+            <p><b>⚡ Kapasitas:</b> {kapasitas}</p>
+            <p><b>📊 Status:</b> <span>{status}</span></p>
+            <p><b>🏪 ULP:</b> {ulp}</p>
+        </div>
+        """
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(popup_text, max_width=300),
+            icon=folium.Icon(color=color, icon='bolt', prefix='fa'),
+            tooltip=folium.Tooltip(tooltip_html, sticky=True, direction='top')
+        ).add_to(target)
+    return marker_count
+
+def _viewport_points(history: dict, filtered_index: pd.Index) -> dict:
+    """coordinate_points + indeks grid + kode prioritas status, dimemo bersama titiknya."""
+    points = coordinate_points(history, filtered_index)
+    memo = history.setdefault('viewport', {})
+    key = id(points)
+    if key not in memo:
+        memo.clear()
+        lat, lon = points['lat'].to_numpy(dtype=float), points['lon'].to_numpy(dtype=float)
+        memo[key] = {
+            'points': points,
+            'lat': lat,
+            'lon': lon,
+            'priority': points['status'].map(STATUS_PRIORITY).to_numpy(dtype=np.int64),
+            'grid': build_grid_index(lat, lon, VIEWPORT_INDEX_CELL_DEG),
+        }
+    return memo[key]
+
+def _rgb_hex(rgb) -> str:
+    return '#{:02x}{:02x}{:02x}'.format(*rgb)
+
+@profiled()
+def build_viewport_layer(history: dict, filtered_index: pd.Index, bounds: Optional[dict]) -> Tuple[folium.FeatureGroup, dict]:
+    """
+    Marker untuk area yang sedang terlihat saja (bounds dari st_folium).
+    Bila titik di viewport melebihi VIEWPORT_MAX_MARKERS, titik diagregasi ke sel grid
+    (ukuran sel mengikuti lebar viewport, dibulatkan ke pangkat dua agar stabil saat geser).
+
+    Returns:
+        Tuple[folium.FeatureGroup, dict]: (layer, info: in_view, shown, aggregated)
+    """
+    vp = _viewport_points(history, filtered_index)
+    lat, lon = vp['lat'], vp['lon']
+    layer = folium.FeatureGroup(name='UGB')
+    if bounds and bounds.get('_southWest') and bounds['_southWest'].get('lat') is not None:
+        south, west = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+        north, east = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+        picked = query_bbox(vp['grid'], lat, lon, south, west, north, east)
+    else:
+        # Belum ada bounds dari peta (render pertama): anggap seluruh titik terlihat
+        picked = np.arange(len(lat))
+        west, east = (float(lon.min()), float(lon.max())) if len(lon) else (0.0, 1.0)
+    info = {'in_view': int(len(picked)), 'shown': 0, 'aggregated': False}
+    if len(picked) <= VIEWPORT_MAX_MARKERS:
+        info['shown'] = _add_point_markers(layer, history, vp['points'].iloc[picked])
+        return layer, info
+
+    cell = 2.0 ** np.round(np.log2(max(east - west, 1e-6) / VIEWPORT_AGG_GRID))
+    cells = aggregate_cells(lat[picked], lon[picked], vp['priority'][picked], cell, origin=(0.0, 0.0))
+    colors = {code: _rgb_hex(MAP_CONFIG['deck_colors'][status]) for code, status in PRIORITY_STATUS.items()}
+    for i in range(len(cells['count'])):
+        count = int(cells['count'][i])
+        color = colors[int(cells['priority'][i])]
+        breakdown = ' • '.join(f"{PRIORITY_STATUS[c]} {int(cells[f'n_{c}'][i]):,}" for c in (2, 1, 0) if cells[f'n_{c}'][i])
+        folium.CircleMarker(
+            location=[float(cells['lat'][i]), float(cells['lon'][i])],
+            radius=float(6 + 4 * np.log10(count)),
+            color=color, weight=1, fill=True, fill_color=color, fill_opacity=0.6,
+            tooltip=f"{count:,} titik UGB • {breakdown}<br/>Perbesar peta untuk melihat marker",
+        ).add_to(layer)
+    info.update(shown=len(cells['count']), aggregated=True)
+    return layer, info
+
+class CompactDeck(pdk.Deck):
+    """pdk.Deck yang diserialisasi tanpa indentasi (bawaan pydeck indent=2 menggandakan payload)."""
+
+    def to_json(self):
+        return json.dumps(self, sort_keys=True, default=default_serialize, separators=(',', ':'))
+
+@profiled()
+def build_deck_map(history: dict, filtered_index: pd.Index) -> Tuple[pdk.Deck, int]:
+    """
+    Peta WebGL (deck.gl ScatterplotLayer) untuk titik dalam jumlah besar.
+    Satu layer per status (warna konstan, RUSAK digambar paling atas) sehingga data
+    hanya berisi posisi + ringkasan untuk tooltip. Id layer = DECK_LAYER_PREFIX + status.
+    Di atas DECK_TOOLTIP_MAX_POINTS data dikirim sebagai pasangan [lon, lat] saja
+    (payload JSON jauh lebih kecil); detail tetap tersedia lewat klik -> panel samping.
+
+    Returns:
+        Tuple[pdk.Deck, int]: (deck, jumlah titik)
+    """
+    points = coordinate_points(history, filtered_index)
+    with_tooltip = len(points) <= DECK_TOOLTIP_MAX_POINTS
+    layers = []
+    for status in ('STAND BY', 'TERPASANG', 'RUSAK'):
+        data = points.loc[points['status'] == status]
+        if data.empty:
+            continue
+        if with_tooltip:
+            data = data[['lon', 'lat', 'n', 'peno', 'ulp', 'status_last']].astype({'peno': str, 'ulp': str, 'status_last': str})
+            position = '[lon, lat]'
+        else:
+            data = data[['lon', 'lat']].to_numpy().tolist()
+            position = '-'
+        layers.append(pdk.Layer(
+            'ScatterplotLayer',
+            id=DECK_LAYER_PREFIX + status,
+            data=data,
+            get_position=position,
+            get_fill_color=MAP_CONFIG['deck_colors'][status],
+            get_radius=60,
+            radius_min_pixels=3,
+            radius_max_pixels=12,
+            stroked=False,
+            pickable=True,
+            auto_highlight=True,
+        ))
+    deck = CompactDeck(
+        layers=layers,
+        initial_view_state=pdk.ViewState(
+            latitude=MAP_CONFIG['default_center'][0],
+            longitude=MAP_CONFIG['default_center'][1],
+            zoom=MAP_CONFIG.get('default_zoom', 9),
+        ),
+        map_style=None,
+        tooltip={
+            'html': '<b>{peno}</b><br/>{status_last} • ULP {ulp}<br/>{n} entri di koordinat ini',
+            'style': {'fontSize': '12px'},
+        } if with_tooltip else False,
+    )
+    return deck, len(points)
+
+def picked_coordinate(selection) -> Optional[Tuple[float, float]]:
+    """Koordinat (lat, lon) dari hasil picking st.pydeck_chart (objek pertama yang terpilih)."""
+    objects = (selection or {}).get('objects') or {}
+    for layer_id, picked in objects.items():
+        if str(layer_id).startswith(DECK_LAYER_PREFIX) and picked:
+            obj = picked[0]
+            # Objek berupa record (mode tooltip) atau pasangan [lon, lat]
+            lat, lon = (obj['lat'], obj['lon']) if isinstance(obj, dict) else (obj[1], obj[0])
+            return round(float(lat), 6), round(float(lon), 6)
+    return None
+
+# Dimensi yang dipertahankan di piramida agar slicer dashboard bisa diterapkan ke agregat
+_PYRAMID_GROUPS = ['UP3', 'ULP', 'STATUS_NORM']
+
+def grid_pyramid(history: dict) -> dict:
+    """Agregasi grid multi-resolusi seluruh baris dataset, dibangun sekali per versi (disimpan di history)."""
+    if 'pyramid' not in history:
+        frame = history['frame']
+        groups = [c for c in _PYRAMID_GROUPS if c in frame.columns]
+        history['pyramid'] = build_grid_pyramid(frame, GRID_LEVELS_DEG, groups)
+    return history['pyramid']
+
+@profiled()
+def build_choropleth_layer(history: dict, filters: dict, bounds: Optional[dict], zoom: float) -> Tuple[folium.FeatureGroup, dict]:
+    """
+    Choropleth sel grid untuk tampilan jauh (zoom kecil): level piramida dipilih dari zoom,
+    filter slicer diterapkan ke agregat, hanya sel di dalam bounds yang dikirim.
+    Warna = jumlah entri UGB (skala log relatif terhadap sel terpadat yang terlihat).
+
+    Returns:
+        Tuple[folium.FeatureGroup, dict]: (layer, info: in_view, shown, aggregated, cell_deg)
+    """
+    cell = pyramid_level_for_zoom(GRID_LEVELS_DEG, zoom, CHOROPLETH_CELL_PX)
+    cube = apply_filters(grid_pyramid(history)[cell], filters)
+    if bounds and bounds.get('_southWest') and bounds['_southWest'].get('lat') is not None:
+        r0, r1 = np.floor(bounds['_southWest']['lat'] / cell), np.floor(bounds['_northEast']['lat'] / cell)
+        c0, c1 = np.floor(bounds['_southWest']['lng'] / cell), np.floor(bounds['_northEast']['lng'] / cell)
+        cube = cube[cube['_ROW'].between(r0, r1) & cube['_COL'].between(c0, c1)]
+    layer = folium.FeatureGroup(name='UGB')
+    cells = cube.groupby(['_ROW', '_COL'], sort=False)[['_COUNT', '_LAT_SUM', '_LON_SUM']].sum()
+    info = {'in_view': int(cells['_COUNT'].sum()), 'shown': len(cells), 'aggregated': True, 'cell_deg': cell}
+    if cells.empty:
+        return layer, info
+    if 'STATUS_NORM' in cube.columns:
+        mix = cube.groupby(['_ROW', '_COL', 'STATUS_NORM'], sort=False)['_COUNT'].sum().unstack(fill_value=0).reindex(cells.index)
+    else:
+        mix = pd.DataFrame(index=cells.index)
+    log_counts = np.log1p(cells['_COUNT'].to_numpy(dtype=float))
+    shade = np.minimum((log_counts / max(log_counts.max(), 1e-9) * len(CHOROPLETH_PALETTE)).astype(int), len(CHOROPLETH_PALETTE) - 1)
+    for (row, col), count, tone, (_, statuses) in zip(cells.index, cells['_COUNT'], shade, mix.iterrows()):
+        breakdown = ' • '.join(f"{status} {int(statuses[status]):,}" for status in ('RUSAK', 'TERPASANG', 'STAND BY') if statuses.get(status, 0))
+        pct_rusak = (statuses.get('RUSAK', 0) / count * 100) if count else 0
+        folium.Rectangle(
+            bounds=[[row * cell, col * cell], [(row + 1) * cell, (col + 1) * cell]],
+            color='#555555', weight=0.5, fill=True,
+            fill_color=CHOROPLETH_PALETTE[tone], fill_opacity=0.55,
+            tooltip=f"<b>{int(count):,} entri UGB</b><br/>{breakdown}<br/>{pct_rusak:.1f}% RUSAK<br/>Perbesar peta untuk melihat marker",
+        ).add_to(layer)
+    return layer, info
+
+# ===== PENCARIAN UGB TERDEKAT (radius / k-terdekat, jarak haversine) =====
+# Kunci filter (sama dengan slicer) -> kolom frame indeks riwayat
+_NEARBY_FILTERS = {'UP3': 'UP3', 'ULP': 'ULP', 'STATUS': 'STATUS_NORM'}
+NEARBY_COLUMNS = ['PENOMORAN UGB BARU', 'STATUS_NORM', 'KAPASITAS', 'NO SERI', 'UP3', 'ULP',
+                  'ALAMAT TERPASANG', 'KOORDINAT TAGGING']
+
+def nearby_index(history: dict) -> dict:
+    """
+    Indeks grid per entri UGB (baris frame riwayat) + kode kategori kolom filter dan penanda
+    entri terakhir per koordinat; dibangun sekali per versi dataset (disimpan di history).
+    """
+    if 'nearby' not in history:
+        frame = history['frame']
+        lat, lon = frame['_LAT'].to_numpy(dtype=float), frame['_LON'].to_numpy(dtype=float)
+        codes = {}
+        for key, col in _NEARBY_FILTERS.items():
+            if col in frame.columns:
+                values, uniques = pd.factorize(frame[col].astype(str))
+                codes[key] = (values, {u: i for i, u in enumerate(uniques)})
+        # Frame terurut per koordinat lalu tanggal: entri terakhir tiap slice = unit terkini di titik itu
+        latest = np.zeros(len(frame), dtype=bool)
+        latest[[end - 1 for _start, end in history['slices'].values()]] = True
+        history['nearby'] = {'lat': lat, 'lon': lon, 'codes': codes, 'latest': latest,
+                             'grid': build_grid_index(lat, lon, NEARBY_INDEX_CELL_DEG)}
+    return history['nearby']
+
+def nearby_options(history: dict) -> Dict[str, List[str]]:
+    """Nilai yang bisa dipilih per filter pencarian terdekat (UP3, ULP, STATUS), terurut."""
+    return {key: sorted(lookup) for key, (_values, lookup) in nearby_index(history)['codes'].items()}
+
+def _nearby_filter(index: dict, filters: Optional[Dict[str, Any]], latest_only: bool) -> Optional[CandidateFilter]:
+    """Penyaring kandidat dari filter (semantik apply_filters); dievaluasi hanya pada kandidat grid."""
+    checks = []
+    for key, val in (filters or {}).items():
+        if key not in index['codes'] or val is None or val == 'Semua':
+            continue
+        values = [val] if isinstance(val, str) else list(val)
+        if not values:
+            continue
+        codes, lookup = index['codes'][key]
+        checks.append((codes, np.array([lookup[v] for v in values if v in lookup], dtype=np.int64)))
+    if not checks and not latest_only:
+        return None
+
+    def accept(positions: np.ndarray) -> np.ndarray:
+        mask = index['latest'][positions] if latest_only else np.ones(len(positions), dtype=bool)
+        for codes, allowed in checks:
+            mask &= np.isin(codes[positions], allowed)
+        return mask
+    return accept
+
+@profiled()
+def find_nearby(history: dict, coord: Tuple[float, float], filters: Optional[Dict[str, Any]] = None,
+                radius_km: Optional[float] = None, k: Optional[int] = None,
+                latest_only: bool = True) -> Tuple[pd.DataFrame, dict]:
+    """
+    Entri UGB di sekitar koordinat: k terdekat (bila k diisi, dibatasi radius_km bila ada)
+    atau semua dalam radius_km. filters seperti apply_filters ({'STATUS': [...], 'UP3': ..., 'ULP': ...}).
+    latest_only: hanya entri terakhir tiap koordinat (unit yang saat ini tercatat di titik itu).
+
+    Returns:
+        Tuple[pd.DataFrame, dict]: (JARAK (KM) + NEARBY_COLUMNS urut jarak naik,
+        info: found, seconds)
+    """
+    t0 = time.perf_counter()
+    index = nearby_index(history)
+    accept = _nearby_filter(index, filters, latest_only)
+    center_lat, center_lon = coord
+    if k:
+        positions, dist = query_nearest(index['grid'], index['lat'], index['lon'], center_lat, center_lon,
+                                        int(k), accept, radius_km)
+    else:
+        positions, dist = query_radius(index['grid'], index['lat'], index['lon'], center_lat, center_lon,
+                                       float(radius_km or 0), accept)
+    frame = history['frame']
+    result = frame.iloc[positions][[c for c in NEARBY_COLUMNS if c in frame.columns]].reset_index(drop=True)
+    result = result.rename(columns={'STATUS_NORM': 'STATUS'})
+    result.insert(0, 'JARAK (KM)', np.round(dist, 3))
+    return result, {'found': len(result), 'seconds': time.perf_counter() - t0}
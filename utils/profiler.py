@@ -0,0 +1,238 @@
+# utils/profiler.py
+"""
+Instrumentasi rerun (opsional): waktu, jumlah baris, puncak memori (tracemalloc),
+ukuran payload per span, plus cProfile untuk diekspor sebagai .prof / collapsed stack.
+
+Tidak bergantung pada Streamlit. Saat tidak ada rerun yang sedang diprofil,
+`span()` dan dekorator `profiled()` hanya melakukan satu pengecekan atribut.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+# State per thread: Streamlit menjalankan script tiap sesi di thread sendiri
+_local = threading.local()
+
+# ===== Siklus hidup satu rerun =====
+def start_rerun(label: str, memory: bool = False, cprofile: bool = False) -> Dict[str, Any]:
+    """Mulai merekam satu rerun. `memory` menyalakan tracemalloc (global per proses, memperlambat)."""
+    record = {
+        'label': label,
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'memory': memory,
+        'spans': [],
+        'payloads': [],
+        'total_seconds': None,
+        'peak_bytes': None,
+        'profile': None,
+    }
+    _local.record = record
+    _local.stack = []
+    _local.started = time.perf_counter()
+    _local.own_tracemalloc = False
+    if memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _local.own_tracemalloc = True
+        tracemalloc.reset_peak()
+    _local.profiler = None
+    if cprofile:
+        _local.profiler = cProfile.Profile()
+        try:
+            _local.profiler.enable()
+        except ValueError:
+            # Profiler lain sedang aktif di thread ini
+            _local.profiler = None
+    return record
+
+
+def finish_rerun() -> Optional[Dict[str, Any]]:
+    """Tutup rerun yang aktif dan kembalikan record-nya (None jika tidak ada)."""
+    record = getattr(_local, 'record', None)
+    if record is None:
+        return None
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profiler.create_stats()
+        record['profile'] = marshal.dumps(profiler.stats)
+    record['total_seconds'] = time.perf_counter() - _local.started
+    if record['memory'] and tracemalloc.is_tracing():
+        record['peak_bytes'] = max([tracemalloc.get_traced_memory()[1]] + [s['peak_bytes'] or 0 for s in record['spans']])
+        if _local.own_tracemalloc:
+            tracemalloc.stop()
+    _local.record = None
+    _local.profiler = None
+    return record
+
+
+def is_active() -> bool:
+    return getattr(_local, 'record', None) is not None
+
+# ===== Span & payload =====
+def _rows_of(obj: Any) -> Optional[int]:
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        return len(obj)
+    if isinstance(obj, tuple):
+        for item in obj:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                return len(item)
+    return None
+
+
+@contextmanager
+def span(name: str, rows: Optional[int] = None):
+    """
+    Ukur satu blok kode. Info yang di-yield boleh diisi `rows`.
+    Puncak memori span bersarang digabung ke span induk (tracemalloc hanya punya satu peak).
+    """
+    record = getattr(_local, 'record', None)
+    if record is None:
+        yield {}
+        return
+    stack = _local.stack
+    tracing = record['memory'] and tracemalloc.is_tracing()
+    if tracing:
+        # Simpan peak berjalan milik induk sebelum peak di-reset untuk span ini
+        peak = tracemalloc.get_traced_memory()[1]
+        if stack:
+            stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        tracemalloc.reset_peak()
+    info = {'name': name, 'depth': len(stack), 'rows': rows, '_peak': 0,
+            '_base': tracemalloc.get_traced_memory()[0] if tracing else 0}
+    stack.append(info)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        peak_bytes = None
+        if tracing:
+            peak = max(info['_peak'], tracemalloc.get_traced_memory()[1])
+            peak_bytes = max(peak - info['_base'], 0)
+            if stack:
+                stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        record['spans'].append({
+            'name': name,
+            'depth': info['depth'],
+            'offset': start - _local.started,
+            'seconds': seconds,
+            'rows': info['rows'],
+            'peak_bytes': peak_bytes,
+        })
+
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """Dekorator: bungkus fungsi dengan `span`; jumlah baris diambil dari DataFrame hasil/argumen pertama."""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, 'record', None) is None:
+                return func(*args, **kwargs)
+            with span(label) as info:
+                result = func(*args, **kwargs)
+                rows = _rows_of(result)
+                info['rows'] = rows if rows is not None else (_rows_of(args[0]) if args else None)
+                return result
+        return wrapper
+    return decorator
+
+
+def record_payload(name: str, payload: Any) -> None:
+    """Catat ukuran payload yang dikirim ke browser (bytes/str/DataFrame)."""
+    record = getattr(_local, 'record', None)
+    if record is None:
+        return
+    if isinstance(payload, (bytes, bytearray)):
+        size = len(payload)
+    elif isinstance(payload, str):
+        size = len(payload.encode('utf-8'))
+    elif isinstance(payload, pd.DataFrame):
+        size = int(payload.memory_usage(index=True, deep=True).sum())
+    elif isinstance(payload, int):
+        size = payload
+    else:
+        size = len(repr(payload).encode('utf-8'))
+    record['payloads'].append({'name': name, 'bytes': size})
+
+# ===== Ekspor profil =====
+def _load_stats(record: Dict[str, Any]) -> Optional[pstats.Stats]:
+    if not record.get('profile'):
+        return None
+    stats = pstats.Stats()
+    stats.stats = marshal.loads(record['profile'])
+    stats.get_top_level_stats()
+    return stats
+
+
+def profile_to_text(record: Dict[str, Any], limit: int = 40) -> str:
+    """Ringkasan pstats (urut cumulative) untuk ditampilkan di panel."""
+    stats = _load_stats(record)
+    if stats is None:
+        return ""
+    buf = io.StringIO()
+    stats.stream = buf
+    stats.sort_stats('cumulative').print_stats(limit)
+    return buf.getvalue()
+
+
+def _func_label(func) -> str:
+    filename, line, fn = func
+    if filename == '~':
+        return fn
+    short = filename.replace('\\', '/').rsplit('/', 2)
+    return f"{fn} ({'/'.join(short[-2:])}:{line})"
+
+
+def profile_to_collapsed(record: Dict[str, Any], max_depth: int = 60, min_seconds: float = 1e-4) -> str:
+    """
+    Format collapsed stack ("a;b;c mikrodetik") untuk flamegraph.pl / speedscope.
+    cProfile hanya menyimpan relasi pemanggil-terpanggil, jadi waktu anak dibagi
+    proporsional menurut cumulative time tiap edge (aproksimasi standar).
+    Cabang di bawah `min_seconds` dipangkas agar jumlah jalur tidak meledak.
+    """
+    if not record.get('profile'):
+        return ""
+    raw = marshal.loads(record['profile'])
+    children: Dict[Any, List[Any]] = {}
+    roots = []
+    for func, (_cc, _nc, _tt, _ct, callers) in raw.items():
+        if not callers:
+            roots.append(func)
+        for caller in callers:
+            children.setdefault(caller, []).append(func)
+
+    lines: Dict[str, float] = {}
+
+    def walk(func, path, fraction, seen):
+        _cc, _nc, tt, ct, _callers = raw[func]
+        label = path + [_func_label(func)]
+        key = ';'.join(label)
+        lines[key] = lines.get(key, 0.0) + tt * fraction
+        if len(label) >= max_depth:
+            return
+        for child in children.get(func, []):
+            if child in seen:
+                continue
+            child_ct = raw[child][3]
+            edge_ct = raw[child][4][func][3]
+            if child_ct <= 0 or edge_ct <= 0 or fraction * edge_ct < min_seconds:
+                continue
+            walk(child, label, fraction * edge_ct / child_ct, seen | {child})
+
+    for root in roots:
+        walk(root, [], 1.0, {root})
+    return '\n'.join(f"{k} {int(round(v * 1e6))}" for k, v in lines.items() if v * 1e6 >= 1) + '\n'
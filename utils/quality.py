@@ -0,0 +1,178 @@
+# utils/quality.py
+"""
+Validasi kualitas data saat ingest (rule engine vektorisasi).
+
+Setiap aturan memeriksa satu kolom penuh sekaligus (operasi string/numerik pandas, hash untuk
+duplikat) tanpa loop per baris, sehingga biaya total linear terhadap jumlah baris. Hasilnya
+matriks boolean baris x aturan (1 byte per sel) yang diringkas menjadi jumlah per aturan dan
+daftar masalah per baris (hanya baris bermasalah) untuk diunduh dari halaman upload.
+
+Validasi tidak menolak upload: baris bermasalah tetap disimpan apa adanya, hanya dilaporkan.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import DATE_COLUMNS, QUALITY_COORD_BOUNDS, SOURCE_FILE_COLUMN
+from .data_processor import RECAP_STATUSES, normalize_status_series, parse_coordinates_vectorized, _capacity_numeric
+
+ISSUE_CONTEXT_COLUMNS = ['NO', 'SOURCE_SHEET', SOURCE_FILE_COLUMN, 'UP3', 'ULP', 'PENOMORAN UGB BARU']
+
+def _text(df: pd.DataFrame, col: str, rows: Optional[np.ndarray] = None) -> pd.Series:
+    """Isi kolom (opsional hanya posisi `rows`) sebagai teks ter-trim ('' untuk kosong / kolom tidak ada)."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index if rows is None else df.index[rows], dtype=object)
+    s = df[col] if rows is None else df[col].iloc[rows]
+    return s.astype(object).where(s.notna(), "").astype(str).str.strip()
+
+def _coordinates(df: pd.DataFrame, ctx: Dict[str, Any]) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """(teks, lat, lon) KOORDINAT TAGGING, di-parse sekali untuk semua aturan koordinat."""
+    if 'coords' not in ctx:
+        text = _text(df, 'KOORDINAT TAGGING')
+        # Satu koordinat biasanya muncul di banyak baris (riwayat unit): parse nilai unik saja
+        codes, uniques = pd.factorize(text)
+        lat_u, lon_u = parse_coordinates_vectorized(pd.Series(uniques, dtype=object))
+        lat = pd.Series(lat_u.to_numpy()[codes], index=text.index)
+        lon = pd.Series(lon_u.to_numpy()[codes], index=text.index)
+        ctx['coords'] = (text, lat, lon)
+    return ctx['coords']
+
+def _coord_empty(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    text, _lat, _lon = _coordinates(df, ctx)
+    return text.eq("")
+
+def _coord_invalid(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    text, lat, _lon = _coordinates(df, ctx)
+    return text.ne("") & lat.isna()
+
+def _coord_out_of_region(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    # Termasuk lat/lon tertukar dan nilai mustahil (|lat| > 90): terbaca, tapi titiknya salah tempat
+    _coord_text, lat, lon = _coordinates(df, ctx)
+    (lat_min, lat_max), (lon_min, lon_max) = QUALITY_COORD_BOUNDS['lat'], QUALITY_COORD_BOUNDS['lon']
+    return lat.notna() & ~(lat.between(lat_min, lat_max) & lon.between(lon_min, lon_max))
+
+def _capacity_not_numeric(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    text = _text(df, 'KAPASITAS')
+    codes, uniques = pd.factorize(text)
+    not_numeric = _capacity_numeric(pd.Series(uniques, dtype=object)).isna().to_numpy()
+    return text.ne("") & not_numeric[codes]
+
+def _duplicate_number(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    # Dibandingkan tanpa beda huruf besar/kecil & spasi tepi; semua kemunculan ditandai
+    key = _text(df, 'PENOMORAN UGB BARU').str.upper()
+    return key.ne("") & key.duplicated(keep=False)
+
+def _status_unknown(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    return ~normalize_status_series(_text(df, 'STATUS')).isin(RECAP_STATUSES)
+
+def _date_unparseable(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    mask = pd.Series(False, index=df.index)
+    for src, dst in DATE_COLUMNS.items():
+        if dst in df.columns:
+            mask |= _text(df, src).ne("") & df[dst].isna()
+    return mask
+
+def _removed_before_installed(df: pd.DataFrame, ctx: Dict[str, Any]) -> pd.Series:
+    installed, removed = DATE_COLUMNS['TANGGAL TERPASANG'], DATE_COLUMNS['TANGGAL TERBONGKAR']
+    if installed not in df.columns or removed not in df.columns:
+        return pd.Series(False, index=df.index)
+    # NaT dibandingkan selalu False: hanya pasangan tanggal yang keduanya terbaca
+    return df[removed].lt(df[installed])
+
+def _date_unparseable_value(df: pd.DataFrame, rows: np.ndarray) -> np.ndarray:
+    parts = []
+    for src, dst in DATE_COLUMNS.items():
+        if dst in df.columns:
+            text = _text(df, src, rows)
+            bad = text.ne("") & df[dst].iloc[rows].isna()
+            parts.append((src + ": " + text).where(bad, ""))
+    value = parts[0]
+    for part in parts[1:]:
+        value = value.str.cat(part, sep="; ").str.strip("; ")
+    return value.to_numpy(dtype=object)
+
+def _removed_before_installed_value(df: pd.DataFrame, rows: np.ndarray) -> np.ndarray:
+    value = _text(df, 'TANGGAL TERBONGKAR', rows) + " < " + _text(df, 'TANGGAL TERPASANG', rows)
+    return value.to_numpy(dtype=object)
+
+# (kode, kolom, keterangan, pemeriksaan) — urutan = urutan kolom matriks
+QUALITY_RULES: List[Tuple[str, str, str, Callable[[pd.DataFrame, Dict[str, Any]], pd.Series]]] = [
+    ('KOORDINAT_KOSONG', 'KOORDINAT TAGGING', 'Koordinat kosong (tidak tampil di peta)', _coord_empty),
+    ('KOORDINAT_TIDAK_VALID', 'KOORDINAT TAGGING', 'Koordinat tidak bisa dibaca', _coord_invalid),
+    ('KOORDINAT_LUAR_WILAYAH', 'KOORDINAT TAGGING', 'Koordinat di luar wilayah Lampung', _coord_out_of_region),
+    ('KAPASITAS_BUKAN_ANGKA', 'KAPASITAS', 'Kapasitas bukan angka', _capacity_not_numeric),
+    ('PENOMORAN_DUPLIKAT', 'PENOMORAN UGB BARU', 'Penomoran UGB baru ganda', _duplicate_number),
+    ('STATUS_TIDAK_DIKENAL', 'STATUS', f"Status di luar {' / '.join(RECAP_STATUSES)}", _status_unknown),
+    ('TANGGAL_TIDAK_TERBACA', 'TANGGAL TERPASANG/TERBONGKAR', 'Tanggal tidak bisa dibaca', _date_unparseable),
+    ('TERBONGKAR_SEBELUM_TERPASANG', 'TANGGAL TERBONGKAR', 'Tanggal terbongkar sebelum tanggal terpasang',
+     _removed_before_installed),
+]
+RULE_CODES = [code for code, _col, _label, _check in QUALITY_RULES]
+RULE_LABELS = {code: label for code, _col, label, _check in QUALITY_RULES}
+
+# Nilai yang ditampilkan di daftar masalah bila bukan sekadar isi kolom aturan
+_ISSUE_VALUES = {
+    'TANGGAL_TIDAK_TERBACA': _date_unparseable_value,
+    'TERBONGKAR_SEBELUM_TERPASANG': _removed_before_installed_value,
+}
+
+def build_issue_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Matriks boolean (jumlah baris x len(QUALITY_RULES)); kolom j True = baris melanggar aturan j."""
+    matrix = np.zeros((len(df), len(QUALITY_RULES)), dtype=bool)
+    ctx: Dict[str, Any] = {}
+    for j, (_code, _col, _label, check) in enumerate(QUALITY_RULES):
+        matrix[:, j] = check(df, ctx).to_numpy(dtype=bool)
+    return matrix
+
+def summarize_issues(matrix: np.ndarray) -> Dict[str, Any]:
+    """Ringkasan JSON-able: jumlah baris, baris bermasalah, dan jumlah pelanggaran per aturan."""
+    counts = matrix.sum(axis=0)
+    return {
+        'rows': int(matrix.shape[0]),
+        'rows_with_issues': int(matrix.any(axis=1).sum()),
+        'issues': int(counts.sum()),
+        'rules': [{'rule': code, 'column': col, 'label': label, 'count': int(n)}
+                  for (code, col, label, _check), n in zip(QUALITY_RULES, counts)],
+    }
+
+def build_issue_list(df: pd.DataFrame, matrix: np.ndarray) -> pd.DataFrame:
+    """
+    Satu baris per (baris data, aturan yang dilanggar), urut NO lalu aturan: kolom konteks
+    (NO, SHEET/FILE asal, UP3, ULP, PENOMORAN) + ATURAN, KETERANGAN, KOLOM, NILAI.
+    """
+    rows, rule_idx = np.nonzero(matrix)
+    context = [c for c in ISSUE_CONTEXT_COLUMNS if c in df.columns]
+    issues = df[context].iloc[rows].astype(object).reset_index(drop=True)
+    codes = np.array(RULE_CODES, dtype=object)[rule_idx]
+    values = np.empty(len(rows), dtype=object)
+    for j, (code, col, _label, _check) in enumerate(QUALITY_RULES):
+        sel = rule_idx == j
+        if not sel.any():
+            continue
+        if code in _ISSUE_VALUES:
+            values[sel] = _ISSUE_VALUES[code](df, rows[sel])
+        else:
+            values[sel] = _text(df, col, rows[sel]).to_numpy(dtype=object)
+    issues['ATURAN'] = codes
+    issues['KETERANGAN'] = np.array([label for _code, _col, label, _check in QUALITY_RULES], dtype=object)[rule_idx]
+    issues['KOLOM'] = np.array([col for _code, col, _label, _check in QUALITY_RULES], dtype=object)[rule_idx]
+    issues['NILAI'] = values
+    return issues
+
+def check_data_quality(df: pd.DataFrame) -> Tuple[Dict[str, Any], pd.DataFrame, np.ndarray]:
+    """
+    Jalankan semua aturan atas frame hasil ingest (setelah kolom tanggal ter-tipe & NO final).
+
+    Returns:
+        Tuple[dict, pd.DataFrame, np.ndarray]: (ringkasan summarize_issues + 'seconds',
+        daftar masalah build_issue_list, matriks baris x aturan)
+    """
+    t0 = time.perf_counter()
+    matrix = build_issue_matrix(df)
+    summary = summarize_issues(matrix)
+    issues = build_issue_list(df, matrix)
+    summary['seconds'] = round(time.perf_counter() - t0, 4)
+    return summary, issues, matrix
@@ -0,0 +1,200 @@
+# utils/snapshots.py
+"""
+Snapshot dashboard pra-render: KPI + HTML peta untuk tampilan default (satu per UP3 dan
+"Semua", tanpa filter ULP/STATUS). Dibangun di thread latar belakang setelah commit lalu
+disimpan per versi dataset di SNAPSHOT_DIR:
+
+    <SNAPSHOT_DIR>/<versi>/<scope>.html   peta (Folium atau deck.gl, sama dengan pilihan awal dashboard)
+    <SNAPSHOT_DIR>/<versi>/manifest.json  KPI + metadata per scope, ditulis paling akhir
+
+Artefak per versi tidak pernah berubah, jadi aman di-cache per proses. HTML yang sama
+dipakai sebagai laporan offline yang bisa diunduh (ditambah kartu KPI).
+"""
+
+import html as html_lib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from config import SNAPSHOT_DIR, SNAPSHOT_KEEP_VERSIONS, MAP_ENGINE_AUTO_THRESHOLD, APP_TITLE
+from utils.data_processor import add_status_norm, apply_filters, compute_kpis, register_post_commit_hook
+
+SNAPSHOT_ALL = 'Semua'
+_MANIFEST = 'manifest.json'
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ugb-snapshot')
+_pending: set = set()
+_lock = threading.Lock()
+_manifests: Dict[str, Dict[str, Any]] = {}
+
+def _version_dir(version: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, re.sub(r'[^\w.-]+', '_', version))
+
+def _scope_file(scope: str) -> str:
+    return (re.sub(r'[^\w]+', '_', scope).strip('_') or 'scope') + '.html'
+
+def snapshot_scopes(df: pd.DataFrame) -> List[str]:
+    """'Semua' + setiap UP3 yang ada di dataset (sama dengan opsi slicer dashboard)."""
+    up3 = sorted(df['UP3'].dropna().astype(str).unique()) if 'UP3' in df.columns else []
+    return [SNAPSHOT_ALL] + up3
+
+def _render_map_html(history: dict, filtered_index: pd.Index) -> Dict[str, Any]:
+    """HTML mandiri peta untuk satu scope; mesin mengikuti pilihan awal dashboard (folium / deck)."""
+    from utils.map_view import coordinate_points, build_folium_map, build_deck_map
+    n_points = len(coordinate_points(history, filtered_index))
+    if n_points > MAP_ENGINE_AUTO_THRESHOLD:
+        deck, markers = build_deck_map(history, filtered_index)
+        deck.map_style = 'light'  # basemap Carto; di aplikasi basemap disediakan st.pydeck_chart
+        return {'engine': 'deck', 'markers': markers, 'html': deck.to_html(as_string=True)}
+    m, markers = build_folium_map(history, filtered_index)
+    return {'engine': 'folium', 'markers': markers, 'html': m.get_root().render()}
+
+def _write_text_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+    os.replace(tmp_path, path)
+
+def build_dashboard_snapshots(df: pd.DataFrame, version: str) -> Dict[str, Any]:
+    """
+    Render semua scope untuk satu versi dataset dan tulis manifest-nya.
+
+    Returns:
+        dict manifest: {'version', 'rendered_at', 'seconds', 'scopes': {scope: {'kpi', 'file',
+        'engine', 'markers', 'rows', 'seconds'}}}
+    """
+    # Stack peta di-import di thread render, bukan saat modul dimuat (cold start aplikasi)
+    from utils.map_view import new_coordinate_history
+    t0 = time.perf_counter()
+    df_ui = df if 'STATUS_NORM' in df.columns else add_status_norm(df)
+    history = new_coordinate_history(df_ui)
+    out_dir = _version_dir(version)
+    os.makedirs(out_dir, exist_ok=True)
+    scopes = {}
+    for scope in snapshot_scopes(df_ui):
+        t_scope = time.perf_counter()
+        filtered = apply_filters(df_ui, {'UP3': scope, 'ULP': SNAPSHOT_ALL, 'STATUS': SNAPSHOT_ALL})
+        rendered = _render_map_html(history, filtered.index)
+        _write_text_atomic(os.path.join(out_dir, _scope_file(scope)), rendered['html'])
+        scopes[scope] = {
+            'kpi': compute_kpis(filtered),
+            'file': _scope_file(scope),
+            'engine': rendered['engine'],
+            'markers': rendered['markers'],
+            'rows': len(filtered),
+            'seconds': round(time.perf_counter() - t_scope, 3),
+        }
+    manifest = {
+        'version': version,
+        'rendered_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - t0, 3),
+        'scopes': scopes,
+    }
+    _write_text_atomic(os.path.join(out_dir, _MANIFEST), json.dumps(manifest))
+    _prune_versions(keep=version)
+    return manifest
+
+def _prune_versions(keep: str) -> None:
+    """Hapus folder versi tertua di luar SNAPSHOT_KEEP_VERSIONS (folder `keep` selalu dipertahankan)."""
+    try:
+        dirs = [os.path.join(SNAPSHOT_DIR, d) for d in os.listdir(SNAPSHOT_DIR)]
+    except OSError:
+        return
+    dirs = sorted((d for d in dirs if os.path.isdir(d)), key=os.path.getmtime, reverse=True)
+    for path in dirs[SNAPSHOT_KEEP_VERSIONS:]:
+        if path != _version_dir(keep):
+            shutil.rmtree(path, ignore_errors=True)
+
+def _build_job(df: pd.DataFrame, version: str) -> None:
+    try:
+        manifest = build_dashboard_snapshots(df, version)
+        print(f"Snapshot dashboard {version}: {len(manifest['scopes'])} scope dalam {manifest['seconds']:.1f}s")
+    except Exception as e:
+        print(f"Gagal membuat snapshot dashboard: {str(e)}")
+    finally:
+        with _lock:
+            _pending.discard(version)
+
+def schedule_dashboard_snapshots(df: pd.DataFrame, version: str) -> bool:
+    """Antrekan render snapshot untuk versi ini bila belum ada / belum diantrekan. True jika diantrekan."""
+    if df.empty or load_snapshot_manifest(version) is not None:
+        return False
+    with _lock:
+        if version in _pending:
+            return False
+        _pending.add(version)
+    _executor.submit(_build_job, df, version)
+    return True
+
+def is_snapshot_pending(version: str) -> bool:
+    with _lock:
+        return version in _pending
+
+def load_snapshot_manifest(version: str) -> Optional[Dict[str, Any]]:
+    """Manifest versi (di-cache setelah ditemukan; artefak per versi tidak berubah)."""
+    if version in _manifests:
+        return _manifests[version]
+    path = os.path.join(_version_dir(version), _MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as fh:
+        manifest = json.load(fh)
+    with _lock:
+        _manifests[version] = manifest
+        # Hanya versi terbaru yang masih dilayani; manifest versi lama tergusur (urutan sisip)
+        while len(_manifests) > SNAPSHOT_KEEP_VERSIONS:
+            _manifests.pop(next(iter(_manifests)))
+    return manifest
+
+def get_snapshot(version: str, scope: str) -> Optional[Dict[str, Any]]:
+    """Snapshot satu scope: entri manifest + 'scope', 'version', 'rendered_at', 'path'. None bila belum ada."""
+    manifest = load_snapshot_manifest(version)
+    entry = manifest['scopes'].get(scope) if manifest else None
+    if entry is None:
+        return None
+    path = os.path.join(_version_dir(version), entry['file'])
+    if not os.path.exists(path):
+        return None
+    return {**entry, 'scope': scope, 'version': version, 'rendered_at': manifest['rendered_at'], 'path': path}
+
+@lru_cache(maxsize=8)
+def read_snapshot_html(path: str) -> str:
+    with open(path, encoding='utf-8') as fh:
+        return fh.read()
+
+def snapshot_report_html(snapshot: Dict[str, Any]) -> str:
+    """Laporan HTML offline: peta snapshot + kartu KPI melayang di pojok kiri atas."""
+    kpi = snapshot['kpi']
+    cards = "".join(
+        f'<div style="margin:0 14px 0 0"><div style="font-size:22px;font-weight:800;color:{color}">{value}</div>'
+        f'<div style="font-size:11px;color:#555">{label}</div></div>'
+        for value, label, color in (
+            (f"{kpi['total']:,}", "TOTAL UGB", "#1f4e79"),
+            (f"{kpi['pct_rusak']:.1f}%", "% RUSAK", "#dc3545"),
+            (f"{kpi['pct_standby']:.1f}%", "% STAND BY", "#28a745"),
+            (f"{kpi['pct_terpasang']:.1f}%", "% TERPASANG", "#ff8c00"),
+        ))
+    banner = (
+        '<div style="position:fixed;top:12px;left:56px;z-index:10000;background:rgba(255,255,255,0.95);'
+        'border-radius:10px;box-shadow:0 4px 16px rgba(0,0,0,0.2);padding:10px 14px;font-family:Arial,sans-serif">'
+        f'<div style="font-weight:800;font-size:14px;margin-bottom:6px">{html_lib.escape(APP_TITLE)} • UP3: '
+        f'{html_lib.escape(snapshot["scope"])}</div><div style="display:flex">{cards}</div>'
+        f'<div style="font-size:10px;color:#777;margin-top:6px">Versi data {html_lib.escape(snapshot["version"])} • '
+        f'dibuat {html_lib.escape(snapshot["rendered_at"])}</div></div>'
+    )
+    page = read_snapshot_html(snapshot['path'])
+    return page.replace('<body>', '<body>' + banner, 1) if '<body>' in page else banner + page
+
+def _on_commit(database_path: str, version: str, committed_df: pd.DataFrame) -> None:
+    schedule_dashboard_snapshots(committed_df, version)
+
+register_post_commit_hook(_on_commit)
@@ -0,0 +1,193 @@
+# utils/spatial.py
+"""
+Indeks spasial ringan berbasis grid (numpy saja, tanpa dependensi geo).
+Titik diurutkan per sel grid sehingga query bounding box cukup searchsorted per baris sel.
+Query radius / k-terdekat memakai bounding box yang sama lalu jarak haversine pada kandidat.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Kode prioritas warna status (nilai lebih besar menang saat agregasi)
+STATUS_PRIORITY = {'STAND BY': 0, 'TERPASANG': 1, 'RUSAK': 2}
+PRIORITY_STATUS = {v: k for k, v in STATUS_PRIORITY.items()}
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = np.pi * EARTH_RADIUS_KM / 180.0
+
+# Penyaring kandidat: menerima posisi titik, mengembalikan mask boolean sejajar
+CandidateFilter = Callable[[np.ndarray], np.ndarray]
+
+def build_grid_index(lat: np.ndarray, lon: np.ndarray, cell_deg: float) -> Dict[str, np.ndarray]:
+    """
+    Bangun indeks grid untuk array lat/lon (derajat).
+
+    Returns:
+        dict: lat0/lon0 (titik asal grid), cell_deg, n_cols, order (indeks titik
+        terurut per sel), cells (id sel terurut, sejajar dengan order)
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) == 0:
+        return {'lat0': 0.0, 'lon0': 0.0, 'cell_deg': cell_deg, 'n_rows': 0, 'n_cols': 0,
+                'order': np.empty(0, dtype=np.int64), 'cells': np.empty(0, dtype=np.int64)}
+    lat0, lon0 = float(lat.min()), float(lon.min())
+    rows = ((lat - lat0) // cell_deg).astype(np.int64)
+    cols = ((lon - lon0) // cell_deg).astype(np.int64)
+    n_rows, n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+    cell_ids = rows * n_cols + cols
+    order = np.argsort(cell_ids, kind='stable')
+    return {'lat0': lat0, 'lon0': lon0, 'cell_deg': cell_deg, 'n_rows': n_rows, 'n_cols': n_cols,
+            'order': order, 'cells': cell_ids[order]}
+
+def query_bbox(index: Dict[str, np.ndarray], lat: np.ndarray, lon: np.ndarray,
+               south: float, west: float, north: float, east: float) -> np.ndarray:
+    """Indeks titik (posisi di array lat/lon) yang berada di dalam bounding box, urut naik."""
+    if len(index['order']) == 0 or south > north or west > east:
+        return np.empty(0, dtype=np.int64)
+    cd, n_rows, n_cols = index['cell_deg'], index['n_rows'], index['n_cols']
+    r0 = max(int((south - index['lat0']) // cd), 0)
+    r1 = min(int((north - index['lat0']) // cd), n_rows - 1)
+    c0 = max(int((west - index['lon0']) // cd), 0)
+    c1 = min(int((east - index['lon0']) // cd), n_cols - 1)
+    if r0 > r1 or c0 > c1:
+        return np.empty(0, dtype=np.int64)
+    # Satu rentang id sel yang bersebelahan per baris grid
+    row_ids = np.arange(r0, r1 + 1, dtype=np.int64) * n_cols
+    starts = np.searchsorted(index['cells'], row_ids + c0, side='left')
+    stops = np.searchsorted(index['cells'], row_ids + c1, side='right')
+    if not (stops > starts).any():
+        return np.empty(0, dtype=np.int64)
+    candidates = np.concatenate([index['order'][a:b] for a, b in zip(starts, stops) if b > a])
+    la, lo = np.asarray(lat)[candidates], np.asarray(lon)[candidates]
+    inside = (la >= south) & (la <= north) & (lo >= west) & (lo <= east)
+    return np.sort(candidates[inside])
+
+def aggregate_cells(lat: np.ndarray, lon: np.ndarray, priority: np.ndarray, cell_deg: float,
+                    origin: Optional[Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+    """
+    Agregasi titik ke sel grid persegi berukuran cell_deg.
+
+    Returns:
+        dict array sejajar per sel: lat/lon (rata-rata posisi titik), count,
+        priority (maks kode STATUS_PRIORITY), dan jumlah per status (n_<kode>)
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    priority = np.asarray(priority, dtype=np.int64)
+    lat0, lon0 = origin if origin is not None else ((lat.min(), lon.min()) if len(lat) else (0.0, 0.0))
+    rows = np.floor((lat - lat0) / cell_deg).astype(np.int64)
+    cols = np.floor((lon - lon0) / cell_deg).astype(np.int64)
+    # Geser ke 0 agar (baris, kolom) bisa dikodekan menjadi satu id integer
+    r_min, c_min = (int(rows.min()), int(cols.min())) if len(rows) else (0, 0)
+    span_cols = int(cols.max()) - c_min + 1 if len(cols) else 1
+    uniq, inverse, counts = np.unique((rows - r_min) * span_cols + (cols - c_min), return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    n = len(uniq)
+    result = {
+        'row': uniq // span_cols + r_min,
+        'col': uniq % span_cols + c_min,
+        'lat': np.bincount(inverse, weights=lat, minlength=n) / np.maximum(counts, 1),
+        'lon': np.bincount(inverse, weights=lon, minlength=n) / np.maximum(counts, 1),
+        'count': counts,
+        'priority': np.zeros(n, dtype=np.int64),
+    }
+    np.maximum.at(result['priority'], inverse, priority)
+    for code in PRIORITY_STATUS:
+        result[f'n_{code}'] = np.bincount(inverse[priority == code], minlength=n)
+    return result
+
+def build_grid_pyramid(frame: pd.DataFrame, levels_deg: List[float], group_cols: List[str]) -> Dict[float, pd.DataFrame]:
+    """
+    Agregasi multi-resolusi per baris data (bukan per koordinat) dengan grid global
+    berasal (0, 0) sehingga sel stabil lintas versi dataset.
+
+    Args:
+        frame: harus punya kolom _LAT, _LON + group_cols (mis. UP3, ULP, STATUS_NORM)
+        levels_deg: ukuran sel per level (derajat)
+        group_cols: dimensi yang dipertahankan agar filter bisa diterapkan ke hasil agregasi
+
+    Returns:
+        {ukuran sel: DataFrame[_ROW, _COL, *group_cols, _COUNT, _LAT_SUM, _LON_SUM]}
+    """
+    valid = frame['_LAT'].notna() & frame['_LON'].notna()
+    lat = frame.loc[valid, '_LAT'].to_numpy(dtype=float)
+    lon = frame.loc[valid, '_LON'].to_numpy(dtype=float)
+    groups = frame.loc[valid, group_cols].astype(str).reset_index(drop=True)
+    pyramid = {}
+    for cell in levels_deg:
+        cube = groups.assign(
+            _ROW=np.floor(lat / cell).astype(np.int64),
+            _COL=np.floor(lon / cell).astype(np.int64),
+            _LAT_SUM=lat,
+            _LON_SUM=lon,
+        )
+        pyramid[cell] = cube.groupby(['_ROW', '_COL'] + group_cols, sort=False, observed=True).agg(
+            _COUNT=('_LAT_SUM', 'size'), _LAT_SUM=('_LAT_SUM', 'sum'), _LON_SUM=('_LON_SUM', 'sum'),
+        ).reset_index()
+    return pyramid
+
+def pyramid_level_for_zoom(levels_deg: List[float], zoom: float, cell_px: int) -> float:
+    """Pilih level yang sel-nya paling mendekati cell_px piksel pada zoom Leaflet/Web Mercator."""
+    target = 360.0 / (256 * 2 ** float(zoom)) * cell_px
+    return min(levels_deg, key=lambda d: abs(np.log2(d / target)))
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Jarak lingkaran besar (km) antar titik derajat; mendukung broadcasting numpy."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def query_radius(index: Dict[str, np.ndarray], lat: np.ndarray, lon: np.ndarray,
+                 center_lat: float, center_lon: float, radius_km: float,
+                 accept: Optional[CandidateFilter] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Titik dalam radius_km dari pusat: bounding box derajat yang memuat lingkaran (query_bbox),
+    lalu jarak haversine hanya untuk kandidat di dalamnya.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (posisi titik, jarak km), urut jarak naik
+    """
+    dlat = radius_km / KM_PER_DEG_LAT
+    # Derajat bujur menyempit ke arah kutub; batasi agar tidak membagi nol
+    dlon = radius_km / (KM_PER_DEG_LAT * max(np.cos(np.radians(center_lat)), 1e-6))
+    candidates = query_bbox(index, lat, lon, center_lat - dlat, center_lon - dlon, center_lat + dlat, center_lon + dlon)
+    if accept is not None and len(candidates):
+        candidates = candidates[accept(candidates)]
+    dist = haversine_km(center_lat, center_lon, np.asarray(lat)[candidates], np.asarray(lon)[candidates])
+    inside = dist <= radius_km
+    candidates, dist = candidates[inside], dist[inside]
+    order = np.argsort(dist, kind='stable')
+    return candidates[order], dist[order]
+
+def query_nearest(index: Dict[str, np.ndarray], lat: np.ndarray, lon: np.ndarray,
+                  center_lat: float, center_lon: float, k: int,
+                  accept: Optional[CandidateFilter] = None,
+                  max_radius_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k titik terdekat (opsional dalam max_radius_km). Radius pencarian mulai dari satu sel grid
+    dan digandakan sampai k titik ditemukan: semua titik dalam radius r sudah diperiksa, jadi
+    k hasil pertama pasti yang terdekat. Berhenti bila radius sudah mencakup seluruh grid.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (posisi titik, jarak km), urut jarak naik, paling banyak k
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=float))
+    if k <= 0 or len(index['order']) == 0:
+        return empty
+    # Jarak pusat ke titik grid terjauh = batas atas radius yang perlu diperiksa
+    lat0, lon0, cd = index['lat0'], index['lon0'], index['cell_deg']
+    corners_lat = np.array([lat0, lat0, lat0 + index['n_rows'] * cd, lat0 + index['n_rows'] * cd])
+    corners_lon = np.array([lon0, lon0 + index['n_cols'] * cd, lon0, lon0 + index['n_cols'] * cd])
+    limit = float(haversine_km(center_lat, center_lon, corners_lat, corners_lon).max())
+    if max_radius_km is not None:
+        limit = min(limit, max_radius_km)
+    radius = min(cd * KM_PER_DEG_LAT, limit)
+    while True:
+        positions, dist = query_radius(index, lat, lon, center_lat, center_lon, radius, accept)
+        if len(positions) >= k or radius >= limit:
+            return positions[:k], dist[:k]
+        radius = min(radius * 2, limit)
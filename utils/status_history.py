@@ -0,0 +1,138 @@
+# utils/status_history.py
+"""
+Riwayat status ringkas: setiap upload yang ter-commit menambahkan satu agregat
+(jumlah unit & total kapasitas per UP3 x ULP x STATUS_NORM) ke store Parquet kecil.
+Grafik tren membaca store ini saja, tanpa memuat ulang snapshot lama.
+
+Store berupa folder berpartisi: satu file part-<versi>.parquet per versi dataset, sehingga
+commit hanya menulis agregat versinya sendiri (biaya tetap walau riwayat bertahun-tahun).
+File tunggal format lama dipecah menjadi part saat penulisan berikutnya.
+"""
+
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from config import STATUS_HISTORY_PATH, STATUS_HISTORY_LEGACY_PATH
+
+HISTORY_COLUMNS = ['DATASET_VERSION', 'RECORDED_AT', 'UP3', 'ULP', 'STATUS_NORM', 'COUNT', 'CAPACITY']
+_DIMENSIONS = ['DATASET_VERSION', 'UP3', 'ULP', 'STATUS_NORM']
+
+_lock = threading.Lock()
+_cache: Dict[str, Any] = {'key': None, 'frame': None, 'parts': {}}
+
+def _file_key(path: str):
+    try:
+        st_ = os.stat(path)
+        return st_.st_mtime_ns, st_.st_size
+    except OSError:
+        return None
+
+def _part_name(version: str) -> str:
+    return "part-" + re.sub(r'[^\w.-]', '_', str(version)) + ".parquet"
+
+def _part_keys(path: str) -> Dict[str, Any]:
+    """{nama file part: (mtime_ns, size)} di folder store; kosong bila folder belum ada."""
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return {}
+    return {e.name: (e.stat().st_mtime_ns, e.stat().st_size) for e in entries
+            if e.name.startswith("part-") and e.name.endswith(".parquet")}
+
+def _compact(frame: pd.DataFrame) -> pd.DataFrame:
+    """Dimensi sebagai kategori (dictionary encoding di Parquet), ukuran tetap kecil walau bertahun-tahun."""
+    frame = frame.copy()
+    for col in _DIMENSIONS:
+        frame[col] = frame[col].astype(str).astype('category')
+    frame['COUNT'] = frame['COUNT'].astype('int64')
+    frame['CAPACITY'] = frame['CAPACITY'].astype('float64')
+    frame['RECORDED_AT'] = pd.to_datetime(frame['RECORDED_AT'])
+    return frame[HISTORY_COLUMNS]
+
+def load_status_history(path: str = STATUS_HISTORY_PATH, legacy_path: str = STATUS_HISTORY_LEGACY_PATH) -> pd.DataFrame:
+    """
+    Seluruh store riwayat status: semua part di folder `path` (+ file tunggal format lama bila
+    belum dipecah), urut waktu. Di-cache per mtime file; part yang tidak berubah tidak dibaca ulang.
+    """
+    parts = _part_keys(path)
+    key = (path, tuple(sorted(parts.items())), _file_key(legacy_path))
+    if _cache['key'] == key and _cache['frame'] is not None:
+        return _cache['frame']
+    cached = _cache['parts']
+    frames = []
+    if key[2] is not None:
+        legacy = pd.read_parquet(legacy_path)
+        # Versi yang sudah punya part (pemecahan terputus) tidak dihitung dua kali
+        frames.append(legacy[~legacy['DATASET_VERSION'].astype(str).map(_part_name).isin(parts)])
+    for name in sorted(parts):
+        part_key = (path, name, parts[name])
+        if part_key not in cached:
+            cached[part_key] = pd.read_parquet(os.path.join(path, name))
+        frames.append(cached[part_key])
+    # Buang part yang sudah tidak ada di folder
+    for part_key in [k for k in cached if k[0] == path and k[1:] not in parts.items()]:
+        del cached[part_key]
+    if frames:
+        # Kategori antar part berbeda: satukan sebagai teks lalu kompres ulang
+        combined = pd.concat([f.astype({c: str for c in _DIMENSIONS}) for f in frames], ignore_index=True)
+        frame = _compact(combined).sort_values('RECORDED_AT', kind='stable', ignore_index=True)
+    else:
+        frame = _compact(pd.DataFrame(columns=HISTORY_COLUMNS))
+    _cache.update(key=key, frame=frame)
+    return frame
+
+def _write_part(frame: pd.DataFrame, version: str, path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    part_path = os.path.join(path, _part_name(version))
+    tmp_path = f"{part_path}.tmp"
+    _compact(frame).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
+
+def _split_legacy(path: str, legacy_path: str) -> None:
+    """Pecah file tunggal format lama menjadi satu part per versi, lalu hapus file lamanya."""
+    if _file_key(legacy_path) is None:
+        return
+    legacy = pd.read_parquet(legacy_path)
+    for version, rows in legacy.groupby('DATASET_VERSION', observed=True, sort=False):
+        if not os.path.exists(os.path.join(path, _part_name(version))):
+            _write_part(rows.astype({c: str for c in _DIMENSIONS}), version, path)
+    os.remove(legacy_path)
+
+def append_status_snapshot(snapshot: pd.DataFrame, version: str, recorded_at: Optional[datetime] = None,
+                           path: str = STATUS_HISTORY_PATH, legacy_path: str = STATUS_HISTORY_LEGACY_PATH) -> int:
+    """
+    Tambahkan agregat satu versi dataset (kolom UP3, ULP, STATUS_NORM, COUNT, CAPACITY) sebagai
+    file part baru; part versi lain tidak disentuh. Versi yang sudah tercatat tidak ditulis ulang.
+
+    Returns:
+        int: jumlah baris agregat yang ditambahkan
+    """
+    with _lock:
+        _split_legacy(path, legacy_path)
+        if os.path.exists(os.path.join(path, _part_name(version))):
+            return 0
+        rows = snapshot.assign(DATASET_VERSION=version, RECORDED_AT=recorded_at or datetime.now())
+        _write_part(rows, version, path)
+        return len(rows)
+
+def status_trend(history: pd.DataFrame, filters: Dict[str, Any], value: str = 'COUNT') -> pd.DataFrame:
+    """
+    Deret waktu per STATUS_NORM setelah filter UP3/ULP/STATUS diterapkan ke agregat.
+
+    Returns:
+        DataFrame[RECORDED_AT, DATASET_VERSION, STATUS_NORM, value] terurut waktu
+    """
+    mask = pd.Series(True, index=history.index)
+    for col, target in (('UP3', 'UP3'), ('ULP', 'ULP'), ('STATUS', 'STATUS_NORM')):
+        val = filters.get(col)
+        if val is None or val == 'Semua' or (isinstance(val, list) and not val):
+            continue
+        values = [val] if isinstance(val, str) else list(val)
+        mask &= history[target].astype(str).isin(values)
+    trend = history[mask].groupby(['RECORDED_AT', 'DATASET_VERSION', 'STATUS_NORM'], observed=True)[value].sum().reset_index()
+    return trend.sort_values('RECORDED_AT', kind='stable')
@@ -0,0 +1,173 @@
+# utils/xlsx_sniff.py
+"""
+Sniffing cepat workbook .xlsx/.xlsm tanpa parsing penuh: hanya workbook.xml, baris header
+tiap sheet, dan ukuran XML sheet untuk memperkirakan jumlah baris.
+
+openpyxl (bahkan read_only) selalu memuat seluruh sharedStrings.xml saat membuka workbook,
+yang bisa makan puluhan detik pada file besar. Di sini XML dibaca bertahap (XMLPullParser)
+dan berhenti begitu data yang dibutuhkan sudah didapat.
+"""
+
+import posixpath
+import re
+import zipfile
+from typing import Any, Dict, List, Optional
+from xml.etree.ElementTree import XMLPullParser
+
+# Potongan awal XML sheet yang dibaca untuk header, <dimension>, dan rata-rata byte per baris
+_HEAD_BYTES = 256 * 1024
+_CHUNK_BYTES = 64 * 1024
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension[^>]*\sref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+_ROW_RE = re.compile(rb'<(?:\w+:)?row[\s>]')
+_CELL_REF_RE = re.compile(r'([A-Z]+)')
+
+def _local(tag: str) -> str:
+    """Nama tag tanpa namespace (mendukung OOXML transitional maupun strict)."""
+    return tag.rsplit('}', 1)[-1]
+
+def _attr(elem, name: str) -> Optional[str]:
+    for key, value in elem.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+def _column_index(ref: str) -> int:
+    idx = 0
+    for ch in _CELL_REF_RE.match(ref).group(1):
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+def _resolve_target(target: str) -> str:
+    target = target.lstrip('/')
+    return target if target.startswith('xl/') else posixpath.normpath(posixpath.join('xl', target))
+
+def _read_workbook_sheets(zf: zipfile.ZipFile) -> Dict[str, Any]:
+    """Nama sheet (urut tab) beserta path XML-nya + path sharedStrings bila ada."""
+    rels = {}
+    shared_strings = None
+    parser = XMLPullParser(events=('end',))
+    parser.feed(zf.read('xl/_rels/workbook.xml.rels'))
+    for _event, elem in parser.read_events():
+        if _local(elem.tag) == 'Relationship':
+            rels[elem.get('Id')] = _resolve_target(elem.get('Target', ''))
+            if elem.get('Type', '').endswith('/sharedStrings'):
+                shared_strings = rels[elem.get('Id')]
+    sheets = []
+    parser = XMLPullParser(events=('end',))
+    parser.feed(zf.read('xl/workbook.xml'))
+    for _event, elem in parser.read_events():
+        if _local(elem.tag) == 'sheet':
+            sheets.append({'sheet': elem.get('name'), 'path': rels.get(_attr(elem, 'id'))})
+    return {'sheets': sheets, 'shared_strings': shared_strings}
+
+def _cell_text(cell) -> Any:
+    """Nilai mentah satu <c>: ('s', indeks sharedStrings) atau string/angka langsung."""
+    kind = cell.get('t')
+    if kind == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter() if _local(t.tag) == 't')
+    value = next((child.text for child in cell if _local(child.tag) == 'v'), None)
+    if value is None:
+        return None
+    if kind == 's':
+        return ('s', int(value))
+    return value
+
+def _read_header_row(head: bytes) -> List[Any]:
+    """Sel baris pertama yang berisi nilai (posisi kolom dipertahankan, sel kosong = None)."""
+    parser = XMLPullParser(events=('end',))
+    parser.feed(head)
+    cells: List[Any] = []
+    for _event, elem in parser.read_events():
+        tag = _local(elem.tag)
+        if tag == 'c':
+            col = _column_index(elem.get('r')) if elem.get('r') else len(cells)
+            cells.extend([None] * (col - len(cells) + 1))
+            cells[col] = _cell_text(elem)
+        elif tag == 'row':
+            # Baris kosong di atas header dilewati (sama seperti pd.read_excel)
+            if any(v not in (None, '') for v in cells):
+                break
+            cells = []
+    return cells
+
+def _si_text(si) -> str:
+    """Teks satu <si>: <t> langsung atau gabungan run <r><t> (teks fonetik <rPh> diabaikan)."""
+    parts = []
+    for child in si:
+        tag = _local(child.tag)
+        if tag == 't':
+            parts.append(child.text or '')
+        elif tag == 'r':
+            parts.extend(t.text or '' for t in child if _local(t.tag) == 't')
+    return ''.join(parts)
+
+def _read_shared_strings(zf: zipfile.ZipFile, path: str, needed: set) -> Dict[int, str]:
+    """Ambil hanya entri sharedStrings yang dibutuhkan; berhenti membaca setelah indeks terbesar."""
+    if not needed:
+        return {}
+    last = max(needed)
+    found: Dict[int, str] = {}
+    parser = XMLPullParser(events=('end',))
+    idx = 0
+    with zf.open(path) as fh:
+        while idx <= last:
+            chunk = fh.read(_CHUNK_BYTES)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for _event, elem in parser.read_events():
+                if _local(elem.tag) != 'si':
+                    continue
+                if idx in needed:
+                    found[idx] = _si_text(elem)
+                idx += 1
+                elem.clear()
+    return found
+
+def read_workbook_outline(file_data) -> List[Dict[str, Any]]:
+    """
+    Baca garis besar workbook tanpa memuat data.
+
+    Args:
+        file_data: path atau file-like object (posisi baca dikembalikan ke awal)
+
+    Returns:
+        list per sheet (urut tab): {'sheet', 'header': [nilai sel baris 1],
+        'est_rows': perkiraan jumlah baris data (tanpa header),
+        'exact': True bila dari <dimension>, False bila ditaksir dari ukuran XML}
+
+    Raises:
+        zipfile.BadZipFile / KeyError bila bukan workbook OOXML yang valid.
+    """
+    try:
+        with zipfile.ZipFile(file_data) as zf:
+            book = _read_workbook_sheets(zf)
+            outline = []
+            for item in book['sheets']:
+                info = zf.getinfo(item['path'])
+                with zf.open(info) as fh:
+                    head = fh.read(_HEAD_BYTES)
+                header = _read_header_row(head)
+                outline.append({'sheet': item['sheet'], 'header': header,
+                                **_estimate_rows(head, info.file_size)})
+            needed = {v[1] for o in outline for v in o['header'] if isinstance(v, tuple)}
+            strings = _read_shared_strings(zf, book['shared_strings'], needed) if book['shared_strings'] else {}
+            for o in outline:
+                o['header'] = [strings.get(v[1]) if isinstance(v, tuple) else v for v in o['header']]
+            return outline
+    finally:
+        if hasattr(file_data, 'seek'):
+            file_data.seek(0)
+
+def _estimate_rows(head: bytes, total_bytes: int) -> Dict[str, Any]:
+    m = _DIMENSION_RE.search(head)
+    # <dimension ref="A1"/> ditulis untuk sheet kosong maupun oleh sebagian penulis yang tidak mengisinya
+    if m and m.group(4) and int(m.group(4)) > 1:
+        return {'est_rows': int(m.group(4)) - 1, 'exact': True}
+    rows_in_head = len(_ROW_RE.findall(head))
+    if rows_in_head == 0:
+        return {'est_rows': 0, 'exact': True}
+    if len(head) >= total_bytes:
+        return {'est_rows': rows_in_head - 1, 'exact': True}
+    per_row = len(head) / rows_in_head
+    return {'est_rows': int(total_bytes / per_row) - 1, 'exact': False}